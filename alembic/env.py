@@ -8,6 +8,10 @@ from alembic import context
 from app.models.incident import Base
 from app.models import incident
 from app.models import auth 
+from app.models import embedding_cache
+from app.models import idempotency
+from app.models import stack_rollup
+from app.models import rate_limit
 # this is the Alembic Config object, which provides
 # access to the values within the .ini file in use.
 config = context.config
@@ -0,0 +1,50 @@
+"""incident search tsvector
+
+Revision ID: 1f6c3d8e2a57
+Revises: e7d2b5a19c43
+Create Date: 2026-10-17 12:06:33.914520
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+# revision identifiers, used by Alembic.
+revision: str = '1f6c3d8e2a57'
+down_revision: Union[str, Sequence[str], None] = 'e7d2b5a19c43'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+SEARCH_TSV_EXPRESSION = (
+    "setweight(to_tsvector('english', coalesce(title, '')), 'A') || "
+    "setweight(to_tsvector('english', coalesce(service, '')), 'A') || "
+    "setweight(jsonb_to_tsvector('english', coalesce(tags, '[]'::jsonb), '[\"string\"]'), 'B') || "
+    "setweight(to_tsvector('english', left(message_redacted, 262144)), 'B') || "
+    "setweight(to_tsvector('english', left(coalesce(stack_trace, ''), 262144)), 'C')"
+)
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # Adding a stored generated column rewrites the table once to populate it
+    op.add_column(
+        'incident_logs',
+        sa.Column('search_tsv', postgresql.TSVECTOR(), sa.Computed(SEARCH_TSV_EXPRESSION, persisted=True), nullable=True),
+    )
+    with op.get_context().autocommit_block():
+        op.create_index(
+            'ix_incident_logs_search_tsv',
+            'incident_logs',
+            ['search_tsv'],
+            unique=False,
+            postgresql_using='gin',
+            postgresql_concurrently=True,
+        )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_incident_logs_search_tsv', table_name='incident_logs', postgresql_using='gin')
+    op.drop_column('incident_logs', 'search_tsv')
@@ -0,0 +1,38 @@
+"""embedding cache
+
+Revision ID: 5b1e9c2f7a30
+Revises: 3d47eace4496
+Create Date: 2026-10-17 09:12:41.118204
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from pgvector.sqlalchemy import Vector
+
+# revision identifiers, used by Alembic.
+revision: str = '5b1e9c2f7a30'
+down_revision: Union[str, Sequence[str], None] = '3d47eace4496'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('incident_logs', sa.Column('embedding_content_hash', sa.String(length=64), nullable=True))
+    op.create_table('embedding_cache',
+    sa.Column('model', sa.String(length=100), nullable=False),
+    sa.Column('content_hash', sa.String(length=64), nullable=False),
+    sa.Column('embedding', Vector(1536), nullable=False),
+    sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=False),
+    sa.PrimaryKeyConstraint('model', 'content_hash')
+    )
+    op.create_index('ix_embedding_cache_created_at', 'embedding_cache', ['created_at'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_embedding_cache_created_at', table_name='embedding_cache')
+    op.drop_table('embedding_cache')
+    op.drop_column('incident_logs', 'embedding_content_hash')
@@ -0,0 +1,51 @@
+"""search filter indexes
+
+Revision ID: 8a4e0c7b3d91
+Revises: 1f6c3d8e2a57
+Create Date: 2026-10-17 13:11:08.462197
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = '8a4e0c7b3d91'
+down_revision: Union[str, Sequence[str], None] = '1f6c3d8e2a57'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    with op.get_context().autocommit_block():
+        op.create_index(
+            'ix_incident_logs_tenant_severity_created',
+            'incident_logs',
+            ['tenant_id', 'severity', 'created_at'],
+            unique=False,
+            postgresql_concurrently=True,
+        )
+        op.create_index(
+            'ix_incident_logs_tenant_source_created',
+            'incident_logs',
+            ['tenant_id', 'source', 'created_at'],
+            unique=False,
+            postgresql_concurrently=True,
+        )
+        op.create_index(
+            'ix_incident_logs_tags',
+            'incident_logs',
+            ['tags'],
+            unique=False,
+            postgresql_using='gin',
+            postgresql_ops={'tags': 'jsonb_path_ops'},
+            postgresql_concurrently=True,
+        )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_incident_logs_tags', table_name='incident_logs', postgresql_using='gin')
+    op.drop_index('ix_incident_logs_tenant_source_created', table_name='incident_logs')
+    op.drop_index('ix_incident_logs_tenant_severity_created', table_name='incident_logs')
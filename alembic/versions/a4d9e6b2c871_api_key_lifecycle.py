@@ -0,0 +1,31 @@
+"""api key lifecycle
+
+Revision ID: a4d9e6b2c871
+Revises: f3a7c5e9b214
+Create Date: 2026-10-17 18:41:09.226114
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision: str = 'a4d9e6b2c871'
+down_revision: Union[str, Sequence[str], None] = 'f3a7c5e9b214'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('api_keys', sa.Column('revoked_at', sa.DateTime(timezone=True), nullable=True))
+    op.add_column('api_keys', sa.Column('expires_at', sa.DateTime(timezone=True), nullable=True))
+    op.add_column('api_keys', sa.Column('last_used_at', sa.DateTime(timezone=True), nullable=True))
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_column('api_keys', 'last_used_at')
+    op.drop_column('api_keys', 'expires_at')
+    op.drop_column('api_keys', 'revoked_at')
@@ -0,0 +1,37 @@
+"""embedding worker queue
+
+Revision ID: c4a81f06d2e9
+Revises: 5b1e9c2f7a30
+Create Date: 2026-10-17 10:02:17.530861
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision: str = 'c4a81f06d2e9'
+down_revision: Union[str, Sequence[str], None] = '5b1e9c2f7a30'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('incident_logs', sa.Column('embedding_attempts', sa.Integer(), server_default='0', nullable=False))
+    op.add_column('incident_logs', sa.Column('embedding_next_attempt_at', sa.DateTime(timezone=True), nullable=True))
+    op.create_index(
+        'ix_incident_logs_embedding_queue',
+        'incident_logs',
+        ['id'],
+        unique=False,
+        postgresql_where=sa.text("embedding_status IN ('pending', 'failed') AND is_deleted = false"),
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_incident_logs_embedding_queue', table_name='incident_logs')
+    op.drop_column('incident_logs', 'embedding_next_attempt_at')
+    op.drop_column('incident_logs', 'embedding_attempts')
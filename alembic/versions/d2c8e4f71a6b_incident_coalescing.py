@@ -0,0 +1,46 @@
+"""incident coalescing
+
+Revision ID: d2c8e4f71a6b
+Revises: b6f3a9d1c052
+Create Date: 2026-10-17 16:24:05.281447
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision: str = 'd2c8e4f71a6b'
+down_revision: Union[str, Sequence[str], None] = 'b6f3a9d1c052'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('incident_logs', sa.Column('fingerprint', sa.String(length=64), nullable=True))
+    op.add_column('incident_logs', sa.Column('occurrence_count', sa.Integer(), server_default='1', nullable=False))
+    # Added without a default so existing rows stay null (not "seen at migration time"),
+    # then defaulted for new inserts. Neither step rewrites the table.
+    op.add_column('incident_logs', sa.Column('last_seen_at', sa.DateTime(timezone=True), nullable=True))
+    op.alter_column('incident_logs', 'last_seen_at', server_default=sa.text('now()'))
+
+    with op.get_context().autocommit_block():
+        op.create_index(
+            'ix_incident_logs_coalesce',
+            'incident_logs',
+            ['tenant_id', 'service', 'fingerprint', 'last_seen_at'],
+            unique=False,
+            postgresql_where=sa.text('fingerprint IS NOT NULL AND is_deleted = false'),
+            postgresql_concurrently=True,
+        )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    with op.get_context().autocommit_block():
+        op.drop_index('ix_incident_logs_coalesce', table_name='incident_logs', postgresql_concurrently=True)
+    op.drop_column('incident_logs', 'last_seen_at')
+    op.drop_column('incident_logs', 'occurrence_count')
+    op.drop_column('incident_logs', 'fingerprint')
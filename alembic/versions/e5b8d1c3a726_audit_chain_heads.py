@@ -0,0 +1,44 @@
+"""audit chain heads
+
+Revision ID: e5b8d1c3a726
+Revises: c7e1f4a9d305
+Create Date: 2026-10-17 22:41:09.530114
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision: str = 'e5b8d1c3a726'
+down_revision: Union[str, Sequence[str], None] = 'c7e1f4a9d305'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table('audit_chain_heads',
+    sa.Column('tenant_id', sa.String(length=100), nullable=False),
+    sa.Column('hash', sa.String(length=64), nullable=True),
+    sa.Column('entries', sa.BigInteger(), server_default='0', nullable=False),
+    sa.Column('updated_at', sa.DateTime(timezone=True), nullable=False),
+    sa.PrimaryKeyConstraint('tenant_id')
+    )
+    # Each tenant's head is its newest entry. Stop API writers first: an append
+    # committed between this and the switch to the new code would be missed.
+    op.execute(
+        """
+        INSERT INTO audit_chain_heads (tenant_id, hash, entries, updated_at)
+        SELECT DISTINCT ON (tenant_id)
+               tenant_id, hash, count(*) OVER (PARTITION BY tenant_id), created_at
+        FROM audit_logs
+        ORDER BY tenant_id, id DESC
+        """
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_table('audit_chain_heads')
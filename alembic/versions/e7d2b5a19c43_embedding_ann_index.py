@@ -0,0 +1,49 @@
+"""embedding ann index
+
+Revision ID: e7d2b5a19c43
+Revises: c4a81f06d2e9
+Create Date: 2026-10-17 11:24:51.208114
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+from app.core.config import ANN_INDEX_TYPE
+from app.models.incident import embedding_ann_index
+
+# revision identifiers, used by Alembic.
+revision: str = 'e7d2b5a19c43'
+down_revision: Union[str, Sequence[str], None] = 'c4a81f06d2e9'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # Type and build params come from ANN_INDEX_TYPE / HNSW_* / IVFFLAT_LISTS at migration time.
+    # CONCURRENTLY keeps incident writes flowing while the index builds on a populated table.
+    idx = embedding_ann_index(ANN_INDEX_TYPE)
+    with op.get_context().autocommit_block():
+        op.create_index(
+            idx.name,
+            'incident_logs',
+            ['embedding'],
+            unique=False,
+            postgresql_using=idx.dialect_options['postgresql']['using'],
+            postgresql_with=idx.dialect_options['postgresql']['with'],
+            postgresql_ops={'embedding': 'vector_cosine_ops'},
+            postgresql_concurrently=True,
+        )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    with op.get_context().autocommit_block():
+        for name in ('ix_incident_logs_embedding_hnsw', 'ix_incident_logs_embedding_ivfflat'):
+            op.drop_index(
+                name,
+                table_name='incident_logs',
+                postgresql_concurrently=True,
+                if_exists=True,
+            )
@@ -0,0 +1,82 @@
+"""stack fingerprints
+
+Revision ID: f3a7c5e9b214
+Revises: d2c8e4f71a6b
+Create Date: 2026-10-17 17:40:52.904318
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+from app.core.fingerprint import stack_fingerprint
+
+# revision identifiers, used by Alembic.
+revision: str = 'f3a7c5e9b214'
+down_revision: Union[str, Sequence[str], None] = 'd2c8e4f71a6b'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+BACKFILL_BATCH = 1000
+
+
+def _backfill(conn) -> None:
+    """
+    Fingerprints existing traces in keyset-paginated batches. Runs inside an
+    autocommit block, so each batch's UPDATE commits on its own and row locks
+    are held for one batch at a time.
+    """
+    last_id = 0
+    while True:
+        rows = conn.execute(
+            sa.text(
+                "SELECT id, stack_trace FROM incident_logs "
+                "WHERE id > :last_id AND stack_trace IS NOT NULL ORDER BY id LIMIT :n"
+            ),
+            {"last_id": last_id, "n": BACKFILL_BATCH},
+        ).all()
+        if not rows:
+            return
+        params = [{"id": r.id, "fp": stack_fingerprint(r.stack_trace)} for r in rows]
+        conn.execute(sa.text("UPDATE incident_logs SET stack_fingerprint = :fp WHERE id = :id"), params)
+        last_id = rows[-1].id
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('incident_logs', sa.Column('stack_fingerprint', sa.String(length=64), nullable=True))
+    op.create_table('stack_fingerprint_rollups',
+    sa.Column('tenant_id', sa.String(length=100), nullable=False),
+    sa.Column('bucket_start', sa.DateTime(timezone=True), nullable=False),
+    sa.Column('stack_fingerprint', sa.String(length=64), nullable=False),
+    sa.Column('incident_count', sa.Integer(), nullable=False),
+    sa.Column('sample_incident_id', sa.Integer(), nullable=False),
+    sa.PrimaryKeyConstraint('tenant_id', 'bucket_start', 'stack_fingerprint')
+    )
+
+    with op.get_context().autocommit_block():
+        _backfill(op.get_bind())
+        op.create_index(
+            'ix_incident_logs_tenant_stack_fp_created',
+            'incident_logs',
+            ['tenant_id', 'stack_fingerprint', 'created_at'],
+            unique=False,
+            postgresql_where=sa.text('stack_fingerprint IS NOT NULL'),
+            postgresql_concurrently=True,
+        )
+
+    op.execute(
+        "INSERT INTO stack_fingerprint_rollups (tenant_id, bucket_start, stack_fingerprint, incident_count, sample_incident_id) "
+        "SELECT tenant_id, date_trunc('hour', created_at, 'UTC'), stack_fingerprint, sum(occurrence_count), min(id) "
+        "FROM incident_logs WHERE stack_fingerprint IS NOT NULL AND NOT is_deleted "
+        "GROUP BY 1, 2, 3"
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    with op.get_context().autocommit_block():
+        op.drop_index('ix_incident_logs_tenant_stack_fp_created', table_name='incident_logs', postgresql_concurrently=True)
+    op.drop_table('stack_fingerprint_rollups')
+    op.drop_column('incident_logs', 'stack_fingerprint')
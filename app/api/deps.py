@@ -1,11 +1,15 @@
+import math
 from typing import Optional
 
 from fastapi import Depends, HTTPException
 from fastapi.security import APIKeyHeader
 from sqlalchemy.orm import Session
+from starlette.concurrency import run_in_threadpool
 
 from app.core.database import get_db
+from app.core.ratelimit import RateLimited, limiter
 from app.crud.crud_auth import authenticate_api_key, ActorContext
+from app.crud.crud_key_usage import key_usage
 
 api_key_header = APIKeyHeader(name="X-API-Key", auto_error=False)
 
@@ -16,4 +20,24 @@ def get_actor(
     actor = authenticate_api_key(db, api_key or "")
     if not actor:
         raise HTTPException(status_code=401, detail="Invalid or missing API key")
+    # In-memory only; flushed to api_keys.last_used_at in batches
+    key_usage.touch(actor.api_key_id)
     return actor
+
+def rate_limited(route_class: str):
+    """Dependency taking one token from the caller's key and tenant buckets for route_class; 429 when either is empty."""
+
+    async def check(actor: ActorContext = Depends(get_actor)) -> None:
+        try:
+            if limiter.blocking:
+                await run_in_threadpool(limiter.check, route_class, actor.tenant_id, actor.api_key_id)
+            else:
+                limiter.check(route_class, actor.tenant_id, actor.api_key_id)
+        except RateLimited as e:
+            raise HTTPException(
+                status_code=429,
+                detail=str(e),
+                headers={"Retry-After": str(max(1, math.ceil(e.retry_after)))},
+            )
+
+    return check
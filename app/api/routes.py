@@ -1,63 +1,228 @@
 # routes.py
 
-from fastapi import APIRouter, Depends, Header, HTTPException, Query
+import json
+import tempfile
+
+from fastapi import APIRouter, Body, Depends, Header, HTTPException, Query, Request, Response
+from fastapi.responses import StreamingResponse
+from pydantic import ValidationError
+from starlette.background import BackgroundTask
+from starlette.concurrency import run_in_threadpool
 from sqlalchemy.orm import Session
-from typing import Optional, List
-from app.api.deps import get_actor
+from typing import Any, Dict, Optional, List
+from datetime import datetime, timedelta, timezone
+from app.api.deps import get_actor, rate_limited
 
 from app.core.database import get_db
-from app.schemas.incident import IncidentLogCreate, IncidentLogRead, UpdateIncident, IncidentRawRead
-from app.schemas.auth import ApiKeyCreate, ApiKeyCreated, AuditLogRead
+from app.schemas.incident import (
+    IncidentLogCreate,
+    IncidentLogRead,
+    UpdateIncident,
+    IncidentRawRead,
+    BulkCreateResult,
+    BulkItemResult,
+    SearchFilters,
+    StackFingerprintCount,
+    SEVERITY_LEVELS,
+    severities_at_least,
+)
+from app.schemas.auth import ApiKeyCreate, ApiKeyCreated, ApiKeyRead, ApiKeyRotated, AuditLogRead
 from app.crud.crud import (
-    create_incident,
     get_incident_by_id,
+    get_incident_raw,
     search_incidents,
+    top_stack_fingerprints,
     update_incident,
     delete_incident_soft,
 )
-from app.crud.crud_auth import authenticate_api_key, require_role, create_api_key, append_audit_log, ActorContext
+from app.crud.crud_auth import require_role, create_api_key, append_audit_log, append_audit_logs, ActorContext
+from app.crud.crud_auth import KeyNotRotatable, list_api_keys, revoke_api_key, rotate_api_key
+from app.crud.crud_idempotency import IdempotencyConflict, create_incidents_once, incident_key
+from app.crud.crud_import import ImportSummary, batched, import_batch, ndjson_lines, pipelined, validation_message
+from app.core.config import (
+    BULK_MAX_ITEMS,
+    IMPORT_BATCH_SIZE,
+    IMPORT_MAX_IN_FLIGHT,
+    IMPORT_MAX_LINE_BYTES,
+    IMPORT_SPOOL_BYTES,
+    INGEST_COALESCE,
+)
 from app.models.auth import AuditLog
+from app.llm.breaker import CircuitOpenError
 from app.security.redaction import redact_text
 
+# Routes depend on the same get_actor, so FastAPI resolves it once per request
 router = APIRouter(dependencies=[Depends(get_actor)])
 
 
-
-def get_actor(
-    db: Session = Depends(get_db),
-    x_api_key: Optional[str] = Header(default=None, alias="X-API-Key"),
-) -> ActorContext:
-    actor = authenticate_api_key(db, x_api_key or "")
-    if not actor:
-        raise HTTPException(status_code=401, detail="Invalid or missing API key")
-    return actor
-
-@router.get("/me")
+@router.get("/me", dependencies=[Depends(rate_limited("read"))])
 def me(actor: ActorContext = Depends(get_actor)):
     return {"tenant_id": actor.tenant_id, "actor_id": actor.actor_id, "role": actor.role}
 
 
 
-@router.post("/incidents", response_model=IncidentLogRead)
+@router.post("/incidents", response_model=IncidentLogRead, dependencies=[Depends(rate_limited("write"))])
 def create_incident_route(
     payload: IncidentLogCreate,
+    response: Response,
     db: Session = Depends(get_db),
     actor: ActorContext = Depends(get_actor),
+    idempotency_key: Optional[str] = Header(default=None, alias="Idempotency-Key", max_length=255),
 ):
-    obj = create_incident(db, tenant_id=actor.tenant_id, incident=payload)
-    append_audit_log(
-        db,
-        actor=actor,
-        action="INCIDENT_CREATE",
-        resource_type="incident",
-        resource_id=str(obj.id),
-        request_meta={"service": obj.service, "severity": obj.severity},
-        result_ids=None,
+    # Row, idempotency claim and audit entry commit together: one transaction, one commit
+    try:
+        [(row, status)] = create_incidents_once(
+            db,
+            tenant_id=actor.tenant_id,
+            incidents=[payload],
+            keys=[incident_key(payload, idempotency_key)],
+            coalesce=INGEST_COALESCE,
+        )
+        if status == "replayed":
+            db.rollback()
+            response.headers["Idempotency-Replayed"] = "true"
+            return IncidentLogRead.model_validate(row)
+        if status == "coalesced":
+            # Folded into a live incident: the bumped counters are the record, no new audit entry
+            db.commit()
+            response.headers["Incident-Coalesced"] = "true"
+            return IncidentLogRead.model_validate(row)
+        append_audit_log(
+            db,
+            actor=actor,
+            action="INCIDENT_CREATE",
+            resource_type="incident",
+            resource_id=str(row.id),
+            request_meta={"service": row.service, "severity": row.severity},
+            result_ids=None,
+            commit=False,
+        )
+        db.commit()
+    except IdempotencyConflict:
+        db.rollback()
+        raise HTTPException(status_code=409, detail="A concurrent request is using this idempotency key; retry")
+    except Exception:
+        db.rollback()
+        raise
+    return IncidentLogRead.model_validate(row)
+
+
+@router.post("/incidents:bulk", response_model=BulkCreateResult, dependencies=[Depends(rate_limited("write"))])
+def bulk_create_incidents_route(
+    payload: List[Dict[str, Any]] = Body(...),
+    db: Session = Depends(get_db),
+    actor: ActorContext = Depends(get_actor),
+    idempotency_key: Optional[str] = Header(default=None, alias="Idempotency-Key", max_length=255),
+):
+    """
+    With an Idempotency-Key header each item is keyed by the header and its index,
+    so replaying the request replays every item; otherwise items with external_id
+    are keyed by source + external_id. Replayed items return the original row.
+    """
+    if len(payload) > BULK_MAX_ITEMS:
+        raise HTTPException(status_code=413, detail=f"At most {BULK_MAX_ITEMS} incidents per bulk request")
+
+    # Items are validated one by one so a bad item fails alone instead of the whole batch
+    results: List[Optional[BulkItemResult]] = [None] * len(payload)
+    valid: List[IncidentLogCreate] = []
+    positions: List[int] = []
+    for i, item in enumerate(payload):
+        try:
+            valid.append(IncidentLogCreate.model_validate(item))
+            positions.append(i)
+        except ValidationError as e:
+            results[i] = BulkItemResult(index=i, status="invalid", error=validation_message(e))
+
+    try:
+        outcomes = create_incidents_once(
+            db,
+            tenant_id=actor.tenant_id,
+            incidents=valid,
+            keys=[incident_key(incident, idempotency_key, i) for incident, i in zip(valid, positions)],
+            coalesce=INGEST_COALESCE,
+        )
+        created = [row for row, status in outcomes if status == "created"]
+        if created:
+            append_audit_logs(
+                db,
+                actor=actor,
+                action="INCIDENT_CREATE",
+                resource_type="incident",
+                entries=[
+                    {"resource_id": str(row.id), "request_meta": {"service": row.service, "severity": row.severity, "bulk": True}}
+                    for row in created
+                ],
+            )
+        else:
+            db.commit()
+    except IdempotencyConflict:
+        db.rollback()
+        raise HTTPException(status_code=409, detail="A concurrent request is using one of these idempotency keys; retry")
+    except Exception:
+        db.rollback()
+        raise
+
+    for i, (row, status) in zip(positions, outcomes):
+        results[i] = BulkItemResult(index=i, status=status, incident=IncidentLogRead.model_validate(row))
+    return BulkCreateResult(
+        created=len(created),
+        coalesced=sum(status == "coalesced" for _, status in outcomes),
+        replayed=sum(status == "replayed" for _, status in outcomes),
+        failed=len(payload) - len(outcomes),
+        results=results,
+    )
+
+
+@router.post("/incidents:import", dependencies=[Depends(rate_limited("write"))])
+async def import_incidents_route(
+    request: Request,
+    results: str = Query(default="lines", pattern="^(lines|summary)$"),
+    db: Session = Depends(get_db),
+    actor: ActorContext = Depends(get_actor),
+    idempotency_key: Optional[str] = Header(default=None, alias="Idempotency-Key", max_length=255),
+):
+    """
+    NDJSON body, one incident per line. The body is read as it arrives and written in
+    batches of IMPORT_BATCH_SIZE; each batch commits with its own audit segment.
+    Lines are keyed like bulk items (header plus line number, or source + external_id),
+    so re-running an interrupted import replays the lines that already committed.
+    Responds with one NDJSON result per non-blank line plus a summary line, or with
+    just the summary when results=summary. The response starts once the whole body has
+    been read: most clients (httpx, requests, curl) only read after they finish sending,
+    so results streamed during the upload would stall both sides once the socket buffers
+    filled. Backpressure keeps the client sending until the last batches, so the wait
+    after the upload is at most IMPORT_MAX_IN_FLIGHT batches.
+    """
+    summary = ImportSummary()
+    # Per-line results of a large import spill to disk instead of growing in memory
+    out = tempfile.SpooledTemporaryFile(max_size=IMPORT_SPOOL_BYTES) if results == "lines" else None
+
+    async def process(batch):
+        return await run_in_threadpool(import_batch, db, actor, batch, idempotency_key, INGEST_COALESCE)
+
+    batches = batched(ndjson_lines(request.stream(), IMPORT_MAX_LINE_BYTES), IMPORT_BATCH_SIZE)
+    try:
+        async for batch_results in pipelined(batches, process, IMPORT_MAX_IN_FLIGHT):
+            summary.add(batch_results)
+            if out is not None:
+                out.write(b"".join(json.dumps(r).encode() + b"\n" for r in batch_results))
+    except BaseException:
+        if out is not None:
+            out.close()
+        raise
+
+    if out is None:
+        return {"summary": summary.as_dict()}
+    out.write(json.dumps({"summary": summary.as_dict()}).encode() + b"\n")
+    out.seek(0)
+    return StreamingResponse(
+        iter(lambda: out.read(64 * 1024), b""),
+        media_type="application/x-ndjson",
+        background=BackgroundTask(out.close),
     )
-    return obj
 
 
-@router.get("/incidents/{incident_id}", response_model=IncidentLogRead)
+@router.get("/incidents/{incident_id}", response_model=IncidentLogRead, dependencies=[Depends(rate_limited("read"))])
 def get_incident_route(
     incident_id: int,
     db: Session = Depends(get_db),
@@ -86,7 +251,7 @@ def get_incident_route(
     return obj
 
 
-@router.get("/incidents/{incident_id}/raw", response_model=IncidentRawRead)
+@router.get("/incidents/{incident_id}/raw", response_model=IncidentRawRead, dependencies=[Depends(rate_limited("read"))])
 def get_incident_raw_route(
     incident_id: int,
     db: Session = Depends(get_db),
@@ -95,7 +260,7 @@ def get_incident_raw_route(
     # Only responder/admin can see raw
     require_role(actor, {"responder", "admin"})
 
-    obj = get_incident_by_id(db, tenant_id=actor.tenant_id, incident_id=incident_id, include_deleted=False)
+    obj = get_incident_raw(db, tenant_id=actor.tenant_id, incident_id=incident_id)
     if not obj:
         raise HTTPException(status_code=404, detail="Incident not found")
 
@@ -111,7 +276,7 @@ def get_incident_raw_route(
     return obj
 
 
-@router.patch("/incidents/{incident_id}", response_model=IncidentLogRead)
+@router.patch("/incidents/{incident_id}", response_model=IncidentLogRead, dependencies=[Depends(rate_limited("write"))])
 def update_incident_route(
     incident_id: int,
     payload: UpdateIncident,
@@ -120,23 +285,28 @@ def update_incident_route(
 ):
     require_role(actor, {"responder", "admin"})
 
-    obj = update_incident(db, tenant_id=actor.tenant_id, incident_id=incident_id, update=payload)
-    if not obj:
-        raise HTTPException(status_code=404, detail="Incident not found")
-
-    append_audit_log(
-        db,
-        actor=actor,
-        action="INCIDENT_UPDATE",
-        resource_type="incident",
-        resource_id=str(incident_id),
-        request_meta={"message_changed": payload.message is not None},
-        result_ids=None,
-    )
-    return obj
-
-
-@router.delete("/incidents/{incident_id}", response_model=IncidentLogRead)
+    try:
+        row = update_incident(db, tenant_id=actor.tenant_id, incident_id=incident_id, update=payload)
+        if row is None:
+            raise HTTPException(status_code=404, detail="Incident not found")
+        append_audit_log(
+            db,
+            actor=actor,
+            action="INCIDENT_UPDATE",
+            resource_type="incident",
+            resource_id=str(incident_id),
+            request_meta={"message_changed": payload.message is not None},
+            result_ids=None,
+            commit=False,
+        )
+        db.commit()
+    except Exception:
+        db.rollback()
+        raise
+    return IncidentLogRead.model_validate(row)
+
+
+@router.delete("/incidents/{incident_id}", response_model=IncidentLogRead, dependencies=[Depends(rate_limited("write"))])
 def delete_incident_route(
     incident_id: int,
     db: Session = Depends(get_db),
@@ -144,46 +314,120 @@ def delete_incident_route(
 ):
     require_role(actor, {"admin"})
 
-    obj = delete_incident_soft(db, tenant_id=actor.tenant_id, incident_id=incident_id, deleted_by=actor.actor_id)
-    if not obj:
-        raise HTTPException(status_code=404, detail="Incident not found")
+    try:
+        row = delete_incident_soft(db, tenant_id=actor.tenant_id, incident_id=incident_id, deleted_by=actor.actor_id)
+        if row is None:
+            raise HTTPException(status_code=404, detail="Incident not found")
+        append_audit_log(
+            db,
+            actor=actor,
+            action="INCIDENT_DELETE",
+            resource_type="incident",
+            resource_id=str(incident_id),
+            request_meta=None,
+            result_ids=None,
+            commit=False,
+        )
+        db.commit()
+    except Exception:
+        db.rollback()
+        raise
+    return IncidentLogRead.model_validate(row)
+
+
+@router.get("/search", response_model=List[IncidentLogRead], dependencies=[Depends(rate_limited("search"))])
+def search_route(
+    q: str = Query(..., min_length=1),
+    top_k: int = Query(default=5, ge=1, le=50),
+    ef_search: Optional[int] = Query(default=None, ge=1, le=1000),
+    probes: Optional[int] = Query(default=None, ge=1, le=1000),
+    mode: Optional[str] = Query(default=None, pattern="^(hybrid|ilike)$"),
+    service: Optional[str] = Query(default=None),
+    severity: Optional[List[str]] = Query(default=None),
+    min_severity: Optional[str] = Query(default=None, pattern="^(" + "|".join(SEVERITY_LEVELS) + ")$"),
+    source: Optional[str] = Query(default=None),
+    tags: Optional[List[str]] = Query(default=None),
+    stack_fingerprint: Optional[str] = Query(default=None, min_length=64, max_length=64),
+    created_after: Optional[datetime] = Query(default=None),
+    created_before: Optional[datetime] = Query(default=None),
+    db: Session = Depends(get_db),
+    actor: ActorContext = Depends(get_actor),
+):
+    require_role(actor, {"viewer", "responder", "auditor", "admin"})
+
+    if min_severity is not None:
+        allowed = severities_at_least(min_severity)
+        severity = [s for s in severity if s in allowed] if severity else allowed
+    filters = SearchFilters(
+        service=service,
+        severity=severity,
+        source=source,
+        tags=tags,
+        stack_fingerprint=stack_fingerprint,
+        created_after=created_after,
+        created_before=created_before,
+    )
+
+    try:
+        results = search_incidents(
+            db,
+            tenant_id=actor.tenant_id,
+            query=q,
+            top_k=top_k,
+            ef_search=ef_search,
+            probes=probes,
+            mode=mode,
+            filters=filters,
+        )
+    except CircuitOpenError as e:
+        raise HTTPException(
+            status_code=503,
+            detail="Embedding provider unavailable (circuit open); search is temporarily disabled",
+            headers={"Retry-After": str(max(1, int(e.retry_after + 0.999)))},
+        )
 
     append_audit_log(
         db,
         actor=actor,
-        action="INCIDENT_DELETE",
+        action="INCIDENT_SEARCH",
         resource_type="incident",
-        resource_id=str(incident_id),
-        request_meta=None,
-        result_ids=None,
+        resource_id=None,
+        request_meta={"query": redact_text(q), "top_k": top_k, "filters": filters.model_dump(mode="json", exclude_none=True)},
+        result_ids=[r.id for r in results],
     )
-    return obj
+    return results
 
 
-@router.get("/search", response_model=List[IncidentLogRead])
-def search_route(
-    q: str = Query(..., min_length=1),
-    top_k: int = Query(default=5, ge=1, le=50),
+@router.get("/stack-fingerprints", response_model=List[StackFingerprintCount], dependencies=[Depends(rate_limited("read"))])
+def top_stack_fingerprints_route(
+    hours: int = Query(default=24, ge=1, le=24 * 90),
+    limit: int = Query(default=10, ge=1, le=100),
     db: Session = Depends(get_db),
     actor: ActorContext = Depends(get_actor),
 ):
+    """
+    Most frequent stack fingerprints over the last `hours` (whole hours, from the
+    hourly rollup), with a sample incident for each. Use the fingerprint as the
+    stack_fingerprint filter on /search to list the incidents behind it.
+    """
     require_role(actor, {"viewer", "responder", "auditor", "admin"})
 
-    results = search_incidents(db, tenant_id=actor.tenant_id, query=q, top_k=top_k)
+    since = datetime.now(timezone.utc) - timedelta(hours=hours)
+    rows = top_stack_fingerprints(db, tenant_id=actor.tenant_id, since=since, limit=limit)
 
     append_audit_log(
         db,
         actor=actor,
-        action="INCIDENT_SEARCH",
+        action="STACK_FINGERPRINTS_READ",
         resource_type="incident",
         resource_id=None,
-        request_meta={"query": redact_text(q), "top_k": top_k},
-        result_ids=[r.id for r in results],
+        request_meta={"hours": hours, "limit": limit},
+        result_ids=[r.sample_incident_id for r in rows],
     )
-    return results
+    return [StackFingerprintCount.model_validate(r, from_attributes=True) for r in rows]
 
 
-@router.post("/admin/api-keys", response_model=ApiKeyCreated)
+@router.post("/admin/api-keys", response_model=ApiKeyCreated, dependencies=[Depends(rate_limited("write"))])
 def create_api_key_route(
     payload: ApiKeyCreate,
     db: Session = Depends(get_db),
@@ -217,7 +461,88 @@ def create_api_key_route(
     )
 
 
-@router.get("/audit-logs", response_model=List[AuditLogRead])
+@router.get("/admin/api-keys", response_model=List[ApiKeyRead], dependencies=[Depends(rate_limited("read"))])
+def list_api_keys_route(
+    db: Session = Depends(get_db),
+    actor: ActorContext = Depends(get_actor),
+):
+    require_role(actor, {"admin"})
+    # last_used_at lags real use by up to KEY_USAGE_FLUSH_SECONDS
+    return list_api_keys(db, actor.tenant_id)
+
+
+@router.post("/admin/api-keys/{key_id}/revoke", response_model=ApiKeyRead, dependencies=[Depends(rate_limited("write"))])
+def revoke_api_key_route(
+    key_id: int,
+    db: Session = Depends(get_db),
+    actor: ActorContext = Depends(get_actor),
+):
+    require_role(actor, {"admin"})
+
+    try:
+        row = revoke_api_key(db, tenant_id=actor.tenant_id, key_id=key_id)
+        if row is None:
+            raise HTTPException(status_code=404, detail="API key not found")
+        append_audit_log(
+            db,
+            actor=actor,
+            action="API_KEY_REVOKE",
+            resource_type="api_key",
+            resource_id=str(key_id),
+            request_meta={"role": row.role, "name": row.name},
+            result_ids=None,
+            commit=False,
+        )
+        db.commit()
+    except Exception:
+        db.rollback()
+        raise
+    return ApiKeyRead.model_validate(row)
+
+
+@router.post("/admin/api-keys/{key_id}/rotate", response_model=ApiKeyRotated, dependencies=[Depends(rate_limited("write"))])
+def rotate_api_key_route(
+    key_id: int,
+    grace_seconds: int = Query(default=0, ge=0, le=7 * 24 * 3600),
+    db: Session = Depends(get_db),
+    actor: ActorContext = Depends(get_actor),
+):
+    require_role(actor, {"admin"})
+
+    try:
+        try:
+            rotated = rotate_api_key(db, tenant_id=actor.tenant_id, key_id=key_id, grace_seconds=grace_seconds)
+        except KeyNotRotatable as e:
+            raise HTTPException(status_code=409, detail=str(e))
+        if rotated is None:
+            raise HTTPException(status_code=404, detail="API key not found")
+        new, plain, old = rotated
+        append_audit_log(
+            db,
+            actor=actor,
+            action="API_KEY_ROTATE",
+            resource_type="api_key",
+            resource_id=str(key_id),
+            request_meta={"new_key_id": new.id, "grace_seconds": grace_seconds},
+            result_ids=None,
+            commit=False,
+        )
+        db.commit()
+    except Exception:
+        db.rollback()
+        raise
+    return ApiKeyRotated(
+        id=new.id,
+        tenant_id=new.tenant_id,
+        actor_id=new.actor_id,
+        role=new.role,
+        name=new.name,
+        api_key=plain,
+        previous=ApiKeyRead.model_validate(old),
+    )
+
+
+@router.get("/audit-logs", response_model=List[AuditLogRead], dependencies=[Depends(rate_limited("read"))])
 def list_audit_logs_route(
     limit: int = Query(default=50, ge=1, le=500),
     db: Session = Depends(get_db),
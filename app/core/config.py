@@ -7,9 +7,156 @@ load_dotenv()
 EMBEDDINGS_PROVIDER = os.getenv("EMBEDDINGS_PROVIDER", "openai").lower()
 DATABASE_URL = os.getenv("DATABASE_URL", "")
 OPENAI_API_KEY = os.getenv("OPENAI_API_KEY", "")
+OPENAI_BASE_URL = os.getenv("OPENAI_BASE_URL", "")
 
 VECTOR_DIM = int(os.getenv("VECTOR_DIM", "1536"))
 
+# Embedding cache: in-process LRU (entries) + optional Postgres tier
+EMBED_CACHE_SIZE = int(os.getenv("EMBED_CACHE_SIZE", "4096"))
+EMBED_CACHE_DB = os.getenv("EMBED_CACHE_DB", "").lower() in ("1", "true", "yes")
+# Rows in the embedding_cache table older than this are removed by app.scripts.purge_embedding_cache
+EMBED_CACHE_DB_TTL_DAYS = int(os.getenv("EMBED_CACHE_DB_TTL_DAYS", "30"))
+
+if EMBED_CACHE_DB_TTL_DAYS < 1:
+    raise RuntimeError("EMBED_CACHE_DB_TTL_DAYS must be positive")
+
+# Provider client: one pooled client per process, coalescing concurrent single-text calls
+EMBED_TIMEOUT_SECONDS = float(os.getenv("EMBED_TIMEOUT_SECONDS", "10"))
+EMBED_MAX_IN_FLIGHT = int(os.getenv("EMBED_MAX_IN_FLIGHT", "8"))
+EMBED_BATCH_WINDOW_MS = float(os.getenv("EMBED_BATCH_WINDOW_MS", "5"))
+EMBED_MAX_BATCH_SIZE = int(os.getenv("EMBED_MAX_BATCH_SIZE", "256"))
+
+# Circuit breaker around the provider path (failures + calls over the latency budget)
+EMBED_BREAKER_FAILURE_RATE = float(os.getenv("EMBED_BREAKER_FAILURE_RATE", "0.5"))
+EMBED_BREAKER_MIN_CALLS = int(os.getenv("EMBED_BREAKER_MIN_CALLS", "10"))
+EMBED_BREAKER_WINDOW = int(os.getenv("EMBED_BREAKER_WINDOW", "20"))
+EMBED_BREAKER_LATENCY_BUDGET_SECONDS = float(os.getenv("EMBED_BREAKER_LATENCY_BUDGET_SECONDS", "2"))
+EMBED_BREAKER_OPEN_SECONDS = float(os.getenv("EMBED_BREAKER_OPEN_SECONDS", "30"))
+EMBED_BREAKER_HALF_OPEN_CALLS = int(os.getenv("EMBED_BREAKER_HALF_OPEN_CALLS", "3"))
+
+# ANN index on incident_logs.embedding (read by the model and its migration)
+ANN_INDEX_TYPE = os.getenv("ANN_INDEX_TYPE", "hnsw").lower()  # hnsw | ivfflat
+HNSW_M = int(os.getenv("HNSW_M", "16"))
+HNSW_EF_CONSTRUCTION = int(os.getenv("HNSW_EF_CONSTRUCTION", "64"))
+IVFFLAT_LISTS = int(os.getenv("IVFFLAT_LISTS", "100"))
+
+# Per-request recall knobs (defaults; /api/search can override)
+SEARCH_HNSW_EF_SEARCH = int(os.getenv("SEARCH_HNSW_EF_SEARCH", "40"))
+SEARCH_IVFFLAT_PROBES = int(os.getenv("SEARCH_IVFFLAT_PROBES", "10"))
+# Without pgvector >= 0.8 iterative scans, filters at or under this many rows are ranked exactly
+SEARCH_EXACT_MAX_ROWS = int(os.getenv("SEARCH_EXACT_MAX_ROWS", "10000"))
+
+# Search ranking: "hybrid" fuses full-text and vector ranks (RRF), "ilike" is the legacy substring prefilter
+SEARCH_MODE = os.getenv("SEARCH_MODE", "hybrid").lower()
+SEARCH_RRF_K = int(os.getenv("SEARCH_RRF_K", "60"))
+SEARCH_CANDIDATES = int(os.getenv("SEARCH_CANDIDATES", "40"))  # per ranked list, never below top_k
+
+if ANN_INDEX_TYPE not in ("hnsw", "ivfflat"):
+    raise RuntimeError(f"ANN_INDEX_TYPE must be hnsw or ivfflat, got {ANN_INDEX_TYPE!r}")
+
+if SEARCH_MODE not in ("hybrid", "ilike"):
+    raise RuntimeError(f"SEARCH_MODE must be hybrid or ilike, got {SEARCH_MODE!r}")
+
+# Redaction of large messages: chunk size (chars) and the seam overlap, which bounds the longest exact match
+REDACT_CHUNK_SIZE = int(os.getenv("REDACT_CHUNK_SIZE", str(1 << 20)))
+REDACT_CHUNK_OVERLAP = int(os.getenv("REDACT_CHUNK_OVERLAP", "8192"))
+
+if REDACT_CHUNK_SIZE < 1 or REDACT_CHUNK_OVERLAP < 1:
+    raise RuntimeError("REDACT_CHUNK_SIZE and REDACT_CHUNK_OVERLAP must be positive")
+
+# POST /api/incidents:bulk: most items accepted per request
+BULK_MAX_ITEMS = int(os.getenv("BULK_MAX_ITEMS", "1000"))
+
+# Idempotent ingest: how long a create's Idempotency-Key / source+external_id replays the original row
+IDEMPOTENCY_TTL_SECONDS = int(os.getenv("IDEMPOTENCY_TTL_SECONDS", str(24 * 3600)))
+
+if IDEMPOTENCY_TTL_SECONDS < 1:
+    raise RuntimeError("IDEMPOTENCY_TTL_SECONDS must be positive")
+
+# Alert-storm coalescing at ingest: fold an incident into a live one in the same tenant + service seen
+# within the window, matched by fingerprint or, when COALESCE_MAX_DISTANCE > 0, by cosine distance
+INGEST_COALESCE = os.getenv("INGEST_COALESCE", "false").lower() in ("1", "true", "yes")
+COALESCE_WINDOW_SECONDS = int(os.getenv("COALESCE_WINDOW_SECONDS", "900"))
+COALESCE_MAX_DISTANCE = float(os.getenv("COALESCE_MAX_DISTANCE", "0"))
+
+if COALESCE_WINDOW_SECONDS < 1 or not 0 <= COALESCE_MAX_DISTANCE < 2:
+    raise RuntimeError("COALESCE_WINDOW_SECONDS must be positive and COALESCE_MAX_DISTANCE in [0, 2)")
+
+# POST /api/incidents:import (NDJSON): lines per batch, parsed batches queued ahead of the writer,
+# longest accepted line, and how much of the per-line result stream is kept in memory before spilling to disk
+IMPORT_BATCH_SIZE = int(os.getenv("IMPORT_BATCH_SIZE", "500"))
+IMPORT_MAX_IN_FLIGHT = int(os.getenv("IMPORT_MAX_IN_FLIGHT", "2"))
+IMPORT_MAX_LINE_BYTES = int(os.getenv("IMPORT_MAX_LINE_BYTES", str(8 << 20)))
+IMPORT_SPOOL_BYTES = int(os.getenv("IMPORT_SPOOL_BYTES", str(1 << 20)))
+
+if min(IMPORT_BATCH_SIZE, IMPORT_MAX_IN_FLIGHT, IMPORT_MAX_LINE_BYTES) < 1:
+    raise RuntimeError("IMPORT_BATCH_SIZE, IMPORT_MAX_IN_FLIGHT and IMPORT_MAX_LINE_BYTES must be positive")
+
+# API-key auth cache: sha256(key) -> actor for AUTH_CACHE_TTL_SECONDS, unknown keys for AUTH_NEGATIVE_TTL_SECONDS.
+# Negatives live in their own LRU so a flood of guessed keys cannot evict real ones. AUTH_CACHE_SIZE=0 disables both.
+AUTH_CACHE_SIZE = int(os.getenv("AUTH_CACHE_SIZE", "10000"))
+AUTH_CACHE_TTL_SECONDS = float(os.getenv("AUTH_CACHE_TTL_SECONDS", "30"))
+AUTH_NEGATIVE_CACHE_SIZE = int(os.getenv("AUTH_NEGATIVE_CACHE_SIZE", "10000"))
+AUTH_NEGATIVE_TTL_SECONDS = float(os.getenv("AUTH_NEGATIVE_TTL_SECONDS", "5"))
+
+if AUTH_CACHE_TTL_SECONDS <= 0 or AUTH_NEGATIVE_TTL_SECONDS <= 0:
+    raise RuntimeError("AUTH_CACHE_TTL_SECONDS and AUTH_NEGATIVE_TTL_SECONDS must be positive")
+
+# api_keys.last_used_at is buffered in memory and written in one batch per interval
+KEY_USAGE_FLUSH_SECONDS = float(os.getenv("KEY_USAGE_FLUSH_SECONDS", "10"))
+
+if KEY_USAGE_FLUSH_SECONDS <= 0:
+    raise RuntimeError("KEY_USAGE_FLUSH_SECONDS must be positive")
+
+# Token-bucket rate limits per API key and per tenant, with separate budgets for search, write and read routes.
+# Each budget is "<requests per second>:<burst>"; a rate of 0 turns that bucket off.
+RATE_LIMIT_BACKEND = os.getenv("RATE_LIMIT_BACKEND", "memory").lower()  # memory | postgres | redis | none
+
+
+def _budget(name: str, default: str) -> tuple:
+    raw = os.getenv(name, default)
+    try:
+        rate, burst = (float(part) for part in raw.split(":"))
+    except ValueError:
+        raise RuntimeError(f"{name} must look like <rate>:<burst>, got {raw!r}") from None
+    if rate < 0 or (rate > 0 and burst < 1):
+        raise RuntimeError(f"{name} needs rate >= 0 and burst >= 1, got {raw!r}")
+    return rate, burst
+
+
+RATE_LIMIT_SEARCH_PER_KEY = _budget("RATE_LIMIT_SEARCH_PER_KEY", "20:40")
+RATE_LIMIT_SEARCH_PER_TENANT = _budget("RATE_LIMIT_SEARCH_PER_TENANT", "80:160")
+RATE_LIMIT_WRITE_PER_KEY = _budget("RATE_LIMIT_WRITE_PER_KEY", "50:100")
+RATE_LIMIT_WRITE_PER_TENANT = _budget("RATE_LIMIT_WRITE_PER_TENANT", "200:400")
+RATE_LIMIT_READ_PER_KEY = _budget("RATE_LIMIT_READ_PER_KEY", "100:200")
+RATE_LIMIT_READ_PER_TENANT = _budget("RATE_LIMIT_READ_PER_TENANT", "400:800")
+
+if RATE_LIMIT_BACKEND not in ("memory", "postgres", "redis", "none"):
+    raise RuntimeError(f"RATE_LIMIT_BACKEND must be memory, postgres, redis or none, got {RATE_LIMIT_BACKEND!r}")
+
+if RATE_LIMIT_BACKEND == "redis" and not os.getenv("REDIS_URL"):
+    raise RuntimeError("RATE_LIMIT_BACKEND=redis needs REDIS_URL")
+
+# Cross-process invalidation of those caches when keys or incidents change: postgres (LISTEN/NOTIFY) | redis | none
+INVALIDATION_BACKEND = os.getenv("INVALIDATION_BACKEND", "postgres").lower()
+REDIS_URL = os.getenv("REDIS_URL", "")
+
+if INVALIDATION_BACKEND not in ("postgres", "redis", "none"):
+    raise RuntimeError(f"INVALIDATION_BACKEND must be postgres, redis or none, got {INVALIDATION_BACKEND!r}")
+
+if INVALIDATION_BACKEND == "redis" and not REDIS_URL:
+    raise RuntimeError("INVALIDATION_BACKEND=redis needs REDIS_URL")
+
+# Embedding pipeline: "sync" embeds in the request, "async" leaves rows pending for the worker
+EMBED_PIPELINE = os.getenv("EMBED_PIPELINE", "sync").lower()
+EMBED_WORKER_IN_PROCESS = os.getenv("EMBED_WORKER_IN_PROCESS", "true").lower() in ("1", "true", "yes")
+EMBED_WORKER_BATCH_SIZE = int(os.getenv("EMBED_WORKER_BATCH_SIZE", "64"))
+EMBED_WORKER_CONCURRENCY = int(os.getenv("EMBED_WORKER_CONCURRENCY", "2"))
+EMBED_WORKER_POLL_SECONDS = float(os.getenv("EMBED_WORKER_POLL_SECONDS", "0.5"))
+EMBED_MAX_ATTEMPTS = int(os.getenv("EMBED_MAX_ATTEMPTS", "5"))
+EMBED_RETRY_BASE_SECONDS = float(os.getenv("EMBED_RETRY_BASE_SECONDS", "5"))
+EMBED_RETRY_MAX_SECONDS = float(os.getenv("EMBED_RETRY_MAX_SECONDS", "600"))
+
 if not DATABASE_URL:
     raise RuntimeError("DATABASE_URL is not set")
 
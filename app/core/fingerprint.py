@@ -0,0 +1,98 @@
+# core/fingerprint.py
+#
+# Alert fingerprints for storm coalescing. Volatile tokens (ids, addresses, numbers,
+# timestamps) are replaced with placeholders so repeats of one alert template hash
+# the same. Runs on redacted text, whose [REDACTED_*] markers are already stable.
+
+import re
+from typing import Optional
+
+from app.security.hashing import sha256_hex
+
+# Order matters: each pattern runs on the output of the one before it
+_VOLATILE = [
+    (re.compile(r"\b[0-9a-f]{8}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{12}\b"), "<uuid>"),
+    (re.compile(r"\b\d{4}-\d{2}-\d{2}(?:[t ]\d{2}:\d{2}(?::\d{2}(?:\.\d+)?)?(?:z|[+-]\d{2}:?\d{2})?)?\b"), "<ts>"),
+    (re.compile(r"\b\d{1,3}(?:\.\d{1,3}){3}(?::\d+)?\b"), "<ip>"),
+    # Hex ids with at least one digit: trace ids, hashes, pod and instance suffixes
+    (re.compile(r"\b(?=[0-9a-f]*\d)[0-9a-f]{4,}\b"), "<hex>"),
+    (re.compile(r"\d+(?:\.\d+)?"), "<n>"),
+    (re.compile(r"\s+"), " "),
+]
+
+
+def normalize_alert_text(text: str) -> str:
+    """Lowercased text with volatile tokens replaced by placeholders."""
+    out = text.lower()
+    for pattern, placeholder in _VOLATILE:
+        out = pattern.sub(placeholder, out)
+    return out.strip()
+
+
+def message_fingerprint(title: Optional[str], message_redacted: str) -> str:
+    """sha256 of the normalized title and redacted message."""
+    return sha256_hex(normalize_alert_text(title or "") + "\n" + normalize_alert_text(message_redacted))
+
+
+# Stack traces: the exception type plus the innermost frames, with line numbers,
+# addresses, ids and deploy-specific path prefixes removed
+STACK_FRAMES = 5
+
+_PY_FRAME = re.compile(r'^\s*File "(?P<file>[^"]+)", line \d+, in (?P<func>\S+)')
+_AT_FRAME = re.compile(r"^\s*at\s+(?P<frame>\S.*)$")  # Java, JS, .NET
+_GO_FRAME = re.compile(r"^(?P<func>[\w./*()-]+)\(.*\)$")  # goroutine dump: the call line; its file line follows
+_EXC_LINE = re.compile(r"^(?P<type>[A-Za-z_][\w.$]*(?:Error|Exception|Exc|Panic|Fault|Interrupt|Exit))\b")
+
+_FRAME_NOISE = [
+    (re.compile(r"0x[0-9a-fA-F]+"), ""),
+    (re.compile(r":\d+(?::\d+)?"), ""),
+    (re.compile(r"\$\$?Lambda\$?[\w/$]*"), "$$Lambda"),
+    (re.compile(r"\s+"), " "),
+]
+
+
+def _short_path(path: str) -> str:
+    # /srv/app-1.4.2/app/api/routes.py and /app/app/api/routes.py are the same frame
+    parts = [p for p in re.split(r"[\\/]", path) if p]
+    return "/".join(parts[-2:])
+
+
+def _clean_frame(frame: str) -> str:
+    frame = re.sub(r"\(([^()]*[\\/])?([^()\\/]+)\)", lambda m: "(" + m.group(2) + ")", frame)
+    for pattern, placeholder in _FRAME_NOISE:
+        frame = pattern.sub(placeholder, frame)
+    return frame.strip()
+
+
+def stack_fingerprint(stack_trace: Optional[str], frames: int = STACK_FRAMES) -> Optional[str]:
+    """
+    sha256 of the exception type and the innermost `frames` frames, or None for an
+    empty trace. Python tracebacks list the innermost frame last, the other formats
+    first; a trace with no recognizable frames falls back to its normalized text.
+    """
+    if not stack_trace or not stack_trace.strip():
+        return None
+
+    lines = stack_trace.splitlines()
+    found = []
+    exc_type = ""
+    python = "Traceback (most recent call last)" in stack_trace
+    for line in lines:
+        m = _PY_FRAME.match(line)
+        if m:
+            found.append(f"{_short_path(m.group('file'))}:{m.group('func')}")
+            continue
+        m = _AT_FRAME.match(line) or _GO_FRAME.match(line.strip())
+        if m and not python:
+            found.append(_clean_frame(m.group(1)))
+            continue
+        m = _EXC_LINE.match(line.strip())
+        if m and not exc_type:
+            exc_type = m.group("type")
+
+    if python:
+        found.reverse()
+    if not found:
+        head = [normalize_alert_text(line) for line in lines if line.strip()][:frames]
+        return sha256_hex("text\n" + "\n".join(head))
+    return sha256_hex(exc_type + "\n" + "\n".join(found[:frames]))
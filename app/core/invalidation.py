@@ -0,0 +1,251 @@
+# core/invalidation.py
+#
+# Cross-process invalidation bus for in-process caches. Writers queue (topic, key)
+# on their session; when the transaction commits every API process, this one
+# included, runs the handlers subscribed to that topic. Nothing is sent on rollback.
+#
+# Backends (INVALIDATION_BACKEND):
+#   postgres  one pg_notify per transaction, issued just before COMMIT so Postgres
+#             delivers it atomically with the write; one LISTEN connection per process
+#   redis     PUBLISH right after COMMIT (needs the redis package and REDIS_URL)
+#   none      handlers in this process only
+#
+# A listener that loses its connection may have missed messages, so on (re)connect
+# it calls every handler with key=None, which means "drop everything".
+
+import abc
+import json
+import logging
+import select
+import threading
+import time
+from typing import Callable, Dict, List, Optional
+
+from sqlalchemy import event, text
+from sqlalchemy.orm import Session
+
+from app.core import metrics
+from app.core.config import DATABASE_URL, INVALIDATION_BACKEND, REDIS_URL
+
+logger = logging.getLogger(__name__)
+
+CHANNEL = "incident_intel_invalidate"
+_PENDING = "invalidation_pending"
+
+Handler = Callable[[Optional[str]], None]
+_handlers: Dict[str, List[Handler]] = {}
+_redis_client = None
+
+
+def subscribe(topic: str, handler: Handler) -> None:
+    """Registers handler(key) for topic in this process. key=None means the whole cache is suspect."""
+    _handlers.setdefault(topic, []).append(handler)
+
+
+def publish(db: Session, topic: str, key: str) -> None:
+    """Queues an invalidation on db's current transaction; it is delivered only if the transaction commits."""
+    if not db.in_transaction():
+        # Begin now so a rollback before any statement still discards the message
+        db.begin()
+    db.info.setdefault(_PENDING, []).append((topic, key))
+
+
+def dispatch(topic: Optional[str], key: Optional[str]) -> None:
+    """Runs local handlers for topic, or for every topic with key=None when topic is None."""
+    topics = list(_handlers) if topic is None else [topic]
+    for t in topics:
+        for handler in _handlers.get(t, ()):
+            try:
+                handler(key)
+            except Exception:
+                logger.exception("invalidation handler failed for %s", t)
+
+
+def _payloads(pending) -> List[str]:
+    sent_at = time.time()
+    return [json.dumps([topic, key, sent_at]) for topic, key in dict.fromkeys(pending)]
+
+
+def _receive(payload: str) -> None:
+    try:
+        topic, key, sent_at = json.loads(payload)
+    except (ValueError, TypeError):
+        logger.warning("ignoring malformed invalidation payload %r", payload[:200])
+        return
+    metrics.inc("invalidation_messages_received_total", topic=topic)
+    metrics.set_gauge("invalidation_lag_seconds", max(0.0, time.time() - sent_at), topic=topic)
+    dispatch(topic, key)
+
+
+@event.listens_for(Session, "before_commit")
+def _notify_before_commit(session: Session) -> None:
+    pending = session.info.get(_PENDING)
+    if pending and INVALIDATION_BACKEND == "postgres":
+        # NOTIFY is transactional: listeners see it after COMMIT, and never if the commit fails
+        session.execute(
+            text("SELECT pg_notify(:channel, p) FROM unnest(CAST(:payloads AS text[])) AS p"),
+            {"channel": CHANNEL, "payloads": _payloads(pending)},
+        )
+
+
+@event.listens_for(Session, "after_commit")
+def _deliver_after_commit(session: Session) -> None:
+    pending = session.info.pop(_PENDING, None)
+    if not pending:
+        return
+    for topic, key in dict.fromkeys(pending):
+        metrics.inc("invalidation_messages_published_total", topic=topic)
+        dispatch(topic, key)
+    if INVALIDATION_BACKEND == "redis":
+        try:
+            client = _redis()
+            for payload in _payloads(pending):
+                client.publish(CHANNEL, payload)
+        except Exception:
+            # The write is already committed; the TTL on each cache bounds how long peers stay stale
+            logger.exception("redis invalidation publish failed")
+            metrics.inc("invalidation_publish_errors_total")
+
+
+@event.listens_for(Session, "after_soft_rollback")
+def _discard_on_rollback(session: Session, previous_transaction) -> None:
+    # Keep messages while an outer transaction survives a savepoint rollback
+    if not session.in_transaction():
+        session.info.pop(_PENDING, None)
+
+
+def _redis():
+    global _redis_client
+    if _redis_client is None:
+        import redis
+
+        _redis_client = redis.Redis.from_url(REDIS_URL)
+    return _redis_client
+
+
+class _Listener(abc.ABC):
+    """Daemon thread that feeds remote invalidations into dispatch(), reconnecting with backoff."""
+
+    poll_seconds = 1.0
+    max_backoff_seconds = 10.0
+
+    def __init__(self) -> None:
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self.connected = threading.Event()
+
+    def start(self) -> "_Listener":
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="invalidation-listener", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self, timeout: Optional[float] = 5.0) -> None:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+            self._thread = None
+
+    def _run(self) -> None:
+        backoff = 0.5
+        while not self._stop.is_set():
+            try:
+                self._connect()
+                # Anything published while we were not listening is lost
+                dispatch(None, None)
+                self.connected.set()
+                backoff = 0.5
+                while not self._stop.is_set():
+                    for payload in self._poll():
+                        _receive(payload)
+            except Exception:
+                logger.exception("invalidation listener disconnected")
+                metrics.inc("invalidation_listener_reconnects_total")
+            finally:
+                self.connected.clear()
+                self._close()
+            self._stop.wait(backoff)
+            backoff = min(backoff * 2, self.max_backoff_seconds)
+
+    @abc.abstractmethod
+    def _connect(self) -> None:
+        ...
+
+    @abc.abstractmethod
+    def _poll(self) -> List[str]:
+        ...
+
+    @abc.abstractmethod
+    def _close(self) -> None:
+        ...
+
+
+class PostgresListener(_Listener):
+    def __init__(self, database_url: str = DATABASE_URL) -> None:
+        super().__init__()
+        self.database_url = database_url
+        self._conn = None
+
+    def _connect(self) -> None:
+        import psycopg2
+        from sqlalchemy.engine import make_url
+
+        dsn = make_url(self.database_url).set(drivername="postgresql").render_as_string(hide_password=False)
+        self._conn = psycopg2.connect(dsn)
+        self._conn.autocommit = True
+        with self._conn.cursor() as cur:
+            cur.execute(f"LISTEN {CHANNEL}")
+
+    def _poll(self) -> List[str]:
+        # Wakes as soon as a notification arrives; the timeout only bounds how long stop() waits
+        if select.select([self._conn], [], [], self.poll_seconds) == ([], [], []):
+            return []
+        self._conn.poll()
+        out = [n.payload for n in self._conn.notifies]
+        self._conn.notifies.clear()
+        return out
+
+    def _close(self) -> None:
+        if self._conn is not None:
+            try:
+                self._conn.close()
+            except Exception:
+                pass
+            self._conn = None
+
+
+class RedisListener(_Listener):
+    def __init__(self, redis_url: str = REDIS_URL) -> None:
+        super().__init__()
+        self.redis_url = redis_url
+        self._pubsub = None
+
+    def _connect(self) -> None:
+        import redis
+
+        self._pubsub = redis.Redis.from_url(self.redis_url).pubsub(ignore_subscribe_messages=True)
+        self._pubsub.subscribe(CHANNEL)
+
+    def _poll(self) -> List[str]:
+        msg = self._pubsub.get_message(timeout=self.poll_seconds)
+        if msg is None or msg.get("type") != "message":
+            return []
+        data = msg["data"]
+        return [data.decode() if isinstance(data, bytes) else data]
+
+    def _close(self) -> None:
+        if self._pubsub is not None:
+            try:
+                self._pubsub.close()
+            except Exception:
+                pass
+            self._pubsub = None
+
+
+def start_listener() -> Optional[_Listener]:
+    """Starts this process's listener for the configured backend; None for INVALIDATION_BACKEND=none."""
+    if INVALIDATION_BACKEND == "postgres":
+        return PostgresListener().start()
+    if INVALIDATION_BACKEND == "redis":
+        return RedisListener().start()
+    return None
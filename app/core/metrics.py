@@ -0,0 +1,62 @@
+# core/metrics.py
+#
+# Minimal in-process metrics registry rendered in Prometheus text format at
+# GET /metrics. Counters only go up; gauges are set to the latest value.
+
+import threading
+from typing import Dict, Tuple
+
+_LabelKey = Tuple[Tuple[str, str], ...]
+
+_lock = threading.Lock()
+_counters: Dict[str, Dict[_LabelKey, float]] = {}
+_gauges: Dict[str, Dict[_LabelKey, float]] = {}
+
+
+def _key(labels: Dict[str, str]) -> _LabelKey:
+    return tuple(sorted((k, str(v)) for k, v in labels.items()))
+
+
+def inc(name: str, value: float = 1.0, **labels: str) -> None:
+    with _lock:
+        series = _counters.setdefault(name, {})
+        k = _key(labels)
+        series[k] = series.get(k, 0.0) + value
+
+
+def set_gauge(name: str, value: float, **labels: str) -> None:
+    with _lock:
+        _gauges.setdefault(name, {})[_key(labels)] = float(value)
+
+
+def get_value(name: str, **labels: str) -> float:
+    k = _key(labels)
+    with _lock:
+        for store in (_counters, _gauges):
+            if name in store and k in store[name]:
+                return store[name][k]
+    return 0.0
+
+
+def reset() -> None:
+    with _lock:
+        _counters.clear()
+        _gauges.clear()
+
+
+def _fmt(name: str, k: _LabelKey, value: float) -> str:
+    if not k:
+        return f"{name} {value:g}"
+    labels = ",".join(f'{lk}="{lv}"' for lk, lv in k)
+    return f"{name}{{{labels}}} {value:g}"
+
+
+def render_text() -> str:
+    lines = []
+    with _lock:
+        for kind, store in (("counter", _counters), ("gauge", _gauges)):
+            for name in sorted(store):
+                lines.append(f"# TYPE {name} {kind}")
+                for k, value in sorted(store[name].items()):
+                    lines.append(_fmt(name, k, value))
+    return "\n".join(lines) + "\n"
@@ -0,0 +1,259 @@
+# core/ratelimit.py
+#
+# Token-bucket rate limiting. Every request takes one token from a per-API-key and
+# a per-tenant bucket for its route class (search, write or read); both must have a
+# token or the request is refused with the wait until one refills.
+#
+# Backends (RATE_LIMIT_BACKEND):
+#   memory    per-process buckets; with N workers a client effectively gets N x the budget
+#   postgres  shared buckets in the UNLOGGED rate_limit_buckets table, one conditional
+#             upsert per bucket on an autocommit connection (never the request's transaction)
+#   redis     shared buckets updated by one Lua script, all-or-nothing across buckets
+#   none      no limits
+#
+# A shared backend that errors fails open: the request is let through and counted.
+
+import logging
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Callable, Dict, List, Optional, Tuple
+
+from sqlalchemy import text
+
+from app.core import metrics
+from app.core.config import (
+    RATE_LIMIT_BACKEND,
+    RATE_LIMIT_READ_PER_KEY,
+    RATE_LIMIT_READ_PER_TENANT,
+    RATE_LIMIT_SEARCH_PER_KEY,
+    RATE_LIMIT_SEARCH_PER_TENANT,
+    RATE_LIMIT_WRITE_PER_KEY,
+    RATE_LIMIT_WRITE_PER_TENANT,
+)
+
+logger = logging.getLogger(__name__)
+
+ROUTE_CLASSES = ("search", "write", "read")
+
+
+@dataclass(frozen=True)
+class Budget:
+    rate: float   # tokens added per second
+    burst: float  # bucket capacity
+
+
+# (bucket name, budget) pairs checked together for one request
+Buckets = List[Tuple[str, Budget]]
+# None when allowed, else (index of the bucket with the longest wait, seconds until it has a token)
+Denial = Optional[Tuple[int, float]]
+
+
+class RateLimited(Exception):
+    def __init__(self, route_class: str, scope: str, retry_after: float):
+        super().__init__(f"Rate limit exceeded for {route_class} requests per {scope}")
+        self.route_class = route_class
+        self.scope = scope
+        self.retry_after = retry_after
+
+
+class MemoryBuckets:
+    """All-or-nothing acquire over in-process buckets. Least recently used buckets beyond max_buckets are dropped (refilled)."""
+
+    blocking = False
+
+    def __init__(self, max_buckets: int = 100_000, clock: Callable[[], float] = time.monotonic):
+        self.max_buckets = max_buckets
+        self.clock = clock
+        self._buckets: "OrderedDict[str, List[float]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def acquire(self, buckets: Buckets, cost: float = 1.0) -> Denial:
+        now = self.clock()
+        with self._lock:
+            levels = []
+            denial: Denial = None
+            for i, (name, budget) in enumerate(buckets):
+                state = self._buckets.get(name)
+                level = budget.burst if state is None else min(budget.burst, state[0] + (now - state[1]) * budget.rate)
+                levels.append(level)
+                if level < cost:
+                    wait = (cost - level) / budget.rate
+                    if denial is None or wait > denial[1]:
+                        denial = (i, wait)
+            if denial is not None:
+                return denial
+            for (name, _), level in zip(buckets, levels):
+                self._buckets[name] = [level - cost, now]
+                self._buckets.move_to_end(name)
+            while len(self._buckets) > self.max_buckets:
+                self._buckets.popitem(last=False)
+        return None
+
+    def reset(self) -> None:
+        with self._lock:
+            self._buckets.clear()
+
+
+_PG_TAKE = text(
+    "INSERT INTO rate_limit_buckets AS b (bucket, tokens, updated_at) "
+    "VALUES (:bucket, :burst - :cost, clock_timestamp()) "
+    "ON CONFLICT (bucket) DO UPDATE SET "
+    "tokens = LEAST(:burst, b.tokens + EXTRACT(EPOCH FROM clock_timestamp() - b.updated_at) * :rate) - :cost, "
+    "updated_at = clock_timestamp() "
+    "WHERE LEAST(:burst, b.tokens + EXTRACT(EPOCH FROM clock_timestamp() - b.updated_at) * :rate) >= :cost "
+    "RETURNING tokens"
+)
+_PG_LEVEL = text(
+    "SELECT LEAST(:burst, tokens + EXTRACT(EPOCH FROM clock_timestamp() - updated_at) * :rate) "
+    "FROM rate_limit_buckets WHERE bucket = :bucket"
+)
+_PG_REFUND = text("UPDATE rate_limit_buckets SET tokens = LEAST(:burst, tokens + :cost) WHERE bucket = :bucket")
+
+
+class PostgresBuckets:
+    """
+    Shared buckets in rate_limit_buckets. Each bucket is taken atomically by one
+    conditional upsert; if a later bucket refuses, tokens already taken are refunded.
+    Times come from the database clock, so workers on different hosts agree.
+    """
+
+    blocking = True
+
+    def __init__(self, engine):
+        self.engine = engine.execution_options(isolation_level="AUTOCOMMIT")
+
+    def acquire(self, buckets: Buckets, cost: float = 1.0) -> Denial:
+        with self.engine.connect() as conn:
+            taken = []
+            for i, (name, budget) in enumerate(buckets):
+                params = {"bucket": name, "rate": budget.rate, "burst": budget.burst, "cost": cost}
+                if conn.execute(_PG_TAKE, params).first() is not None:
+                    taken.append(params)
+                    continue
+                for p in taken:
+                    conn.execute(_PG_REFUND, p)
+                level = conn.execute(_PG_LEVEL, params).scalar() or 0.0
+                return i, max(cost - level, 0.0) / budget.rate
+        return None
+
+    def reset(self) -> None:
+        with self.engine.connect() as conn:
+            conn.execute(text("DELETE FROM rate_limit_buckets"))
+
+
+# KEYS = bucket names; ARGV = cost, then rate and burst per key. Returns {0, "0"} or {1-based index, wait}.
+_REDIS_SCRIPT = """
+local now_parts = redis.call('TIME')
+local now = tonumber(now_parts[1]) + tonumber(now_parts[2]) / 1e6
+local cost = tonumber(ARGV[1])
+local levels = {}
+local worst, wait = 0, 0
+for i, key in ipairs(KEYS) do
+  local rate, burst = tonumber(ARGV[2 * i]), tonumber(ARGV[2 * i + 1])
+  local state = redis.call('HMGET', key, 't', 'ts')
+  local level = burst
+  if state[1] then
+    level = math.min(burst, tonumber(state[1]) + math.max(0, now - tonumber(state[2])) * rate)
+  end
+  levels[i] = level
+  if level < cost and (cost - level) / rate > wait then
+    worst, wait = i, (cost - level) / rate
+  end
+end
+if worst > 0 then
+  return {worst, tostring(wait)}
+end
+for i, key in ipairs(KEYS) do
+  local rate, burst = tonumber(ARGV[2 * i]), tonumber(ARGV[2 * i + 1])
+  redis.call('HSET', key, 't', levels[i] - cost, 'ts', now)
+  redis.call('PEXPIRE', key, math.ceil(burst / rate * 1000) + 1000)
+end
+return {0, '0'}
+"""
+
+
+class RedisBuckets:
+    """Shared buckets in Redis hashes; one script call checks and takes every bucket atomically."""
+
+    blocking = True
+    prefix = "ratelimit:"
+
+    def __init__(self, redis_url: str):
+        import redis
+
+        self.client = redis.Redis.from_url(redis_url)
+        self._script = self.client.register_script(_REDIS_SCRIPT)
+
+    def acquire(self, buckets: Buckets, cost: float = 1.0) -> Denial:
+        args: List[float] = [cost]
+        for _, budget in buckets:
+            args.extend((budget.rate, budget.burst))
+        index, wait = self._script(keys=[self.prefix + name for name, _ in buckets], args=args)
+        return None if int(index) == 0 else (int(index) - 1, float(wait))
+
+    def reset(self) -> None:
+        for key in self.client.scan_iter(self.prefix + "*"):
+            self.client.delete(key)
+
+
+def default_budgets() -> Dict[str, Dict[str, Budget]]:
+    return {
+        "search": {"key": Budget(*RATE_LIMIT_SEARCH_PER_KEY), "tenant": Budget(*RATE_LIMIT_SEARCH_PER_TENANT)},
+        "write": {"key": Budget(*RATE_LIMIT_WRITE_PER_KEY), "tenant": Budget(*RATE_LIMIT_WRITE_PER_TENANT)},
+        "read": {"key": Budget(*RATE_LIMIT_READ_PER_KEY), "tenant": Budget(*RATE_LIMIT_READ_PER_TENANT)},
+    }
+
+
+class RateLimiter:
+    def __init__(self, backend, budgets: Dict[str, Dict[str, Budget]]):
+        self.backend = backend
+        self.budgets = budgets
+
+    @property
+    def blocking(self) -> bool:
+        return self.backend is not None and self.backend.blocking
+
+    def check(self, route_class: str, tenant_id: str, api_key_id: int) -> None:
+        """Takes one token from the key and tenant buckets for route_class, or raises RateLimited."""
+        if self.backend is None:
+            return
+        budgets = self.budgets[route_class]
+        scopes = [(s, budgets[s]) for s in ("key", "tenant") if budgets[s].rate > 0]
+        if not scopes:
+            return
+        ids = {"key": api_key_id, "tenant": tenant_id}
+        buckets = [(f"{route_class}:{scope}:{ids[scope]}", budget) for scope, budget in scopes]
+        try:
+            denial = self.backend.acquire(buckets)
+        except Exception:
+            logger.exception("rate limit backend failed; allowing request")
+            metrics.inc("rate_limit_backend_errors_total")
+            return
+        if denial is not None:
+            index, wait = denial
+            scope = scopes[index][0]
+            metrics.inc("rate_limited_total", route_class=route_class, scope=scope)
+            raise RateLimited(route_class, "API key" if scope == "key" else "tenant", wait)
+
+    def reset(self) -> None:
+        if self.backend is not None:
+            self.backend.reset()
+
+
+def _backend():
+    if RATE_LIMIT_BACKEND == "memory":
+        return MemoryBuckets()
+    if RATE_LIMIT_BACKEND == "postgres":
+        from app.core.database import engine
+
+        return PostgresBuckets(engine)
+    if RATE_LIMIT_BACKEND == "redis":
+        from app.core.config import REDIS_URL
+
+        return RedisBuckets(REDIS_URL)
+    return None
+
+
+limiter = RateLimiter(_backend(), default_budgets())
@@ -1,86 +1,433 @@
 # crud.py
 
-from typing import List, Optional
-from sqlalchemy.exc import SQLAlchemyError
-from sqlalchemy.orm import Session
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Optional, Tuple
+from sqlalchemy.orm import Session, load_only
 from sqlalchemy import func
 import os
-from app.llm.embeddings import generate_vector_embeddings, EmbeddingError
+from app.core.fingerprint import message_fingerprint, stack_fingerprint
+from app.llm.breaker import CircuitOpenError
+from app.llm.cache import embedding_cache, content_hash
+from app.core.config import (
+    EMBED_PIPELINE,
+    ANN_INDEX_TYPE,
+    SEARCH_HNSW_EF_SEARCH,
+    SEARCH_IVFFLAT_PROBES,
+    SEARCH_EXACT_MAX_ROWS,
+    SEARCH_MODE,
+    SEARCH_RRF_K,
+    SEARCH_CANDIDATES,
+    REDACT_CHUNK_SIZE,
+    REDACT_CHUNK_OVERLAP,
+)
+from app.llm.embeddings import (
+    generate_vector_embeddings,
+    generate_vector_embeddings_batch,
+    resolve_embedding_model,
+    EmbeddingError,
+    LOCAL_MODEL_NAME,
+)
 from app.models.incident import IncidentLog
-from app.schemas.incident import IncidentLogCreate, UpdateIncident
-from app.security.redaction import redact_text
-from sqlalchemy import func, or_
-
-
-EMBED_MODEL = os.getenv("EMBED_MODEL", "local-deterministic-v1")
-
-
-def create_incident(db: Session, tenant_id: str, incident: IncidentLogCreate) -> IncidentLog:
-    msg_redacted = redact_text(incident.message)
-
-    db_obj = IncidentLog(
-        tenant_id=tenant_id,
-        service=incident.service,
-        severity=incident.severity,
-        title=incident.title,
-        affected_sys=incident.affected_sys,
-        reporter=incident.reporter,
-        source=incident.source,
-        tags=incident.tags,
-        message_raw=incident.message,
-        message_redacted=msg_redacted,
-        stack_trace=incident.stack_trace,
-        embedding_status="pending",
-        is_deleted=False,
-    )
+from app.models.stack_rollup import StackFingerprintRollup
+from app.schemas.incident import IncidentLogCreate, IncidentLogRead, UpdateIncident, SearchFilters
+from app.security.redaction import redact_text, redact_text_chunked
+from sqlalchemy import func, insert, or_, select, text, union_all, update
+from sqlalchemy.dialects.postgresql import insert as pg_insert
 
-    try:
-        db.add(db_obj)
-        db.commit()
-        db.refresh(db_obj)
-    except SQLAlchemyError as e:
-        db.rollback()
-        raise e
 
+EMBED_MODEL = os.getenv("EMBED_MODEL", LOCAL_MODEL_NAME)
+
+# Whether the installed pgvector has iterative index scans (0.8+); looked up once per process
+_iterative_scan: Optional[bool] = None
+
+# Columns the API serializes; read paths load only these. embedding and message_raw are
+# also deferred on the model, so a row expired by commit never reloads them either.
+_READ_FIELDS = tuple(IncidentLogRead.model_fields)
+
+
+def _load_read(*extra: str):
+    return load_only(*(getattr(IncidentLog, name) for name in _READ_FIELDS + extra))
+
+
+def _read_columns():
+    return [getattr(IncidentLog, name) for name in _READ_FIELDS]
+
+
+def _embed_redacted(db: Session, text: str, persist: bool = True) -> Tuple[List[float], str, str]:
+    """
+    Embeds already-redacted text through the content-addressed cache.
+    Returns (vector, model_name, content_hash) or raises EmbeddingError.
+    """
+    key_hash = content_hash(text)
+    model_key = resolve_embedding_model(EMBED_MODEL)
+
+    vec = embedding_cache.get(db, model_key, key_hash)
+    if vec is not None:
+        return vec, model_key, key_hash
+
+    vec, model_name = generate_vector_embeddings(text, model=EMBED_MODEL)
+    embedding_cache.put(db, model_name, key_hash, vec, persist=persist)
+    return vec, model_name, key_hash
+
+
+def _embed_redacted_batch(db: Session, texts: List[str]) -> Tuple[List[List[float]], str, List[str]]:
+    """
+    Batch form of _embed_redacted: cache hits are served with at most one SELECT,
+    the distinct misses go to the provider in one call and are cached with one INSERT.
+    Returns (vectors, model_name, content_hashes) aligned with `texts`.
+    """
+    model_name = resolve_embedding_model(EMBED_MODEL)
+    hashes = [content_hash(t) for t in texts]
+    cached = embedding_cache.get_many(db, model_name, hashes)
+
+    missing = {}
+    for i, h in enumerate(hashes):
+        if h not in cached:
+            missing.setdefault(h, i)
+
+    if missing:
+        idxs = list(missing.values())
+        fresh, model_name = generate_vector_embeddings_batch([texts[i] for i in idxs], model=EMBED_MODEL)
+        by_hash = {hashes[i]: vec for i, vec in zip(idxs, fresh)}
+        embedding_cache.put_many(db, model_name, by_hash)
+        cached.update(by_hash)
+
+    return [cached[h] for h in hashes], model_name, hashes
+
+
+def _async_pipeline() -> bool:
+    return EMBED_PIPELINE == "async"
+
+
+def _redact_message(message: str) -> str:
+    # Large pastes are redacted chunk by chunk so working memory stays bounded
+    return redact_text_chunked(message, REDACT_CHUNK_SIZE, REDACT_CHUNK_OVERLAP)
+
+
+def _embedding_fields(db: Session, texts: List[str]) -> List[Dict[str, Any]]:
+    """
+    Embedding columns for new rows, computed before anything is written so each row
+    goes out once, in its final state. A single text takes the per-item cache path;
+    a batch is embedded with one provider call. Every dict has the same keys so a
+    batch goes out as a single multi-row INSERT.
+    """
+    pending = {
+        "embedding": None,
+        "embedding_model": None,
+        "embedding_dim": None,
+        "embedding_version": None,
+        "embedding_content_hash": None,
+        "embedding_status": "pending",
+        "embedding_updated_at": None,
+        "embedding_error": None,
+    }
+    if _async_pipeline():
+        return [dict(pending) for _ in texts]
+
+    now = datetime.now(timezone.utc)
     try:
-        vec, model_name = generate_vector_embeddings(db_obj.message_redacted, model=EMBED_MODEL)
-        db_obj.embedding = vec
-        db_obj.embedding_model = model_name
-        db_obj.embedding_dim = len(vec)
-        db_obj.embedding_version = 1
-        db_obj.embedding_status = "ready"
-        db_obj.embedding_updated_at = func.now()
-        db_obj.embedding_error = None
+        if len(texts) == 1:
+            vec, model_name, key_hash = _embed_redacted(db, texts[0])
+            vecs, hashes = [vec], [key_hash]
+        else:
+            vecs, model_name, hashes = _embed_redacted_batch(db, texts)
+    except CircuitOpenError:
+        # Provider is known to be down: stay pending for the worker/backfill, don't wait or fail
+        return [dict(pending) for _ in texts]
     except EmbeddingError as e:
-        db_obj.embedding = None
-        db_obj.embedding_model = "local-deterministic-v1"
-        db_obj.embedding_dim = None
-        db_obj.embedding_version = 1
-        db_obj.embedding_status = "failed"
-        db_obj.embedding_updated_at = func.now()
-        db_obj.embedding_error = str(e)
+        failed = dict(
+            pending,
+            embedding_model=LOCAL_MODEL_NAME,
+            embedding_version=1,
+            embedding_status="failed",
+            embedding_updated_at=now,
+            embedding_error=str(e),
+        )
+        return [dict(failed) for _ in texts]
+
+    return [
+        dict(
+            pending,
+            embedding=vec,
+            embedding_model=model_name,
+            embedding_dim=len(vec),
+            embedding_version=1,
+            embedding_content_hash=key_hash,
+            embedding_status="ready",
+            embedding_updated_at=now,
+        )
+        for vec, key_hash in zip(vecs, hashes)
+    ]
+
+
+def create_incident(db: Session, tenant_id: str, incident: IncidentLogCreate) -> Any:
+    """
+    Redacts and embeds first, then writes the row with one INSERT ... RETURNING.
+    Does not commit: the caller adds the audit entry to the same transaction.
+    """
+    return create_incidents_bulk(db, tenant_id=tenant_id, incidents=[incident])[0]
 
-    try:
-        db.commit()
-        db.refresh(db_obj)
-        return db_obj
-    except SQLAlchemyError as e:
-        db.rollback()
-        raise e
+
+def create_incidents_bulk(db: Session, tenant_id: str, incidents: List[IncidentLogCreate]) -> List[Any]:
+    """
+    Redacts and embeds the whole batch up front, then writes every row in its final
+    state with one multi-row INSERT ... RETURNING (rows come back in input order).
+
+    Does not commit: the caller appends the audit segment in the same transaction.
+    """
+    if not incidents:
+        return []
+    return insert_incidents(db, tenant_id, incidents, [_redact_message(i.message) for i in incidents])
+
+
+def insert_incidents(
+    db: Session,
+    tenant_id: str,
+    incidents: List[IncidentLogCreate],
+    redacted: List[str],
+    embedding_fields: Optional[List[Dict[str, Any]]] = None,
+    occurrences: Optional[List[int]] = None,
+) -> List[Any]:
+    """
+    The write half of create_incidents_bulk, for callers that already hold the
+    redacted messages and possibly their embedding columns. Does not commit.
+    """
+    if embedding_fields is None:
+        embedding_fields = _embedding_fields(db, redacted)
+    if occurrences is None:
+        occurrences = [1] * len(incidents)
+    rows = [
+        dict(
+            tenant_id=tenant_id,
+            service=i.service,
+            severity=i.severity,
+            title=i.title,
+            affected_sys=i.affected_sys,
+            reporter=i.reporter,
+            source=i.source,
+            tags=i.tags,
+            message_raw=i.message,
+            message_redacted=msg_redacted,
+            stack_trace=i.stack_trace,
+            stack_fingerprint=stack_fingerprint(i.stack_trace),
+            fingerprint=message_fingerprint(i.title, msg_redacted),
+            occurrence_count=count,
+            is_deleted=False,
+            **fields,
+        )
+        for i, msg_redacted, fields, count in zip(incidents, redacted, embedding_fields, occurrences)
+    ]
+
+    stmt = insert(IncidentLog).returning(*_read_columns(), sort_by_parameter_order=True)
+    inserted = db.execute(stmt, rows).all()
+    record_stack_counts(db, tenant_id, [(r.stack_fingerprint, r.created_at, r.id, r.occurrence_count) for r in inserted])
+    return inserted
+
+
+def _hour(ts: datetime) -> datetime:
+    return ts.astimezone(timezone.utc).replace(minute=0, second=0, microsecond=0)
+
+
+def record_stack_counts(db: Session, tenant_id: str, events: List[Tuple[Optional[str], datetime, int, int]]) -> None:
+    """
+    Adds (stack_fingerprint, at, incident_id, count) events to the hourly rollup with
+    one upsert. Rows are locked in key order so concurrent writers can't deadlock.
+    """
+    buckets: Dict[Tuple[datetime, str], List[int]] = {}
+    for fp, at, incident_id, count in events:
+        if fp is None:
+            continue
+        entry = buckets.setdefault((_hour(at), fp), [0, incident_id])
+        entry[0] += count
+        entry[1] = min(entry[1], incident_id)
+    if not buckets:
+        return
+
+    stmt = pg_insert(StackFingerprintRollup).values([
+        {"tenant_id": tenant_id, "bucket_start": bucket, "stack_fingerprint": fp, "incident_count": n, "sample_incident_id": sample}
+        for (bucket, fp), (n, sample) in sorted(buckets.items())
+    ])
+    db.execute(stmt.on_conflict_do_update(
+        index_elements=[StackFingerprintRollup.tenant_id, StackFingerprintRollup.bucket_start, StackFingerprintRollup.stack_fingerprint],
+        set_={"incident_count": StackFingerprintRollup.incident_count + stmt.excluded.incident_count},
+    ))
+
+
+def move_stack_counts(
+    db: Session,
+    tenant_id: str,
+    incident_id: int,
+    at: datetime,
+    count: int,
+    old_fp: Optional[str],
+    new_fp: Optional[str],
+) -> None:
+    """
+    Moves an incident's count from old_fp's bucket to new_fp's, for a trace edit
+    (new_fp may be None) or a soft delete (new_fp=None). Both buckets go through one
+    upsert, so rows are still locked in key order. If the incident was the old
+    bucket's sample, the next live incident there becomes the sample; a bucket left
+    empty is deleted. Call after the incident row itself is updated. Does not commit.
+    """
+    if old_fp == new_fp:
+        return
+    record_stack_counts(db, tenant_id, [(old_fp, at, incident_id, -count), (new_fp, at, incident_id, count)])
+    if old_fp is None:
+        return
+    bucket = {"tenant_id": tenant_id, "bucket_start": _hour(at), "fp": old_fp, "id": incident_id}
+    db.execute(text(
+        "UPDATE stack_fingerprint_rollups r SET sample_incident_id = COALESCE(("
+        "  SELECT min(i.id) FROM incident_logs i"
+        "  WHERE i.tenant_id = r.tenant_id AND i.stack_fingerprint = r.stack_fingerprint"
+        "    AND i.created_at >= r.bucket_start AND i.created_at < r.bucket_start + interval '1 hour'"
+        "    AND NOT i.is_deleted AND i.id <> :id"
+        "), r.sample_incident_id) "
+        "WHERE r.tenant_id = :tenant_id AND r.bucket_start = :bucket_start AND r.stack_fingerprint = :fp "
+        "AND r.sample_incident_id = :id"
+    ), bucket)
+    db.execute(text(
+        "DELETE FROM stack_fingerprint_rollups "
+        "WHERE tenant_id = :tenant_id AND bucket_start = :bucket_start AND stack_fingerprint = :fp AND incident_count <= 0"
+    ), bucket)
+
+
+def top_stack_fingerprints(db: Session, tenant_id: str, since: datetime, limit: int) -> List[Any]:
+    """Most frequent stack fingerprints since the start of `since`'s hour, read from the rollup."""
+    total = func.sum(StackFingerprintRollup.incident_count)
+    stmt = (
+        select(
+            StackFingerprintRollup.stack_fingerprint,
+            total.label("count"),
+            func.min(StackFingerprintRollup.sample_incident_id).label("sample_incident_id"),
+            func.max(StackFingerprintRollup.bucket_start).label("last_bucket"),
+        )
+        .where(StackFingerprintRollup.tenant_id == tenant_id, StackFingerprintRollup.bucket_start >= _hour(since))
+        .group_by(StackFingerprintRollup.stack_fingerprint)
+        .order_by(total.desc(), StackFingerprintRollup.stack_fingerprint)
+        .limit(limit)
+    )
+    return db.execute(stmt).all()
+
+
+def rebuild_stack_rollups(db: Session) -> None:
+    """Recomputes the rollup from incident_logs, e.g. after rows were backdated. Does not commit."""
+    db.execute(text("DELETE FROM stack_fingerprint_rollups"))
+    db.execute(text(
+        "INSERT INTO stack_fingerprint_rollups (tenant_id, bucket_start, stack_fingerprint, incident_count, sample_incident_id) "
+        "SELECT tenant_id, date_trunc('hour', created_at, 'UTC'), stack_fingerprint, sum(occurrence_count), min(id) "
+        "FROM incident_logs WHERE stack_fingerprint IS NOT NULL AND NOT is_deleted "
+        "GROUP BY 1, 2, 3"
+    ))
 
 
 def get_incident_by_id(db: Session, tenant_id: str, incident_id: int, include_deleted: bool = False) -> Optional[IncidentLog]:
-    q = db.query(IncidentLog).filter(IncidentLog.tenant_id == tenant_id, IncidentLog.id == incident_id)
+    q = db.query(IncidentLog).options(_load_read()).filter(IncidentLog.tenant_id == tenant_id, IncidentLog.id == incident_id)
     if not include_deleted:
         q = q.filter(IncidentLog.is_deleted == False) 
     return q.first()
 
 
-def search_incidents(db: Session, tenant_id: str, query: str, top_k: int = 5) -> List[IncidentLog]:
-    q_redacted = redact_text(query)
-    vec, _model_name = generate_vector_embeddings(q_redacted, model=EMBED_MODEL)
+def get_incident_rows(db: Session, tenant_id: str, ids: List[int]) -> Dict[int, Any]:
+    """Read rows by id, deleted ones included, keyed by id."""
+    if not ids:
+        return {}
+    stmt = select(*_read_columns()).where(IncidentLog.tenant_id == tenant_id, IncidentLog.id.in_(ids))
+    return {row.id: row for row in db.execute(stmt)}
+
+
+def get_incident_raw(db: Session, tenant_id: str, incident_id: int) -> Optional[IncidentLog]:
+    return (
+        db.query(IncidentLog)
+        .options(load_only(IncidentLog.id, IncidentLog.tenant_id, IncidentLog.message_raw))
+        .filter(
+            IncidentLog.tenant_id == tenant_id,
+            IncidentLog.id == incident_id,
+            IncidentLog.is_deleted == False,
+        )
+        .first()
+    )
+
 
+def _has_iterative_scan(db: Session) -> bool:
+    global _iterative_scan
+    if _iterative_scan is None:
+        version = db.execute(text("SELECT extversion FROM pg_extension WHERE extname = 'vector'")).scalar() or "0"
+        _iterative_scan = tuple(int(p) for p in version.split(".")[:2] if p.isdigit()) >= (0, 8)
+    return _iterative_scan
 
+
+def _apply_ann_knobs(db: Session, top_k: int, ef_search: Optional[int] = None, probes: Optional[int] = None) -> None:
+    """
+    Transaction-local pgvector recall knobs (reset at the next commit/rollback).
+    The ANN index is filtered after the scan, so ef_search is never set below top_k,
+    and on pgvector 0.8+ the scan keeps going until enough rows pass the filter.
+    """
+    if ANN_INDEX_TYPE == "hnsw" or ef_search is not None:
+        ef = max(ef_search or SEARCH_HNSW_EF_SEARCH, top_k)
+        db.execute(text("SELECT set_config('hnsw.ef_search', :v, true)"), {"v": str(ef)})
+    if ANN_INDEX_TYPE == "ivfflat" or probes is not None:
+        db.execute(text("SELECT set_config('ivfflat.probes', :v, true)"), {"v": str(probes or SEARCH_IVFFLAT_PROBES)})
+    if _has_iterative_scan(db):
+        # Rows come back in roughly distance order; the ranking query re-sorts them
+        db.execute(text(
+            "SELECT set_config('hnsw.iterative_scan', 'relaxed_order', true), "
+            "set_config('ivfflat.iterative_scan', 'relaxed_order', true)"
+        ))
+
+
+def _exact_ranking(db: Session, conds: list) -> bool:
+    """
+    Without iterative scans a filtered ANN scan can come back short, or empty, for a small
+    tenant or a selective filter. When at most SEARCH_EXACT_MAX_ROWS rows match, rank them
+    exactly instead; counting stops at the limit, so a large tenant pays one bounded probe.
+    """
+    if _has_iterative_scan(db):
+        return False
+    matching = select(IncidentLog.id).where(*conds).limit(SEARCH_EXACT_MAX_ROWS + 1).subquery()
+    return db.execute(select(func.count()).select_from(matching)).scalar() <= SEARCH_EXACT_MAX_ROWS
+
+
+def _rankable(model_name: str) -> tuple:
+    # Vectors from another model (e.g. before a backfill) are not comparable to the query's
+    return (
+        IncidentLog.embedding_status == "ready",
+        IncidentLog.embedding.isnot(None),
+        IncidentLog.embedding_model == model_name,
+    )
+
+
+def _vector_distance(vec: List[float], exact: bool):
+    distance = IncidentLog.embedding.cosine_distance(vec)
+    # "+ 0" hides the operator from the planner, so it filters first and sorts, not walks the index
+    return distance + 0 if exact else distance
+
+
+def _search_conditions(tenant_id: str, filters: Optional[SearchFilters]) -> list:
+    """Tenant scope plus structured filters, applied in SQL before any ranking."""
+    conds = [IncidentLog.tenant_id == tenant_id, IncidentLog.is_deleted == False]
+    if filters is None:
+        return conds
+    if filters.service is not None:
+        conds.append(IncidentLog.service == filters.service)
+    if filters.severity is not None:
+        conds.append(IncidentLog.severity.in_(filters.severity))
+    if filters.source is not None:
+        conds.append(IncidentLog.source == filters.source)
+    if filters.tags:
+        conds.append(IncidentLog.tags.contains(filters.tags))
+    if filters.stack_fingerprint is not None:
+        conds.append(IncidentLog.stack_fingerprint == filters.stack_fingerprint)
+    if filters.created_after is not None:
+        conds.append(IncidentLog.created_at >= filters.created_after)
+    if filters.created_before is not None:
+        conds.append(IncidentLog.created_at < filters.created_before)
+    return conds
+
+
+def _ilike_search(
+    db: Session, conds: list, query: str, vec: List[float], model_name: str, top_k: int, exact: bool = False
+) -> List[IncidentLog]:
+    # Legacy mode: substring prefilter, then rerank by vector distance.
     # 1) Lexical prefilter to avoid totally unrelated results
     like = f"%{query.strip()}%"
     lexical_filter = or_(
@@ -94,86 +441,226 @@ def search_incidents(db: Session, tenant_id: str, query: str, top_k: int = 5) ->
     # 2) Only consider good rows, then rerank by vector distance
     q = (
         db.query(IncidentLog)
-        .filter(
-            IncidentLog.tenant_id == tenant_id,
-            IncidentLog.is_deleted == False, 
-            IncidentLog.embedding_status == "ready",
-            IncidentLog.embedding.isnot(None),
-        )
+        .options(_load_read())
+        .filter(*conds, *_rankable(model_name))
         .filter(lexical_filter)
-        .order_by(IncidentLog.embedding.cosine_distance(vec))
+        .order_by(_vector_distance(vec, exact))
         .limit(top_k)
     )
 
     return q.all()
 
 
-def update_incident(db: Session, tenant_id: str, incident_id: int, update: UpdateIncident) -> Optional[IncidentLog]:
-    db_obj = (
-        db.query(IncidentLog)
-        .filter(
-            IncidentLog.tenant_id == tenant_id,
-            IncidentLog.id == incident_id,
-            IncidentLog.is_deleted == False,  
+def _hybrid_search(
+    db: Session, conds: list, query: str, vec: List[float], model_name: str, top_k: int, exact: bool = False
+) -> List[IncidentLog]:
+    """
+    Reciprocal rank fusion of a full-text list (GIN on search_tsv) and a vector
+    list (ANN index), each capped at SEARCH_CANDIDATES, in one statement.
+    A row scores sum(1 / (SEARCH_RRF_K + rank)) over the lists it appears in.
+    """
+    candidates = max(SEARCH_CANDIDATES, top_k)
+
+    tsq = func.websearch_to_tsquery("english", query)
+    lexical_score = func.ts_rank_cd(IncidentLog.search_tsv, tsq)
+    lexical = (
+        select(
+            IncidentLog.id.label("id"),
+            func.row_number().over(order_by=(lexical_score.desc(), IncidentLog.id.desc())).label("rank"),
         )
-        .first()
+        .where(*conds, IncidentLog.search_tsv.op("@@")(tsq))
+        .order_by(lexical_score.desc(), IncidentLog.id.desc())
+        .limit(candidates)
     )
-    if not db_obj:
-        return None
 
-    payload = update.model_dump(exclude_unset=True)
-    message_changed = "message" in payload
+    # Rank outside the LIMIT subquery so the ORDER BY distance stays index-driven
+    distance = _vector_distance(vec, exact).label("distance")
+    nearest = (
+        select(IncidentLog.id.label("id"), distance)
+        .where(*conds, *_rankable(model_name))
+        .order_by(distance)
+        .limit(candidates)
+        .subquery()
+    )
+    semantic = select(nearest.c.id, func.row_number().over(order_by=nearest.c.distance).label("rank"))
 
-    for field, value in payload.items():
-        if field == "message":
-            db_obj.message_raw = value
-            db_obj.message_redacted = redact_text(value)
-        else:
-            setattr(db_obj, field, value)
-
-    if message_changed:
-        db_obj.embedding_status = "pending"
-        db_obj.embedding_error = None
-        try:
-            vec, model_name = generate_vector_embeddings(db_obj.message_redacted, model=EMBED_MODEL)
-            db_obj.embedding = vec
-            db_obj.embedding_model = model_name
-            db_obj.embedding_dim = len(vec)
-            db_obj.embedding_version = (db_obj.embedding_version or 0) + 1
-            db_obj.embedding_status = "ready"
-            db_obj.embedding_updated_at = func.now()
-            db_obj.embedding_error = None
-        except EmbeddingError as e:
-            db_obj.embedding = None
-            db_obj.embedding_model = "local-deterministic-v1"
-            db_obj.embedding_dim = None
-            db_obj.embedding_version = (db_obj.embedding_version or 0) + 1
-            db_obj.embedding_status = "failed"
-            db_obj.embedding_updated_at = func.now()
-            db_obj.embedding_error = str(e)
-
-    db.commit()
-    db.refresh(db_obj)
-    return db_obj
-
-
-def delete_incident_soft(db: Session, tenant_id: str, incident_id: int, deleted_by: str) -> Optional[IncidentLog]:
-    db_obj = (
+    ranked = union_all(lexical, semantic).subquery()
+    fused = (
+        select(ranked.c.id, func.sum(1.0 / (SEARCH_RRF_K + ranked.c.rank)).label("score"))
+        .group_by(ranked.c.id)
+        .subquery()
+    )
+
+    q = (
         db.query(IncidentLog)
-        .filter(
-            IncidentLog.tenant_id == tenant_id,
-            IncidentLog.id == incident_id,
-            IncidentLog.is_deleted == False,  
-        )
-        .first()
+        .options(_load_read())
+        .join(fused, fused.c.id == IncidentLog.id)
+        .order_by(fused.c.score.desc(), IncidentLog.id.desc())
+        .limit(top_k)
     )
-    if not db_obj:
-        return None
+    return q.all()
+
+
+def search_incidents(
+    db: Session,
+    tenant_id: str,
+    query: str,
+    top_k: int = 5,
+    ef_search: Optional[int] = None,
+    probes: Optional[int] = None,
+    mode: Optional[str] = None,
+    filters: Optional[SearchFilters] = None,
+) -> List[IncidentLog]:
+    mode = mode or SEARCH_MODE
+    if mode not in ("hybrid", "ilike"):
+        raise ValueError(f"Unknown search mode: {mode!r}")
+
+    q_redacted = redact_text(query)
+    # Query vectors stay in the in-process tier only; no DB writes on the read path
+    vec, model_name, _hash = _embed_redacted(db, q_redacted, persist=False)
+
+    conds = _search_conditions(tenant_id, filters)
+    if mode == "ilike":
+        _apply_ann_knobs(db, top_k, ef_search=ef_search, probes=probes)
+        return _ilike_search(db, conds, query, vec, model_name, top_k, exact=_exact_ranking(db, conds))
+
+    # The vector list needs SEARCH_CANDIDATES neighbours, not just top_k
+    _apply_ann_knobs(db, max(SEARCH_CANDIDATES, top_k), ef_search=ef_search, probes=probes)
+    return _hybrid_search(db, conds, q_redacted, vec, model_name, top_k, exact=_exact_ranking(db, conds))
+
+
+def _live(tenant_id: str, incident_id: int) -> tuple:
+    return (
+        IncidentLog.tenant_id == tenant_id,
+        IncidentLog.id == incident_id,
+        IncidentLog.is_deleted == False,  
+    )
+
+
+def _update_returning(db: Session, tenant_id: str, incident_id: int, values: Dict[str, Any]) -> Optional[Any]:
+    stmt = (
+        update(IncidentLog)
+        .where(*_live(tenant_id, incident_id))
+        .values(**values)
+        .returning(*_read_columns())
+        .execution_options(synchronize_session=False)
+    )
+    return db.execute(stmt).first()
+
 
-    db_obj.is_deleted = True
-    db_obj.deleted_at = func.now()
-    db_obj.deleted_by = deleted_by
+def _reembed_fields(db: Session, msg_redacted: str) -> Dict[str, Any]:
+    """Embedding columns for an edited message; versions are bumped in SQL."""
+    pending = {
+        "embedding_status": "pending",
+        "embedding_error": None,
+        "embedding_attempts": 0,
+        "embedding_next_attempt_at": None,
+    }
+    # Async pipeline: the worker bumps embedding_version when it embeds the new text
+    if _async_pipeline():
+        return pending
 
-    db.commit()
-    db.refresh(db_obj)
-    return db_obj
+    next_version = func.coalesce(IncidentLog.embedding_version, 0) + 1
+    try:
+        vec, model_name, key_hash = _embed_redacted(db, msg_redacted)
+    except CircuitOpenError:
+        return pending
+    except EmbeddingError as e:
+        return {
+            "embedding": None,
+            "embedding_model": LOCAL_MODEL_NAME,
+            "embedding_dim": None,
+            "embedding_version": next_version,
+            "embedding_content_hash": None,
+            "embedding_status": "failed",
+            "embedding_updated_at": func.now(),
+            "embedding_error": str(e),
+        }
+    return {
+        "embedding": vec,
+        "embedding_model": model_name,
+        "embedding_dim": len(vec),
+        "embedding_version": next_version,
+        "embedding_content_hash": key_hash,
+        "embedding_status": "ready",
+        "embedding_updated_at": func.now(),
+        "embedding_error": None,
+    }
+
+
+def update_incident(db: Session, tenant_id: str, incident_id: int, update: UpdateIncident) -> Optional[Any]:
+    """
+    One UPDATE ... RETURNING. A message edit first reads the embedding columns (to
+    decide whether the new text needs embedding at all) and the title; a title-only
+    edit reads the redacted message. Both feed the fingerprint; nothing else is loaded.
+    Does not commit: the caller adds the audit entry to the same transaction.
+    """
+    values = update.model_dump(exclude_unset=True)
+    message = values.pop("message", None)
+    if "stack_trace" in values:
+        values["stack_fingerprint"] = stack_fingerprint(values["stack_trace"])
+
+    if message is None and "title" in values:
+        current_message = db.execute(
+            select(IncidentLog.message_redacted).where(*_live(tenant_id, incident_id))
+        ).scalar()
+        if current_message is None:
+            return None
+        values["fingerprint"] = message_fingerprint(values["title"], current_message)
+
+    if message is not None:
+        current = db.execute(
+            select(
+                IncidentLog.embedding_status,
+                IncidentLog.embedding_content_hash,
+                IncidentLog.embedding_model,
+                IncidentLog.title,
+            ).where(*_live(tenant_id, incident_id))
+        ).first()
+        if current is None:
+            return None
+
+        msg_redacted = _redact_message(message)
+        values["message_raw"] = message
+        values["message_redacted"] = msg_redacted
+        values["fingerprint"] = message_fingerprint(values.get("title", current.title), msg_redacted)
+
+        # Same redacted bytes, same model, already embedded: nothing to redo
+        unchanged = (
+            current.embedding_status == "ready"
+            and current.embedding_content_hash == content_hash(msg_redacted)
+            and current.embedding_model == resolve_embedding_model(EMBED_MODEL)
+        )
+        if not unchanged:
+            values.update(_reembed_fields(db, msg_redacted))
+
+    if not values:
+        return db.execute(select(*_read_columns()).where(*_live(tenant_id, incident_id))).first()
+
+    old_stack = None
+    if "stack_trace" in values:
+        # Locked (after any embedding call) so the rollup moves the count away from the fingerprint this replaces
+        old_stack = db.execute(
+            select(IncidentLog.stack_fingerprint).where(*_live(tenant_id, incident_id)).with_for_update()
+        ).first()
+        if old_stack is None:
+            return None
+    row = _update_returning(db, tenant_id, incident_id, values)
+    if row is not None and old_stack is not None:
+        move_stack_counts(
+            db, tenant_id, row.id, row.created_at, row.occurrence_count, old_stack.stack_fingerprint, row.stack_fingerprint
+        )
+    return row
+
+
+def delete_incident_soft(db: Session, tenant_id: str, incident_id: int, deleted_by: str) -> Optional[Any]:
+    """Soft delete with one UPDATE ... RETURNING; the incident leaves the stack rollup too. Does not commit."""
+    row = _update_returning(
+        db,
+        tenant_id,
+        incident_id,
+        {"is_deleted": True, "deleted_at": func.now(), "deleted_by": deleted_by},
+    )
+    if row is not None:
+        move_stack_counts(db, tenant_id, row.id, row.created_at, row.occurrence_count, row.stack_fingerprint, None)
+    return row
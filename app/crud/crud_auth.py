@@ -3,13 +3,18 @@
 from __future__ import annotations
 
 from dataclasses import dataclass
-from datetime import datetime, timezone
-from typing import Optional, Any, List, Dict
+from datetime import datetime, timedelta, timezone
+from typing import Optional, Any, List, Dict, Tuple
 import secrets
 
+from sqlalchemy import func, or_, select, update
+from sqlalchemy.dialects.postgresql import insert as pg_insert
 from sqlalchemy.orm import Session
 
-from app.models.auth import ApiKey, AuditLog
+from app.core import invalidation, metrics
+from app.core.cache import LRUCache
+from app.core.config import AUTH_CACHE_SIZE, AUTH_CACHE_TTL_SECONDS, AUTH_NEGATIVE_CACHE_SIZE, AUTH_NEGATIVE_TTL_SECONDS
+from app.models.auth import ApiKey, AuditChainHead, AuditLog
 from app.security.hashing import sha256_hex, canonical_json
 from app.security.redaction import redact_text
 from fastapi import HTTPException
@@ -25,7 +30,18 @@ class ActorContext:
     role: str
     api_key_id: int
 
-def create_api_key(db: Session, tenant_id: str, actor_id: str, role: str, name: Optional[str] = None) -> tuple[ApiKey, str]:
+class KeyNotRotatable(Exception):
+    """The key is revoked or already inside a rotation grace period."""
+
+
+def create_api_key(
+    db: Session,
+    tenant_id: str,
+    actor_id: str,
+    role: str,
+    name: Optional[str] = None,
+    commit: bool = True,
+) -> tuple[ApiKey, str]:
     if role not in VALID_ROLES:
         raise ValueError(f"Invalid role: {role}")
 
@@ -41,20 +57,122 @@ def create_api_key(db: Session, tenant_id: str, actor_id: str, role: str, name:
         is_active=True,
     )
     db.add(row)
-    db.commit()
-    db.refresh(row)
+    if commit:
+        db.commit()
+        db.refresh(row)
+    else:
+        db.flush()
     return row, api_key_plain
 
 
+# key_hash -> ActorContext for active keys, and key_hash -> True for keys that matched nothing
+auth_cache = LRUCache(AUTH_CACHE_SIZE, ttl=AUTH_CACHE_TTL_SECONDS)
+auth_negative_cache = LRUCache(AUTH_NEGATIVE_CACHE_SIZE if AUTH_CACHE_SIZE else 0, ttl=AUTH_NEGATIVE_TTL_SECONDS)
+
+
+def _drop_cached_key(key_hash: Optional[str]) -> None:
+    if key_hash is None:
+        auth_cache.clear()
+        auth_negative_cache.clear()
+        return
+    auth_cache.pop(key_hash)
+    auth_negative_cache.pop(key_hash)
+
+
+invalidation.subscribe("api_key", _drop_cached_key)
+
+
+def invalidate_api_key(db: Session, key_hash: str) -> None:
+    """Drops the key from every process's auth cache once db's transaction commits, e.g. after deactivating it."""
+    invalidation.publish(db, "api_key", key_hash)
+
+
 def authenticate_api_key(db: Session, api_key_plain: str) -> Optional[ActorContext]:
     if not api_key_plain or not api_key_plain.strip():
         return None
 
     key_hash = sha256_hex(api_key_plain.strip())
-    row = db.query(ApiKey).filter(ApiKey.key_hash == key_hash, ApiKey.is_active == True).first()  # noqa: E712
+    actor = auth_cache.get(key_hash)
+    if actor is not None:
+        metrics.inc("auth_cache_hits_total", result="valid")
+        return actor
+    if auth_negative_cache.get(key_hash):
+        metrics.inc("auth_cache_hits_total", result="invalid")
+        return None
+    metrics.inc("auth_cache_misses_total")
+
+    row = (
+        db.query(ApiKey)
+        .filter(
+            ApiKey.key_hash == key_hash,
+            ApiKey.is_active == True,  # noqa: E712
+            or_(ApiKey.expires_at.is_(None), ApiKey.expires_at > func.now()),
+        )
+        .first()
+    )
     if not row:
+        auth_negative_cache.set(key_hash, True)
         return None
-    return ActorContext(tenant_id=row.tenant_id, actor_id=row.actor_id, role=row.role, api_key_id=row.id)
+    actor = ActorContext(tenant_id=row.tenant_id, actor_id=row.actor_id, role=row.role, api_key_id=row.id)
+    ttl = auth_cache.ttl
+    if row.expires_at is not None:
+        # Never serve a key in its rotation grace period past its expiry
+        ttl = min(ttl, (row.expires_at - datetime.now(timezone.utc)).total_seconds())
+    if ttl > 0:
+        auth_cache.set(key_hash, actor, ttl=ttl)
+    return actor
+
+
+def _locked_key(db: Session, tenant_id: str, key_id: int) -> Optional[ApiKey]:
+    return (
+        db.query(ApiKey)
+        .filter(ApiKey.tenant_id == tenant_id, ApiKey.id == key_id)
+        .with_for_update()
+        .first()
+    )
+
+
+def list_api_keys(db: Session, tenant_id: str) -> List[ApiKey]:
+    return db.query(ApiKey).filter(ApiKey.tenant_id == tenant_id).order_by(ApiKey.id).all()
+
+
+def revoke_api_key(db: Session, tenant_id: str, key_id: int) -> Optional[ApiKey]:
+    """
+    Deactivates the key now, in every process once the transaction commits.
+    Revoking a revoked key is a no-op. Returns None if the tenant has no such key. Does not commit.
+    """
+    row = _locked_key(db, tenant_id, key_id)
+    if row is None:
+        return None
+    if row.is_active:
+        row.is_active = False
+        row.revoked_at = datetime.now(timezone.utc)
+        invalidate_api_key(db, row.key_hash)
+    return row
+
+
+def rotate_api_key(db: Session, tenant_id: str, key_id: int, grace_seconds: int = 0) -> Optional[Tuple[ApiKey, str, ApiKey]]:
+    """
+    Issues a replacement with the same tenant, actor, role and name. The old key stops
+    working immediately, or after grace_seconds so clients can switch over.
+    Returns (new_row, new_plaintext, old_row), or None if the tenant has no such key.
+    Raises KeyNotRotatable for revoked keys and keys already being rotated. Does not commit.
+    """
+    old = _locked_key(db, tenant_id, key_id)
+    if old is None:
+        return None
+    if not old.is_active or old.expires_at is not None:
+        raise KeyNotRotatable(f"API key {key_id} is revoked or already rotated")
+
+    new, plain = create_api_key(db, old.tenant_id, old.actor_id, old.role, old.name, commit=False)
+    now = datetime.now(timezone.utc)
+    if grace_seconds > 0:
+        old.expires_at = now + timedelta(seconds=grace_seconds)
+    else:
+        old.is_active = False
+        old.revoked_at = now
+    invalidate_api_key(db, old.key_hash)
+    return new, plain, old
 
 
 def require_role(actor: ActorContext, allowed: set[str]) -> None:
@@ -65,34 +183,21 @@ def require_role(actor: ActorContext, allowed: set[str]) -> None:
         )
 
 
-def append_audit_log(
-    db: Session,
+def _chain_audit_row(
     actor: ActorContext,
+    prev_hash: Optional[str],
+    created_at: datetime,
     action: str,
     resource_type: str,
     resource_id: Optional[str],
-    request_meta: Optional[Dict[str, Any]] = None,
-    result_ids: Optional[List[Any]] = None,
+    request_meta: Optional[Dict[str, Any]],
+    result_ids: Optional[List[Any]],
 ) -> AuditLog:
-    """
-    Tamper-evident per-tenant hash chain:
-    hash = sha256(prev_hash + "|" + canonical_json(payload))
-    """
     # Always redact any free-text fields you might store
     safe_meta = request_meta or {}
     if "query" in safe_meta:
         safe_meta["query"] = redact_text(str(safe_meta["query"]))
 
-    prev = (
-        db.query(AuditLog)
-        .filter(AuditLog.tenant_id == actor.tenant_id)
-        .order_by(AuditLog.id.desc())
-        .first()
-    )
-    prev_hash = prev.hash if prev else None
-
-    created_at = datetime.now(timezone.utc)
-
     payload = {
         "tenant_id": actor.tenant_id,
         "actor_id": actor.actor_id,
@@ -107,7 +212,7 @@ def append_audit_log(
 
     h = sha256_hex((prev_hash or "") + "|" + canonical_json(payload))
 
-    row = AuditLog(
+    return AuditLog(
         tenant_id=actor.tenant_id,
         actor_id=actor.actor_id,
         action=action,
@@ -119,7 +224,102 @@ def append_audit_log(
         prev_hash=prev_hash,
         hash=h,
     )
+
+
+def _lock_chain_head(db: Session, tenant_id: str) -> Optional[str]:
+    """
+    Returns the tenant's current chain head and holds its row lock until the
+    transaction ends. A concurrent append in the same tenant waits here and then
+    reads the head this one writes, so the chain cannot fork.
+    """
+    locked = select(AuditChainHead.hash).where(AuditChainHead.tenant_id == tenant_id).with_for_update()
+    row = db.execute(locked).first()
+    if row is None:
+        # First entry for the tenant; a concurrent first append may create the row first
+        db.execute(
+            pg_insert(AuditChainHead)
+            .values(tenant_id=tenant_id, hash=None, entries=0)
+            .on_conflict_do_nothing(index_elements=[AuditChainHead.tenant_id])
+        )
+        row = db.execute(locked).one()
+    return row.hash
+
+
+def _advance_chain_head(db: Session, tenant_id: str, head: str, count: int) -> None:
+    db.execute(
+        update(AuditChainHead)
+        .where(AuditChainHead.tenant_id == tenant_id)
+        .values(hash=head, entries=AuditChainHead.entries + count, updated_at=func.now())
+        .execution_options(synchronize_session=False)
+    )
+
+
+def append_audit_log(
+    db: Session,
+    actor: ActorContext,
+    action: str,
+    resource_type: str,
+    resource_id: Optional[str],
+    request_meta: Optional[Dict[str, Any]] = None,
+    result_ids: Optional[List[Any]] = None,
+    commit: bool = True,
+) -> AuditLog:
+    """
+    Tamper-evident per-tenant hash chain:
+    hash = sha256(prev_hash + "|" + canonical_json(payload))
+
+    With commit=False the entry is only added to the session, so the caller can
+    commit it together with the change it records. Either way the tenant's chain
+    head stays locked until that commit, so append late in the transaction.
+    """
+    row = _chain_audit_row(
+        actor,
+        _lock_chain_head(db, actor.tenant_id),
+        datetime.now(timezone.utc),
+        action,
+        resource_type,
+        resource_id,
+        request_meta,
+        result_ids,
+    )
+    _advance_chain_head(db, actor.tenant_id, row.hash, 1)
     db.add(row)
-    db.commit()
-    db.refresh(row)
+    if commit:
+        db.commit()
+        db.refresh(row)
     return row
+
+
+def append_audit_logs(
+    db: Session,
+    actor: ActorContext,
+    action: str,
+    resource_type: str,
+    entries: List[Dict[str, Any]],
+) -> List[AuditLog]:
+    """
+    Appends one contiguous chain segment: the head is locked and read once and each
+    entry (resource_id, request_meta, result_ids) links to the one before it. A single
+    commit covers the segment and anything else pending in the session.
+    """
+    prev_hash = _lock_chain_head(db, actor.tenant_id)
+    created_at = datetime.now(timezone.utc)
+    rows = []
+    for entry in entries:
+        row = _chain_audit_row(
+            actor,
+            prev_hash,
+            created_at,
+            action,
+            resource_type,
+            entry.get("resource_id"),
+            entry.get("request_meta"),
+            entry.get("result_ids"),
+        )
+        rows.append(row)
+        prev_hash = row.hash
+    if rows:
+        _advance_chain_head(db, actor.tenant_id, prev_hash, len(rows))
+    db.add_all(rows)
+    db.commit()
+    return rows
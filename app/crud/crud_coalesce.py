@@ -0,0 +1,160 @@
+# crud_coalesce.py
+#
+# Alert-storm coalescing. With INGEST_COALESCE on, a new incident that matches a live
+# one in the same tenant and service, last seen within COALESCE_WINDOW_SECONDS, is
+# folded into it: occurrence_count and last_seen_at go up, and no row, embedding or
+# audit entry is written for the repeat. A match is the same fingerprint (a range
+# probe on ix_incident_logs_coalesce) or, if COALESCE_MAX_DISTANCE > 0, an embedding
+# neighbour within that cosine distance (a LIMIT 1 probe on the ANN index).
+
+from collections import Counter
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, List, Optional, Tuple
+
+from sqlalchemy import Integer, column, func, select, text, tuple_, update, values
+from sqlalchemy.orm import Session
+
+from app.core.config import COALESCE_MAX_DISTANCE, COALESCE_WINDOW_SECONDS
+from app.core.fingerprint import message_fingerprint
+from app.crud import crud
+from app.models.incident import IncidentLog
+from app.schemas.incident import IncidentLogCreate
+
+# (service, fingerprint)
+Group = Tuple[str, str]
+
+
+def _lock_groups(db: Session, tenant_id: str, groups: List[Group]) -> None:
+    """
+    Transaction-scoped advisory locks, one per group, taken in sorted order so two
+    batches can't deadlock. Concurrent repeats of one alert queue here instead of
+    both missing the lookup and inserting twice.
+    """
+    keys = sorted({f"{tenant_id}|{service}|{fp}" for service, fp in groups})
+    db.execute(
+        text(
+            "SELECT pg_advisory_xact_lock(hashtextextended(k, 0)) "
+            "FROM (SELECT unnest(CAST(:keys AS text[])) AS k ORDER BY 1) AS ordered"
+        ),
+        {"keys": keys},
+    )
+
+
+def _live_conditions(tenant_id: str, cutoff: datetime) -> tuple:
+    return (
+        IncidentLog.tenant_id == tenant_id,
+        IncidentLog.is_deleted == False,  
+        IncidentLog.last_seen_at >= cutoff,
+    )
+
+
+def _by_fingerprint(db: Session, tenant_id: str, groups: List[Group], cutoff: datetime) -> Dict[Group, int]:
+    """Latest live incident per (service, fingerprint), one index probe per group."""
+    stmt = (
+        select(IncidentLog.service, IncidentLog.fingerprint, IncidentLog.id)
+        .distinct(IncidentLog.service, IncidentLog.fingerprint)
+        .where(
+            *_live_conditions(tenant_id, cutoff),
+            IncidentLog.fingerprint.is_not(None),
+            tuple_(IncidentLog.service, IncidentLog.fingerprint).in_(groups),
+        )
+        .order_by(IncidentLog.service, IncidentLog.fingerprint, IncidentLog.last_seen_at.desc())
+    )
+    return {(service, fp): incident_id for service, fp, incident_id in db.execute(stmt)}
+
+
+def _by_neighbour(db: Session, tenant_id: str, service: str, vec: List[float], cutoff: datetime) -> Optional[int]:
+    distance = IncidentLog.embedding.cosine_distance(vec)
+    stmt = (
+        select(IncidentLog.id, distance.label("distance"))
+        .where(*_live_conditions(tenant_id, cutoff), IncidentLog.service == service, IncidentLog.embedding.is_not(None))
+        .order_by(distance)
+        .limit(1)
+    )
+    row = db.execute(stmt).first()
+    return row.id if row is not None and row.distance <= COALESCE_MAX_DISTANCE else None
+
+
+def _fold(db: Session, tenant_id: str, counts: Dict[int, int]) -> Dict[int, Any]:
+    """
+    Bumps occurrence_count and last_seen_at on each target with one UPDATE ... FROM (VALUES ...),
+    and counts the repeats in the stack fingerprint rollup. Repeats go to the bucket of the
+    incident's created_at hour, like the incident itself, so a later trace edit or delete
+    moves its whole occurrence_count out of one bucket.
+    """
+    folds = values(column("id", Integer), column("n", Integer), name="folds").data(list(counts.items()))
+    stmt = (
+        update(IncidentLog)
+        .where(IncidentLog.id == folds.c.id)
+        .values(occurrence_count=IncidentLog.occurrence_count + folds.c.n, last_seen_at=func.now())
+        .returning(*crud._read_columns())
+        .execution_options(synchronize_session=False)
+    )
+    rows = {row.id: row for row in db.execute(stmt)}
+    crud.record_stack_counts(db, tenant_id, [
+        (row.stack_fingerprint, row.created_at, row.id, counts[row.id]) for row in rows.values()
+    ])
+    return rows
+
+
+def create_or_coalesce(db: Session, tenant_id: str, incidents: List[IncidentLogCreate]) -> List[Tuple[Any, bool]]:
+    """
+    Returns (row, coalesced) per incident, in order. Repeats within the batch fold
+    into the first of them, which is inserted with the group's occurrence_count.
+    Does not commit.
+    """
+    if not incidents:
+        return []
+
+    cutoff = datetime.now(timezone.utc) - timedelta(seconds=COALESCE_WINDOW_SECONDS)
+    redacted = [crud._redact_message(i.message) for i in incidents]
+    groups: List[Group] = [(i.service, message_fingerprint(i.title, r)) for i, r in zip(incidents, redacted)]
+
+    _lock_groups(db, tenant_id, groups)
+    targets: Dict[Group, int] = _by_fingerprint(db, tenant_id, list(set(groups)), cutoff)
+
+    # First item of each unmatched group is a candidate new incident
+    firsts: Dict[Group, int] = {}
+    for i, group in enumerate(groups):
+        if group not in targets and group not in firsts:
+            firsts[group] = i
+    candidates = list(firsts.values())
+
+    embedding_fields = crud._embedding_fields(db, [redacted[i] for i in candidates]) if candidates else []
+    new: List[int] = []
+    new_fields: List[Dict[str, Any]] = []
+    for i, fields in zip(candidates, embedding_fields):
+        neighbour = None
+        if COALESCE_MAX_DISTANCE > 0 and fields["embedding"] is not None:
+            neighbour = _by_neighbour(db, tenant_id, incidents[i].service, fields["embedding"], cutoff)
+        if neighbour is None:
+            new.append(i)
+            new_fields.append(fields)
+        else:
+            targets[groups[i]] = neighbour
+
+    sizes = Counter(g for g in groups if g not in targets)
+    inserted: Dict[int, Any] = {}
+    if new:
+        rows = crud.insert_incidents(
+            db,
+            tenant_id,
+            [incidents[i] for i in new],
+            [redacted[i] for i in new],
+            embedding_fields=new_fields,
+            occurrences=[sizes[groups[i]] for i in new],
+        )
+        inserted = dict(zip(new, rows))
+
+    fold_counts = Counter(targets[g] for g in groups if g in targets)
+    folded = _fold(db, tenant_id, fold_counts) if fold_counts else {}
+
+    results: List[Tuple[Any, bool]] = []
+    for i, group in enumerate(groups):
+        if i in inserted:
+            results.append((inserted[i], False))
+        elif group in targets:
+            results.append((folded[targets[group]], True))
+        else:
+            results.append((inserted[firsts[group]], True))
+    return results
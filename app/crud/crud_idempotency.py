@@ -0,0 +1,139 @@
+# crud_idempotency.py
+#
+# Idempotent ingest. A create can carry a key: the Idempotency-Key header, or the
+# alert's source plus external_id. The first request with a key creates the incident
+# and claims the key in the same transaction; a replay within IDEMPOTENCY_TTL_SECONDS
+# gets the original row back with no redaction, embedding, insert or audit entry.
+# Keys are stored hashed and are unique per tenant; an expired key is reclaimed in place.
+
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, List, Optional, Tuple
+
+from sqlalchemy import delete, func, select, tuple_
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.orm import Session
+
+from app.core.config import IDEMPOTENCY_TTL_SECONDS
+from app.crud.crud import create_incidents_bulk, get_incident_rows
+from app.crud.crud_coalesce import create_or_coalesce
+from app.models.idempotency import IdempotencyKey
+from app.schemas.incident import IncidentLogCreate
+from app.security.hashing import sha256_hex
+
+
+class IdempotencyConflict(Exception):
+    """A concurrent request claimed the same key first."""
+
+
+def incident_key(incident: IncidentLogCreate, header: Optional[str] = None, position: Optional[int] = None) -> Optional[str]:
+    """
+    The idempotency key for one incident, or None. A header key wins; in a batch it is
+    scoped by the item's position, so replaying the same request replays every item.
+    The prefixes keep header keys and natural keys from colliding.
+    """
+    if header:
+        return f"header:{header}" if position is None else f"header:{header}:{position}"
+    if incident.external_id:
+        return f"external:{incident.source or ''}:{incident.external_id}"
+    return None
+
+
+def _live_claims(db: Session, tenant_id: str, hashes: List[str]) -> Dict[str, int]:
+    stmt = select(IdempotencyKey.key_hash, IdempotencyKey.incident_id).where(
+        IdempotencyKey.tenant_id == tenant_id,
+        IdempotencyKey.key_hash.in_(hashes),
+        IdempotencyKey.expires_at > func.now(),
+    )
+    return {key_hash: incident_id for key_hash, incident_id in db.execute(stmt)}
+
+
+def _claim(db: Session, tenant_id: str, claims: Dict[str, int]) -> None:
+    """
+    Claims keys with one INSERT ... ON CONFLICT that only overwrites expired entries.
+    A key another transaction holds blocks on the unique index until that commits,
+    then comes back unclaimed, and the whole call fails with IdempotencyConflict.
+    Rows go in sorted by key_hash, so two calls sharing keys can't deadlock.
+    """
+    now = datetime.now(timezone.utc)
+    expires_at = now + timedelta(seconds=IDEMPOTENCY_TTL_SECONDS)
+    stmt = pg_insert(IdempotencyKey).values([
+        {"tenant_id": tenant_id, "key_hash": key_hash, "incident_id": incident_id, "created_at": now, "expires_at": expires_at}
+        for key_hash, incident_id in sorted(claims.items())
+    ])
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[IdempotencyKey.tenant_id, IdempotencyKey.key_hash],
+        set_={
+            "incident_id": stmt.excluded.incident_id,
+            "created_at": stmt.excluded.created_at,
+            "expires_at": stmt.excluded.expires_at,
+        },
+        where=IdempotencyKey.expires_at <= func.now(),
+    ).returning(IdempotencyKey.key_hash)
+    if len(db.execute(stmt).all()) < len(claims):
+        raise IdempotencyConflict()
+
+
+def create_incidents_once(
+    db: Session,
+    tenant_id: str,
+    incidents: List[IncidentLogCreate],
+    keys: List[Optional[str]],
+    coalesce: bool = False,
+) -> List[Tuple[Any, str]]:
+    """
+    create_incidents_bulk with replay. Returns (row, status) per incident, in order,
+    status being created, coalesced or replayed. Items whose key is live come back as
+    the original row; repeats of a key within the call share the first item's row.
+    Only unkeyed and first-seen items are written (folded into a live incident when
+    coalesce is on), and a call without keys issues no extra statements.
+
+    Does not commit. Raises IdempotencyConflict if a concurrent request won a key.
+    """
+    hashes = [sha256_hex(k) if k else None for k in keys]
+    live = _live_claims(db, tenant_id, list({h for h in hashes if h})) if any(hashes) else {}
+
+    fresh: List[int] = []
+    first_seen: Dict[str, int] = {}
+    for i, h in enumerate(hashes):
+        if h is None:
+            fresh.append(i)
+        elif h not in live and h not in first_seen:
+            first_seen[h] = i
+            fresh.append(i)
+
+    batch = [incidents[i] for i in fresh]
+    if coalesce:
+        written = create_or_coalesce(db, tenant_id=tenant_id, incidents=batch)
+    else:
+        written = [(row, False) for row in create_incidents_bulk(db, tenant_id=tenant_id, incidents=batch)]
+    written_at = dict(zip(fresh, written))
+    if first_seen:
+        _claim(db, tenant_id, {h: written_at[i][0].id for h, i in first_seen.items()})
+    originals = get_incident_rows(db, tenant_id, list(set(live.values())))
+
+    results: List[Tuple[Any, str]] = []
+    for i, h in enumerate(hashes):
+        if i in written_at:
+            row, coalesced = written_at[i]
+            results.append((row, "coalesced" if coalesced else "created"))
+        elif h in live:
+            results.append((originals[live[h]], "replayed"))
+        else:
+            results.append((written_at[first_seen[h]][0], "replayed"))
+    return results
+
+
+def purge_expired_keys(db: Session, batch_size: int = 10_000) -> int:
+    """Deletes up to batch_size expired keys and commits. Returns how many were removed."""
+    expired = (
+        select(IdempotencyKey.tenant_id, IdempotencyKey.key_hash)
+        .where(IdempotencyKey.expires_at <= func.now())
+        .limit(batch_size)
+    )
+    result = db.execute(
+        delete(IdempotencyKey).where(
+            tuple_(IdempotencyKey.tenant_id, IdempotencyKey.key_hash).in_(expired)
+        )
+    )
+    db.commit()
+    return result.rowcount
@@ -0,0 +1,203 @@
+# crud_import.py
+#
+# NDJSON import: the request body is split into lines as it arrives, grouped into
+# fixed-size batches and each batch goes through the bulk redact/insert/embed path
+# with its own audit segment and commit. A bounded queue between the reader and
+# the writer is the backpressure: once it is full the body is not read further.
+
+import asyncio
+import json
+from dataclasses import dataclass, asdict
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, List, Optional, Tuple, TypeVar
+
+from pydantic import ValidationError
+from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy.orm import Session
+
+from app.crud.crud_idempotency import IdempotencyConflict, create_incidents_once, incident_key
+from app.crud.crud_auth import ActorContext, append_audit_logs
+from app.schemas.incident import IncidentLogCreate
+
+T = TypeVar("T")
+R = TypeVar("R")
+
+# (line number, raw line) or (line number, None) for a line that was over the size limit
+Line = Tuple[int, Any]
+
+_DONE = object()
+
+
+@dataclass
+class ImportSummary:
+    lines: int = 0
+    created: int = 0
+    coalesced: int = 0
+    replayed: int = 0
+    invalid: int = 0
+    errors: int = 0
+    batches: int = 0
+
+    def add(self, results: List[Dict[str, Any]]) -> None:
+        self.batches += 1
+        for r in results:
+            self.lines += 1
+            if r["status"] == "created":
+                self.created += 1
+            elif r["status"] == "coalesced":
+                self.coalesced += 1
+            elif r["status"] == "replayed":
+                self.replayed += 1
+            elif r["status"] == "invalid":
+                self.invalid += 1
+            else:
+                self.errors += 1
+
+    def as_dict(self) -> Dict[str, int]:
+        return asdict(self)
+
+
+async def ndjson_lines(chunks: AsyncIterator[bytes], max_line_bytes: int) -> AsyncIterator[Line]:
+    """
+    Splits a byte stream into numbered lines without holding more than one line.
+    Blank lines are skipped (but counted); a line longer than max_line_bytes is
+    discarded as it streams past and reported as (number, None).
+    """
+    buf = b""
+    line_no = 0
+    discarding = False
+    async for chunk in chunks:
+        buf += chunk
+        if b"\n" in chunk:
+            *lines, buf = buf.split(b"\n")
+            for line in lines:
+                line_no += 1
+                if discarding or len(line) > max_line_bytes:
+                    discarding = False
+                    yield line_no, None
+                elif line.strip():
+                    yield line_no, line
+        if len(buf) > max_line_bytes:
+            discarding = True
+            buf = b""
+    if discarding:
+        yield line_no + 1, None
+    elif buf.strip():
+        yield line_no + 1, buf
+
+
+async def batched(items: AsyncIterator[T], size: int) -> AsyncIterator[List[T]]:
+    batch: List[T] = []
+    async for item in items:
+        batch.append(item)
+        if len(batch) >= size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+async def pipelined(
+    batches: AsyncIterator[T],
+    process: Callable[[T], Awaitable[R]],
+    max_in_flight: int,
+) -> AsyncIterator[R]:
+    """
+    Runs process() over batches one at a time, in order, while a reader task keeps up
+    to max_in_flight batches queued ahead. When the queue is full the reader blocks,
+    so the source (the request body) is only consumed as fast as batches are written.
+    """
+    queue: asyncio.Queue = asyncio.Queue(maxsize=max_in_flight)
+
+    async def read() -> None:
+        try:
+            async for batch in batches:
+                await queue.put(batch)
+        except Exception as e:
+            await queue.put(e)
+        else:
+            await queue.put(_DONE)
+
+    reader = asyncio.create_task(read())
+    try:
+        while True:
+            item = await queue.get()
+            if item is _DONE:
+                break
+            if isinstance(item, Exception):
+                raise item
+            yield await process(item)
+    finally:
+        reader.cancel()
+
+
+def validation_message(e: ValidationError) -> str:
+    return "; ".join(f"{'.'.join(str(p) for p in err['loc']) or 'item'}: {err['msg']}" for err in e.errors())
+
+
+def _parse(raw: Any) -> Tuple[Optional[IncidentLogCreate], Optional[str]]:
+    if raw is None:
+        return None, "line too long"
+    try:
+        return IncidentLogCreate.model_validate(json.loads(raw)), None
+    except ValidationError as e:
+        return None, validation_message(e)
+    except ValueError as e:
+        # JSONDecodeError, or bytes that are not UTF-8
+        return None, f"invalid JSON: {getattr(e, 'msg', e)}"
+
+
+def import_batch(
+    db: Session,
+    actor: ActorContext,
+    batch: List[Line],
+    idempotency_key: Optional[str] = None,
+    coalesce: bool = False,
+) -> List[Dict[str, Any]]:
+    """
+    Validates, inserts and audits one batch in a single transaction.
+    Returns one result per line, in order; a database error fails only this batch.
+    Lines whose idempotency key is already live come back as "replayed", and with
+    coalesce on, repeats of a live alert as "coalesced".
+    """
+    results: List[Dict[str, Any]] = []
+    valid: List[IncidentLogCreate] = []
+    keys: List[Optional[str]] = []
+    slots: List[int] = []
+    for line_no, raw in batch:
+        incident, error = _parse(raw)
+        if incident is None:
+            results.append({"line": line_no, "status": "invalid", "error": error})
+        else:
+            valid.append(incident)
+            keys.append(incident_key(incident, idempotency_key, line_no))
+            slots.append(len(results))
+            results.append({"line": line_no})
+
+    if not valid:
+        return results
+
+    try:
+        outcomes = create_incidents_once(db, tenant_id=actor.tenant_id, incidents=valid, keys=keys, coalesce=coalesce)
+        created = [row for row, status in outcomes if status == "created"]
+        if created:
+            append_audit_logs(
+                db,
+                actor=actor,
+                action="INCIDENT_CREATE",
+                resource_type="incident",
+                entries=[
+                    {"resource_id": str(row.id), "request_meta": {"service": row.service, "severity": row.severity, "import": True}}
+                    for row in created
+                ],
+            )
+        else:
+            db.commit()
+    except (SQLAlchemyError, IdempotencyConflict) as e:
+        db.rollback()
+        for slot in slots:
+            results[slot].update(status="error", error=type(e).__name__)
+        return results
+
+    for slot, (row, status) in zip(slots, outcomes):
+        results[slot].update(status=status, id=row.id)
+    return results
@@ -0,0 +1,96 @@
+# app/crud/crud_key_usage.py
+#
+# Write-behind api_keys.last_used_at. Authentication only records the key id and
+# time in memory; a background thread writes all keys seen since the last flush
+# with one UPDATE ... FROM (VALUES ...) every KEY_USAGE_FLUSH_SECONDS. Each API
+# process has its own buffer, and GREATEST keeps the column monotonic between them.
+
+import logging
+import threading
+import time
+from datetime import datetime, timezone
+from typing import Callable, Dict, Optional
+
+from sqlalchemy import DateTime, Integer, column, func, update, values
+from sqlalchemy.orm import Session
+
+from app.core import metrics
+from app.core.config import KEY_USAGE_FLUSH_SECONDS
+from app.models.auth import ApiKey
+
+logger = logging.getLogger(__name__)
+
+
+class KeyUsageBuffer:
+    def __init__(self, flush_seconds: float = KEY_USAGE_FLUSH_SECONDS):
+        self.flush_seconds = flush_seconds
+        self._pending: Dict[int, float] = {}
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def touch(self, api_key_id: int) -> None:
+        """Records a use. No I/O; the latest time per key wins."""
+        now = time.time()
+        with self._lock:
+            self._pending[api_key_id] = now
+
+    def drain(self) -> Dict[int, float]:
+        with self._lock:
+            pending, self._pending = self._pending, {}
+        return pending
+
+    def _restore(self, pending: Dict[int, float]) -> None:
+        with self._lock:
+            for key_id, ts in pending.items():
+                if ts > self._pending.get(key_id, 0.0):
+                    self._pending[key_id] = ts
+
+    def flush(self, session_factory: Callable[[], Session]) -> int:
+        """Writes everything buffered in one statement. Returns the number of keys written."""
+        pending = self.drain()
+        if not pending:
+            return 0
+        rows = [(key_id, datetime.fromtimestamp(ts, timezone.utc)) for key_id, ts in pending.items()]
+        used = values(column("id", Integer), column("ts", DateTime(timezone=True)), name="used").data(rows)
+        stmt = (
+            update(ApiKey)
+            .where(ApiKey.id == used.c.id)
+            .values(last_used_at=func.greatest(ApiKey.last_used_at, used.c.ts))
+            .execution_options(synchronize_session=False)
+        )
+        try:
+            with session_factory() as db:
+                db.execute(stmt)
+                db.commit()
+        except Exception:
+            # Keep the timestamps for the next attempt
+            self._restore(pending)
+            metrics.inc("key_usage_flush_errors_total")
+            raise
+        metrics.inc("key_usage_keys_flushed_total", len(rows))
+        return len(rows)
+
+    def start(self, session_factory: Callable[[], Session]) -> "KeyUsageBuffer":
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._loop, args=(session_factory,), name="key-usage-flush", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self, session_factory: Callable[[], Session], timeout: Optional[float] = 10.0) -> None:
+        """Stops the flusher and writes what is left."""
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+            self._thread = None
+        self.flush(session_factory)
+
+    def _loop(self, session_factory: Callable[[], Session]) -> None:
+        while not self._stop.wait(self.flush_seconds):
+            try:
+                self.flush(session_factory)
+            except Exception:
+                logger.exception("key usage flush failed")
+
+
+key_usage = KeyUsageBuffer()
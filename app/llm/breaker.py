@@ -0,0 +1,151 @@
+# app/llm/breaker.py
+#
+# Circuit breaker for the embedding provider. Failures and calls slower than
+# the latency budget both count against a sliding window of recent calls;
+# when the failure rate crosses the threshold the breaker opens and callers
+# fail fast with CircuitOpenError until a half-open probe succeeds.
+# Errors marked transient=False (the provider rejected one input) say nothing
+# about the provider's health and are not counted as failures.
+
+import threading
+import time
+from collections import deque
+from typing import Callable, Deque, TypeVar
+
+from app.core import metrics
+from app.core.config import (
+    EMBED_BREAKER_FAILURE_RATE,
+    EMBED_BREAKER_MIN_CALLS,
+    EMBED_BREAKER_WINDOW,
+    EMBED_BREAKER_LATENCY_BUDGET_SECONDS,
+    EMBED_BREAKER_OPEN_SECONDS,
+    EMBED_BREAKER_HALF_OPEN_CALLS,
+)
+from app.llm.embeddings import EmbeddingError
+
+T = TypeVar("T")
+
+CLOSED = "closed"
+HALF_OPEN = "half_open"
+OPEN = "open"
+
+_STATE_GAUGE = {CLOSED: 0, HALF_OPEN: 1, OPEN: 2}
+
+
+class CircuitOpenError(EmbeddingError):
+    def __init__(self, retry_after: float):
+        super().__init__("Embedding provider circuit is open")
+        self.retry_after = retry_after
+
+
+class CircuitBreaker:
+    def __init__(
+        self,
+        name: str,
+        failure_rate_threshold: float = EMBED_BREAKER_FAILURE_RATE,
+        min_calls: int = EMBED_BREAKER_MIN_CALLS,
+        window_size: int = EMBED_BREAKER_WINDOW,
+        latency_budget: float = EMBED_BREAKER_LATENCY_BUDGET_SECONDS,
+        open_seconds: float = EMBED_BREAKER_OPEN_SECONDS,
+        half_open_max_calls: int = EMBED_BREAKER_HALF_OPEN_CALLS,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        self.name = name
+        self.failure_rate_threshold = failure_rate_threshold
+        self.min_calls = min_calls
+        self.latency_budget = latency_budget
+        self.open_seconds = open_seconds
+        self.half_open_max_calls = max(1, half_open_max_calls)
+        self._clock = clock
+
+        self._lock = threading.Lock()
+        self._window: Deque[bool] = deque(maxlen=max(1, window_size))  # True = failure
+        self._state = CLOSED
+        self._opened_at = 0.0
+        self._half_open_in_flight = 0
+        self._half_open_successes = 0
+        metrics.set_gauge("embedding_breaker_state", _STATE_GAUGE[CLOSED], breaker=name)
+
+    @property
+    def state(self) -> str:
+        with self._lock:
+            self._maybe_half_open()
+            return self._state
+
+    def retry_after(self) -> float:
+        with self._lock:
+            if self._state != OPEN:
+                return 0.0
+            return max(0.0, self._opened_at + self.open_seconds - self._clock())
+
+    def call(self, fn: Callable[[], T]) -> T:
+        self._before_call()
+        started = self._clock()
+        try:
+            result = fn()
+        except Exception as e:
+            self._after_call(failed=getattr(e, "transient", True))
+            raise
+        self._after_call(failed=self._clock() - started > self.latency_budget)
+        return result
+
+    def reset(self) -> None:
+        with self._lock:
+            self._window.clear()
+            self._transition(CLOSED)
+
+    # -- internals (all called with self._lock held unless noted) -----------
+
+    def _transition(self, to: str) -> None:
+        if to == self._state:
+            return
+        metrics.inc("embedding_breaker_transitions_total", breaker=self.name, from_state=self._state, to_state=to)
+        metrics.set_gauge("embedding_breaker_state", _STATE_GAUGE[to], breaker=self.name)
+        self._state = to
+        if to == OPEN:
+            self._opened_at = self._clock()
+        if to == HALF_OPEN:
+            self._half_open_in_flight = 0
+            self._half_open_successes = 0
+        if to == CLOSED:
+            self._window.clear()
+
+    def _maybe_half_open(self) -> None:
+        if self._state == OPEN and self._clock() - self._opened_at >= self.open_seconds:
+            self._transition(HALF_OPEN)
+
+    def _before_call(self) -> None:
+        # not under lock on entry
+        with self._lock:
+            self._maybe_half_open()
+            if self._state == OPEN:
+                metrics.inc("embedding_breaker_rejected_total", breaker=self.name)
+                raise CircuitOpenError(max(0.0, self._opened_at + self.open_seconds - self._clock()))
+            if self._state == HALF_OPEN:
+                if self._half_open_in_flight >= self.half_open_max_calls:
+                    metrics.inc("embedding_breaker_rejected_total", breaker=self.name)
+                    raise CircuitOpenError(self.open_seconds)
+                self._half_open_in_flight += 1
+
+    def _after_call(self, failed: bool) -> None:
+        # not under lock on entry
+        with self._lock:
+            if self._state == HALF_OPEN:
+                self._half_open_in_flight = max(0, self._half_open_in_flight - 1)
+                if failed:
+                    self._transition(OPEN)
+                    return
+                self._half_open_successes += 1
+                if self._half_open_successes >= self.half_open_max_calls:
+                    self._transition(CLOSED)
+                return
+
+            if self._state != CLOSED:
+                return
+            self._window.append(failed)
+            calls = len(self._window)
+            if calls >= self.min_calls and sum(self._window) / calls >= self.failure_rate_threshold:
+                self._transition(OPEN)
+
+
+provider_breaker = CircuitBreaker("embedding_provider")
@@ -0,0 +1,136 @@
+# app/llm/cache.py
+
+from datetime import timedelta
+from typing import Dict, List, Optional, Sequence
+
+import numpy as np
+from sqlalchemy import delete, func, select, tuple_
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.orm import Session
+
+from app.core import metrics
+from app.core.cache import LRUCache
+from app.core.config import EMBED_CACHE_SIZE, EMBED_CACHE_DB, EMBED_CACHE_DB_TTL_DAYS
+from app.models.embedding_cache import EmbeddingCacheEntry
+from app.security.hashing import sha256_hex
+
+
+def content_hash(text: str) -> str:
+    return sha256_hex(text)
+
+
+class EmbeddingCache:
+    """
+    Content-addressed embedding cache keyed by (model, sha256(text)).
+
+    Tier 1 is a bounded in-process LRU holding float32 vectors (~6 KB each).
+    Tier 2 (optional) is the embedding_cache table, read and written through
+    the caller's session so entries commit with the incident they belong to.
+    """
+
+    def __init__(self, maxsize: int, use_db: bool = False):
+        self.memory = LRUCache(maxsize)
+        self.use_db = use_db
+
+    def get(self, db: Optional[Session], model: str, key_hash: str) -> Optional[List[float]]:
+        vec = self.memory.get((model, key_hash))
+        if vec is not None:
+            metrics.inc("embedding_cache_hits_total", tier="memory")
+            return vec.tolist()
+        metrics.inc("embedding_cache_misses_total", tier="memory")
+
+        if not (self.use_db and db is not None):
+            return None
+
+        row = db.get(EmbeddingCacheEntry, (model, key_hash))
+        if row is None:
+            metrics.inc("embedding_cache_misses_total", tier="db")
+            return None
+        metrics.inc("embedding_cache_hits_total", tier="db")
+        vec = np.asarray(row.embedding, dtype=np.float32)
+        self.memory.set((model, key_hash), vec)
+        return vec.tolist()
+
+    def put(self, db: Optional[Session], model: str, key_hash: str, vec: List[float], persist: bool = True) -> None:
+        self.memory.set((model, key_hash), np.asarray(vec, dtype=np.float32))
+        if persist and self.use_db and db is not None:
+            stmt = (
+                pg_insert(EmbeddingCacheEntry)
+                .values(model=model, content_hash=key_hash, embedding=vec)
+                .on_conflict_do_nothing(index_elements=["model", "content_hash"])
+            )
+            db.execute(stmt)
+
+    def get_many(self, db: Optional[Session], model: str, key_hashes: Sequence[str]) -> Dict[str, List[float]]:
+        """Batch form of get: memory misses are looked up with one SELECT. Returns the hits by hash."""
+        found: Dict[str, List[float]] = {}
+        missed = []
+        for key_hash in dict.fromkeys(key_hashes):
+            vec = self.memory.get((model, key_hash))
+            if vec is not None:
+                found[key_hash] = vec.tolist()
+            else:
+                missed.append(key_hash)
+        metrics.inc("embedding_cache_hits_total", len(found), tier="memory")
+        metrics.inc("embedding_cache_misses_total", len(missed), tier="memory")
+
+        if not (missed and self.use_db and db is not None):
+            return found
+
+        rows = db.execute(
+            select(EmbeddingCacheEntry.content_hash, EmbeddingCacheEntry.embedding).where(
+                tuple_(EmbeddingCacheEntry.model, EmbeddingCacheEntry.content_hash).in_([(model, h) for h in missed])
+            )
+        ).all()
+        metrics.inc("embedding_cache_hits_total", len(rows), tier="db")
+        metrics.inc("embedding_cache_misses_total", len(missed) - len(rows), tier="db")
+        for key_hash, embedding in rows:
+            vec = np.asarray(embedding, dtype=np.float32)
+            self.memory.set((model, key_hash), vec)
+            found[key_hash] = vec.tolist()
+        return found
+
+    def put_many(self, db: Optional[Session], model: str, vecs: Dict[str, List[float]]) -> None:
+        """Batch form of put: the database tier is written with one multi-row INSERT."""
+        for key_hash, vec in vecs.items():
+            self.memory.set((model, key_hash), np.asarray(vec, dtype=np.float32))
+        if vecs and self.use_db and db is not None:
+            stmt = (
+                pg_insert(EmbeddingCacheEntry)
+                .values([{"model": model, "content_hash": h, "embedding": v} for h, v in vecs.items()])
+                .on_conflict_do_nothing(index_elements=["model", "content_hash"])
+            )
+            db.execute(stmt)
+
+    def stats(self) -> dict:
+        return {
+            "size": len(self.memory),
+            "maxsize": self.memory.maxsize,
+            "hits": self.memory.hits,
+            "misses": self.memory.misses,
+            "evictions": self.memory.evictions,
+            "db_tier": self.use_db,
+        }
+
+    def clear(self) -> None:
+        self.memory.clear()
+
+
+def purge_expired_entries(db: Session, max_age_days: int = EMBED_CACHE_DB_TTL_DAYS, batch_size: int = 10_000) -> int:
+    """Deletes up to batch_size embedding_cache rows older than max_age_days and commits. Returns how many were removed."""
+    expired = (
+        select(EmbeddingCacheEntry.model, EmbeddingCacheEntry.content_hash)
+        .where(EmbeddingCacheEntry.created_at <= func.now() - timedelta(days=max_age_days))
+        .limit(batch_size)
+    )
+    result = db.execute(
+        delete(EmbeddingCacheEntry).where(
+            tuple_(EmbeddingCacheEntry.model, EmbeddingCacheEntry.content_hash).in_(expired)
+        )
+    )
+    db.commit()
+    return result.rowcount
+
+
+embedding_cache = EmbeddingCache(EMBED_CACHE_SIZE, use_db=EMBED_CACHE_DB)
+
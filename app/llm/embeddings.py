@@ -2,8 +2,9 @@
 
 import os
 import hashlib
-import random
-from typing import List, Tuple, Optional
+from typing import List, Tuple, Optional, Sequence
+
+import numpy as np
 
 from app.core.config import OPENAI_API_KEY, VECTOR_DIM
 
@@ -13,23 +14,108 @@ except Exception:
     OpenAI = None
 
 
+LOCAL_MODEL_NAME = "local-deterministic-v2"
+
+# Rows generated per NumPy block; bounds temporaries to ~ROWS * dim * 8 bytes each
+_LOCAL_BLOCK_ROWS = 512
+
+# splitmix64 constants (counter-based, so every element depends only on seed + index)
+_GOLDEN = np.uint64(0x9E3779B97F4A7C15)
+_MIX_1 = np.uint64(0xBF58476D1CE4E5B9)
+_MIX_2 = np.uint64(0x94D049BB133111EB)
+
+
 class EmbeddingError(Exception):
-    pass
+    """
+    transient=False marks an error that retrying the same input won't fix (the provider
+    rejected it); timeouts, connection errors and 5xx are transient.
+    """
 
+    def __init__(self, message: str = "", transient: bool = True):
+        super().__init__(message)
+        self.transient = transient
 
-def _local_deterministic_embedding(text: str, dim: int) -> List[float]:
+
+def _text_seed(text: str) -> int:
     # Stable seed from text so results are repeatable across runs/machines
     h = hashlib.sha256(text.encode("utf-8")).digest()
-    seed = int.from_bytes(h[:8], "big", signed=False)
-    rng = random.Random(seed)
+    return int.from_bytes(h[:8], "big", signed=False)
+
+
+def _local_deterministic_matrix(texts: Sequence[str], dim: int) -> np.ndarray:
+    """
+    Returns an (n, dim) float64 matrix of unit vectors, one row per text.
+
+    Row i depends only on sha256(texts[i]) and the column index, never on the
+    batch it was computed in, so output is identical for batch sizes 1..n and
+    across platforms (pure uint64 wrap-around arithmetic + IEEE float64).
+    """
+    n = len(texts)
+    out = np.empty((n, dim), dtype=np.float64)
+    if n == 0:
+        return out
+
+    seeds = np.fromiter((_text_seed(t) for t in texts), dtype=np.uint64, count=n)
+    counters = np.arange(1, dim + 1, dtype=np.uint64) * _GOLDEN
+
+    for start in range(0, n, _LOCAL_BLOCK_ROWS):
+        stop = min(start + _LOCAL_BLOCK_ROWS, n)
+        z = seeds[start:stop, None] + counters[None, :]
+        z ^= z >> np.uint64(30)
+        z *= _MIX_1
+        z ^= z >> np.uint64(27)
+        z *= _MIX_2
+        z ^= z >> np.uint64(31)
+
+        # Top 53 bits -> [0, 1) -> [-1, 1)
+        block = out[start:stop]
+        np.multiply(z >> np.uint64(11), 2.0 ** -52, out=block, casting="unsafe")
+        block -= 1.0
+
+        norms = np.sqrt(np.einsum("ij,ij->i", block, block))
+        norms[norms == 0] = 1.0
+        block /= norms[:, None]
+
+    return out
 
-    # Simple deterministic vector in [-1, 1]
-    vec = [(rng.random() * 2.0 - 1.0) for _ in range(dim)]
 
-    norm = sum(x * x for x in vec) ** 0.5
-    if norm > 0:
-        vec = [x / norm for x in vec]
-    return vec
+def _local_deterministic_embedding(text: str, dim: int) -> List[float]:
+    return _local_deterministic_matrix([text], dim)[0].tolist()
+
+
+def _use_local_mode() -> bool:
+    # Force local mode if no key or explicitly requested
+    mode = os.getenv("EMBEDDINGS_MODE", "").lower()  # set to "local" to force
+    return mode == "local" or not OPENAI_API_KEY or OpenAI is None
+
+
+def resolve_embedding_model(model: str) -> str:
+    """Name of the model that will actually produce vectors for a request for `model`."""
+    return LOCAL_MODEL_NAME if _use_local_mode() else model
+
+
+def generate_vector_embeddings_batch(
+    texts: Sequence[str], model: str = "text-embedding-3-small"
+) -> Tuple[List[List[float]], str]:
+    """
+    Returns (embedding_vectors, model_name) with one vector per input text,
+    in input order, or raises EmbeddingError.
+    """
+    texts = list(texts)
+    for t in texts:
+        if not t or not t.strip():
+            raise EmbeddingError("Text is empty or whitespace only.")
+    if not texts:
+        return [], resolve_embedding_model(model)
+
+    if _use_local_mode():
+        return _local_deterministic_matrix(texts, VECTOR_DIM).tolist(), LOCAL_MODEL_NAME
+
+    # OpenAI mode (costs money). Only used if key exists and EMBEDDINGS_MODE != local.
+    from app.llm.breaker import provider_breaker
+    from app.llm.provider import get_provider
+
+    return provider_breaker.call(lambda: get_provider().embed_many(texts, model)), model
 
 
 def generate_vector_embeddings(text: str, model: str = "text-embedding-3-small") -> Tuple[List[float], str]:
@@ -39,19 +125,11 @@ def generate_vector_embeddings(text: str, model: str = "text-embedding-3-small")
     if not text or not text.strip():
         raise EmbeddingError("Text is empty or whitespace only.")
 
-    # Force local mode if no key or explicitly requested
-    mode = os.getenv("EMBEDDINGS_MODE", "").lower()  # set to "local" to force
-    if mode == "local" or not OPENAI_API_KEY or OpenAI is None:
-        vec = _local_deterministic_embedding(text, VECTOR_DIM)
-        return vec, "local-deterministic-v1"
+    if _use_local_mode():
+        return _local_deterministic_embedding(text, VECTOR_DIM), LOCAL_MODEL_NAME
 
-    # OpenAI mode (costs money). Only used if key exists and EMBEDDINGS_MODE != local.
-    try:
-        client = OpenAI(api_key=OPENAI_API_KEY)
-        resp = client.embeddings.create(model=model, input=text)
-        vec = resp.data[0].embedding
-        if len(vec) != VECTOR_DIM:
-            raise EmbeddingError(f"Unexpected embedding dim {len(vec)} != {VECTOR_DIM}")
-        return vec, model
-    except Exception as e:
-        raise EmbeddingError(str(e)) from e
+    # Single texts go through the coalescing window so concurrent requests share calls
+    from app.llm.breaker import provider_breaker
+    from app.llm.provider import get_provider
+
+    return provider_breaker.call(lambda: get_provider().embed(text, model)), model
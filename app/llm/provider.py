@@ -0,0 +1,207 @@
+# app/llm/provider.py
+#
+# Long-lived embedding provider client. One OpenAI client (and one keep-alive
+# HTTP connection pool) per process; concurrent single-text requests are
+# coalesced into multi-input calls within a short window; a semaphore caps
+# requests in flight; every call has a deadline.
+
+import queue
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor, TimeoutError as FutureTimeout
+from typing import Dict, List, Optional, Sequence
+
+import httpx
+
+from app.core import metrics
+from app.core.config import (
+    OPENAI_API_KEY,
+    OPENAI_BASE_URL,
+    VECTOR_DIM,
+    EMBED_TIMEOUT_SECONDS,
+    EMBED_MAX_IN_FLIGHT,
+    EMBED_BATCH_WINDOW_MS,
+    EMBED_MAX_BATCH_SIZE,
+)
+from app.llm.embeddings import EmbeddingError
+
+try:
+    from openai import OpenAI
+except Exception:
+    OpenAI = None
+
+
+def _is_transient(e: Exception) -> bool:
+    # 4xx other than timeout/conflict/rate limit means this input will fail every time
+    status = getattr(e, "status_code", None)
+    return status is None or status >= 500 or status in (408, 409, 429)
+
+
+class _Pending:
+    __slots__ = ("text", "model", "future")
+
+    def __init__(self, text: str, model: str):
+        self.text = text
+        self.model = model
+        self.future: Future = Future()
+
+
+class EmbeddingProvider:
+    def __init__(
+        self,
+        api_key: str = OPENAI_API_KEY,
+        base_url: Optional[str] = OPENAI_BASE_URL,
+        timeout: float = EMBED_TIMEOUT_SECONDS,
+        max_in_flight: int = EMBED_MAX_IN_FLIGHT,
+        batch_window_ms: float = EMBED_BATCH_WINDOW_MS,
+        max_batch_size: int = EMBED_MAX_BATCH_SIZE,
+    ):
+        if OpenAI is None:
+            raise EmbeddingError("openai package is not installed")
+
+        self.timeout = timeout
+        self.max_in_flight = max(1, max_in_flight)
+        self.batch_window = batch_window_ms / 1000.0
+        self.max_batch_size = max(1, max_batch_size)
+
+        self._http = httpx.Client(
+            timeout=timeout,
+            limits=httpx.Limits(
+                max_connections=self.max_in_flight,
+                max_keepalive_connections=self.max_in_flight,
+            ),
+        )
+        # Retries are the caller's business (worker backoff); never hide latency here
+        self.client = OpenAI(api_key=api_key, base_url=base_url or None, timeout=timeout, max_retries=0, http_client=self._http)
+
+        self._sem = threading.BoundedSemaphore(self.max_in_flight)
+        self._queue: "queue.Queue[Optional[_Pending]]" = queue.Queue()
+        self._executor = ThreadPoolExecutor(max_workers=self.max_in_flight, thread_name_prefix="embed-call")
+        self._dispatcher = threading.Thread(target=self._dispatch_loop, name="embed-dispatch", daemon=True)
+        self._dispatcher.start()
+
+    # -- public API ---------------------------------------------------------
+
+    def embed(self, text: str, model: str, deadline: Optional[float] = None) -> List[float]:
+        """Single text; coalesced with concurrent callers into one provider call."""
+        item = _Pending(text, model)
+        self._queue.put(item)
+        try:
+            return item.future.result(timeout=self.timeout if deadline is None else deadline)
+        except FutureTimeout:
+            item.future.cancel()  # dropped from its batch if the call hasn't started
+            metrics.inc("embedding_provider_deadline_exceeded_total")
+            raise EmbeddingError("Embedding deadline exceeded") from None
+
+    def embed_many(self, texts: Sequence[str], model: str) -> List[List[float]]:
+        """Already-batched input (worker/backfill): chunked by max_batch_size, no coalescing window."""
+        out: List[List[float]] = []
+        for start in range(0, len(texts), self.max_batch_size):
+            out.extend(self._call(model, list(texts[start:start + self.max_batch_size])))
+        return out
+
+    def close(self) -> None:
+        self._queue.put(None)
+        self._dispatcher.join(timeout=5)
+        self._executor.shutdown(wait=True)
+        self._http.close()
+
+    # -- internals ----------------------------------------------------------
+
+    def _call(self, model: str, texts: List[str]) -> List[List[float]]:
+        with self._sem:
+            metrics.inc("embedding_provider_requests_total")
+            metrics.inc("embedding_provider_inputs_total", len(texts))
+            try:
+                resp = self.client.embeddings.create(model=model, input=texts)
+            except Exception as e:
+                metrics.inc("embedding_provider_errors_total")
+                raise EmbeddingError(str(e), transient=_is_transient(e)) from e
+
+        vecs = [list(d.embedding) for d in sorted(resp.data, key=lambda d: d.index)]
+        if len(vecs) != len(texts):
+            raise EmbeddingError(f"Expected {len(texts)} embeddings, got {len(vecs)}")
+        for vec in vecs:
+            if len(vec) != VECTOR_DIM:
+                raise EmbeddingError(f"Unexpected embedding dim {len(vec)} != {VECTOR_DIM}")
+        return vecs
+
+    def _dispatch_loop(self) -> None:
+        while True:
+            first = self._queue.get()
+            if first is None:
+                return
+            batch = [first]
+            closing = False
+            window_ends = time.monotonic() + self.batch_window
+            while len(batch) < self.max_batch_size:
+                remaining = window_ends - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    item = self._queue.get(timeout=remaining)
+                except queue.Empty:
+                    break
+                if item is None:
+                    closing = True
+                    break
+                batch.append(item)
+
+            by_model: Dict[str, List[_Pending]] = {}
+            for item in batch:
+                by_model.setdefault(item.model, []).append(item)
+            for model, items in by_model.items():
+                self._executor.submit(self._run_batch, model, items)
+
+            if closing:
+                return
+
+    def _run_batch(self, model: str, items: List[_Pending]) -> None:
+        # Skip callers that already gave up
+        live = [it for it in items if it.future.set_running_or_notify_cancel()]
+        if not live:
+            return
+
+        # Identical texts in one window share an input slot
+        unique: Dict[str, int] = {}
+        for it in live:
+            unique.setdefault(it.text, len(unique))
+
+        results = self._settle(model, list(unique))
+        metrics.inc("embedding_provider_coalesced_total", len(live))
+        for it in live:
+            result = results[it.text]
+            if isinstance(result, EmbeddingError):
+                it.future.set_exception(result)
+            else:
+                it.future.set_result(result)
+
+    def _settle(self, model: str, texts: List[str]) -> Dict[str, object]:
+        """
+        Vector or EmbeddingError per text. A batch the provider rejects is split in half
+        and retried, so one caller's bad input fails only that caller; a transient error
+        fails the whole batch, since a retry now would most likely fail the same way.
+        """
+        try:
+            return dict(zip(texts, self._call(model, texts)))
+        except Exception as e:
+            err = e if isinstance(e, EmbeddingError) else EmbeddingError(str(e))
+            if err.transient or len(texts) == 1:
+                return {t: err for t in texts}
+        mid = len(texts) // 2
+        out = self._settle(model, texts[:mid])
+        out.update(self._settle(model, texts[mid:]))
+        return out
+
+
+_provider: Optional[EmbeddingProvider] = None
+_provider_lock = threading.Lock()
+
+
+def get_provider() -> EmbeddingProvider:
+    global _provider
+    if _provider is None:
+        with _provider_lock:
+            if _provider is None:
+                _provider = EmbeddingProvider()
+    return _provider
@@ -1,6 +1,7 @@
+from contextlib import asynccontextmanager
 from pathlib import Path
 from fastapi import FastAPI, HTTPException
-from fastapi.responses import HTMLResponse
+from fastapi.responses import HTMLResponse, PlainTextResponse
 from fastapi.staticfiles import StaticFiles
 from fastapi.openapi.docs import get_swagger_ui_html, get_redoc_html
 from sqlalchemy import text
@@ -9,16 +10,42 @@ from sqlalchemy import text
 from app.core.database import engine
 
 from app.api.routes import router as api_router
+from app.core import invalidation, metrics
+from app.core.config import EMBED_PIPELINE, EMBED_WORKER_IN_PROCESS
+from app.crud.crud_key_usage import key_usage
 
 STATIC_DIR = Path(__file__).resolve().parent / "static"
 
 
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Receives cache invalidations published by other API processes
+    listener = invalidation.start_listener()
+    usage_flusher = key_usage.start(SessionLocal)
+    worker = None
+    if EMBED_PIPELINE == "async" and EMBED_WORKER_IN_PROCESS:
+        # Each API process drains the pending queue; SKIP LOCKED keeps them disjoint
+        from app.workers.embedding_worker import EmbeddingWorker
+
+        worker = EmbeddingWorker(SessionLocal)
+        worker.start()
+    try:
+        yield
+    finally:
+        if worker is not None:
+            worker.stop()
+        if listener is not None:
+            listener.stop()
+        usage_flusher.stop(SessionLocal)
+
+
 def create_app() -> FastAPI:
     app = FastAPI(
         title="Incident Intelligence API",
         docs_url=None,
         redoc_url=None,
         openapi_url="/openapi.json",
+        lifespan=lifespan,
     )
 
     app.mount("/static", StaticFiles(directory=STATIC_DIR), name="static")
@@ -38,6 +65,11 @@ def create_app() -> FastAPI:
         except Exception as e:
             raise HTTPException(status_code=503, detail="db not ready") from e
 
+    @app.get("/metrics", include_in_schema=False)
+    def metrics_endpoint():
+        # Prometheus text format, process-local
+        return PlainTextResponse(metrics.render_text())
+
     @app.get("/", include_in_schema=False)
     def root():
         html = """
@@ -1,7 +1,7 @@
 # models/auth.py
 
 from datetime import datetime, timezone
-from sqlalchemy import Column, Integer, String, DateTime, Boolean, Index, Text
+from sqlalchemy import BigInteger, Column, Integer, String, DateTime, Boolean, Index, Text
 from sqlalchemy.dialects.postgresql import JSONB
 
 from app.models.incident import Base  # reuse Base from models/incident.py
@@ -25,6 +25,13 @@ class ApiKey(Base):
 
     created_at = Column(DateTime(timezone=True), nullable=False, default=lambda: datetime.now(timezone.utc))
 
+    # Set on revoke; a rotated key keeps working until expires_at (the rotation grace period)
+    revoked_at = Column(DateTime(timezone=True), nullable=True)
+    expires_at = Column(DateTime(timezone=True), nullable=True)
+
+    # Approximate: written in batches by the key usage buffer, not on every request
+    last_used_at = Column(DateTime(timezone=True), nullable=True)
+
 
 class AuditLog(Base):
     __tablename__ = "audit_logs"
@@ -53,3 +60,16 @@ class AuditLog(Base):
     __table_args__ = (
         Index("ix_audit_logs_tenant_created", "tenant_id", "created_at"),
     )
+
+
+class AuditChainHead(Base):
+    """
+    Latest hash of each tenant's audit chain. Appends lock this row for the rest of
+    their transaction, so they serialize per tenant and never read the same head.
+    """
+    __tablename__ = "audit_chain_heads"
+
+    tenant_id = Column(String(100), primary_key=True)
+    hash = Column(String(64), nullable=True)  # null until the first entry
+    entries = Column(BigInteger, nullable=False, server_default="0")
+    updated_at = Column(DateTime(timezone=True), nullable=False, default=lambda: datetime.now(timezone.utc))
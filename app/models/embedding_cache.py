@@ -0,0 +1,23 @@
+# models/embedding_cache.py
+
+from sqlalchemy import Column, String, DateTime, Index
+from sqlalchemy.sql import func
+from pgvector.sqlalchemy import Vector
+
+from app.models.incident import Base  # reuse Base from models/incident.py
+
+
+class EmbeddingCacheEntry(Base):
+    __tablename__ = "embedding_cache"
+
+    # Content-addressed: (model, sha256(message_redacted))
+    model = Column(String(100), primary_key=True)
+    content_hash = Column(String(64), primary_key=True)
+
+    embedding = Column(Vector(1536), nullable=False)
+
+    created_at = Column(DateTime(timezone=True), server_default=func.now(), nullable=False)
+
+    __table_args__ = (
+        Index("ix_embedding_cache_created_at", "created_at"),
+    )
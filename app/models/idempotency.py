@@ -0,0 +1,24 @@
+# models/idempotency.py
+
+from sqlalchemy import Column, Integer, String, DateTime, ForeignKey, Index
+from sqlalchemy.sql import func
+
+from app.models.incident import Base  # reuse Base from models/incident.py
+
+
+class IdempotencyKey(Base):
+    __tablename__ = "idempotency_keys"
+
+    # Unique per tenant; the primary key is the index both the replay lookup and the claim use.
+    # key_hash is sha256 of the namespaced key, so header values of any length fit.
+    tenant_id = Column(String(100), primary_key=True)
+    key_hash = Column(String(64), primary_key=True)
+
+    incident_id = Column(Integer, ForeignKey("incident_logs.id", ondelete="CASCADE"), nullable=False)
+
+    created_at = Column(DateTime(timezone=True), server_default=func.now(), nullable=False)
+    expires_at = Column(DateTime(timezone=True), nullable=False)
+
+    __table_args__ = (
+        Index("ix_idempotency_keys_expires_at", "expires_at"),
+    )
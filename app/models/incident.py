@@ -1,16 +1,44 @@
 # models/incident.py
 
-from sqlalchemy.orm import DeclarativeBase
-from sqlalchemy import Column, Integer, Text, DateTime, String, Boolean, Index
-from sqlalchemy.dialects.postgresql import JSONB
-from sqlalchemy.sql import func
+from sqlalchemy.orm import DeclarativeBase, deferred
+from sqlalchemy import Column, Integer, Text, DateTime, String, Boolean, Index, Computed
+from sqlalchemy.dialects.postgresql import JSONB, TSVECTOR
+from sqlalchemy.sql import func, text
 from pgvector.sqlalchemy import Vector
 
+from app.core.config import ANN_INDEX_TYPE, HNSW_M, HNSW_EF_CONSTRUCTION, IVFFLAT_LISTS
+
 
 class Base(DeclarativeBase):
     pass
 
 
+# Weighted full-text document for lexical search. Long bodies are capped so a huge
+# message or stack trace can't push the tsvector past its 1MB limit and fail the insert.
+SEARCH_TSV_EXPRESSION = (
+    "setweight(to_tsvector('english', coalesce(title, '')), 'A') || "
+    "setweight(to_tsvector('english', coalesce(service, '')), 'A') || "
+    "setweight(jsonb_to_tsvector('english', coalesce(tags, '[]'::jsonb), '[\"string\"]'), 'B') || "
+    "setweight(to_tsvector('english', left(message_redacted, 262144)), 'B') || "
+    "setweight(to_tsvector('english', left(coalesce(stack_trace, ''), 262144)), 'C')"
+)
+
+
+def embedding_ann_index(index_type: str = ANN_INDEX_TYPE) -> Index:
+    """pgvector ANN index over incident_logs.embedding using cosine ops."""
+    if index_type == "ivfflat":
+        params = {"lists": IVFFLAT_LISTS}
+    else:
+        params = {"m": HNSW_M, "ef_construction": HNSW_EF_CONSTRUCTION}
+    return Index(
+        f"ix_incident_logs_embedding_{index_type}",
+        "embedding",
+        postgresql_using=index_type,
+        postgresql_with=params,
+        postgresql_ops={"embedding": "vector_cosine_ops"},
+    )
+
+
 class IncidentLog(Base):
     __tablename__ = "incident_logs"
 
@@ -33,10 +61,22 @@ class IncidentLog(Base):
     tags = Column(JSONB, nullable=True)
 
     # Store both. Gate raw later with RBAC.
-    message_raw = Column(Text, nullable=False)
+    # Deferred: only the raw endpoint reads it, everything else loads it on first access
+    message_raw = deferred(Column(Text, nullable=False))
     message_redacted = Column(Text, nullable=False)
 
     stack_trace = Column(Text, nullable=True)
+    # sha256 of the exception type + innermost frames, normalized (core/fingerprint.py)
+    stack_fingerprint = Column(String(64), nullable=True)
+
+    # Maintained by Postgres from the columns above; never written by the app
+    search_tsv = deferred(Column(TSVECTOR, Computed(SEARCH_TSV_EXPRESSION, persisted=True), nullable=True))
+
+    # Alert-storm coalescing: sha256 of the normalized title + redacted message (core/fingerprint.py).
+    # Repeats folded into this incident bump occurrence_count and last_seen_at.
+    fingerprint = Column(String(64), nullable=True)
+    occurrence_count = Column(Integer, nullable=False, server_default="1")
+    last_seen_at = Column(DateTime(timezone=True), server_default=func.now(), nullable=True)
 
     # Soft delete
     is_deleted = Column(Boolean, nullable=False, server_default="false", index=True)
@@ -44,21 +84,57 @@ class IncidentLog(Base):
     deleted_by = Column(String(100), nullable=True)
 
     # Embedding + metadata
-    embedding = Column(Vector(1536), nullable=True)
+    # Deferred: 1536 floats parsed per row, and no API response includes them
+    embedding = deferred(Column(Vector(1536), nullable=True))
 
     embedding_model = Column(String(100), nullable=True)
     embedding_dim = Column(Integer, nullable=True)
     embedding_version = Column(Integer, nullable=True)
+    # sha256(message_redacted) the current embedding was computed from
+    embedding_content_hash = Column(String(64), nullable=True)
 
     # pending | ready | failed
     embedding_status = Column(String(20), nullable=False, server_default="pending", index=True)
     embedding_updated_at = Column(DateTime(timezone=True), nullable=True)
     embedding_error = Column(Text, nullable=True)
 
+    # Background worker retry bookkeeping
+    embedding_attempts = Column(Integer, nullable=False, server_default="0")
+    embedding_next_attempt_at = Column(DateTime(timezone=True), nullable=True)
+
     # Useful composite indexes
     __table_args__ = (
         Index("ix_incident_logs_tenant_created", "tenant_id", "created_at"),
         Index("ix_incident_logs_tenant_service", "tenant_id", "service"),
+        # Structured search filters (service is covered above)
+        Index("ix_incident_logs_tenant_severity_created", "tenant_id", "severity", "created_at"),
+        Index("ix_incident_logs_tenant_source_created", "tenant_id", "source", "created_at"),
+        Index("ix_incident_logs_tags", "tags", postgresql_using="gin", postgresql_ops={"tags": "jsonb_path_ops"}),
+        # Incidents sharing a stack fingerprint, newest first
+        Index(
+            "ix_incident_logs_tenant_stack_fp_created",
+            "tenant_id",
+            "stack_fingerprint",
+            "created_at",
+            postgresql_where=text("stack_fingerprint IS NOT NULL"),
+        ),
+        # Coalescing lookup: latest live incident with this fingerprint in a tenant + service
+        Index(
+            "ix_incident_logs_coalesce",
+            "tenant_id",
+            "service",
+            "fingerprint",
+            "last_seen_at",
+            postgresql_where=text("fingerprint IS NOT NULL AND is_deleted = false"),
+        ),
+        # Work queue for the embedding worker: only rows that still need a vector
+        Index(
+            "ix_incident_logs_embedding_queue",
+            "id",
+            postgresql_where=text("embedding_status IN ('pending', 'failed') AND is_deleted = false"),
+        ),
+        embedding_ann_index(),
+        Index("ix_incident_logs_search_tsv", "search_tsv", postgresql_using="gin"),
     )
 
     def __repr__(self) -> str:
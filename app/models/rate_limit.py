@@ -0,0 +1,17 @@
+# models/rate_limit.py
+
+from sqlalchemy import Column, DateTime, Float, String
+
+from app.models.incident import Base  # reuse Base from models/incident.py
+
+
+class RateLimitBucket(Base):
+    __tablename__ = "rate_limit_buckets"
+
+    # Token buckets for RATE_LIMIT_BACKEND=postgres, e.g. "search:key:42" or "write:tenant:acme".
+    # UNLOGGED: losing buckets in a crash only refills them, and it skips WAL on every request.
+    bucket = Column(String(200), primary_key=True)
+    tokens = Column(Float, nullable=False)
+    updated_at = Column(DateTime(timezone=True), nullable=False)
+
+    __table_args__ = {"prefixes": ["UNLOGGED"]}
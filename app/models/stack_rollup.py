@@ -0,0 +1,20 @@
+# models/stack_rollup.py
+
+from sqlalchemy import Column, Integer, String, DateTime
+
+from app.models.incident import Base  # reuse Base from models/incident.py
+
+
+class StackFingerprintRollup(Base):
+    __tablename__ = "stack_fingerprint_rollups"
+
+    # One row per tenant, hour and stack fingerprint, upserted at ingest.
+    # "Top fingerprints over a window" is a primary-key range read plus a small GROUP BY.
+    tenant_id = Column(String(100), primary_key=True)
+    bucket_start = Column(DateTime(timezone=True), primary_key=True)
+    stack_fingerprint = Column(String(64), primary_key=True)
+
+    # Incidents created in the bucket plus repeats coalesced into them
+    incident_count = Column(Integer, nullable=False)
+    # First incident recorded in the bucket; not a foreign key so purges don't cascade here
+    sample_incident_id = Column(Integer, nullable=False)
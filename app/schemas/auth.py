@@ -2,8 +2,8 @@
 
 from pydantic import BaseModel, Field
 from typing import Optional, List, Any
-from datetime import datetime
-from pydantic import BaseModel, ConfigDict
+from datetime import datetime, timezone
+from pydantic import BaseModel, ConfigDict, model_validator
 
 class ApiKeyCreate(BaseModel):
     tenant_id: str = Field(..., min_length=1)
@@ -19,6 +19,30 @@ class ApiKeyCreated(BaseModel):
     name: Optional[str] = None
     api_key: str  # shown once
 
+class ApiKeyRead(BaseModel):
+    id: int
+    tenant_id: str
+    actor_id: str
+    role: str
+    name: Optional[str] = None
+    is_active: bool
+    created_at: datetime
+    revoked_at: Optional[datetime] = None
+    expires_at: Optional[datetime] = None
+    last_used_at: Optional[datetime] = None
+
+    model_config = ConfigDict(from_attributes=True)
+
+    @model_validator(mode="after")
+    def _expired_is_inactive(self):
+        # A rotated key stays is_active in the table after its grace period; it no longer authenticates
+        if self.expires_at is not None and self.expires_at <= datetime.now(timezone.utc):
+            self.is_active = False
+        return self
+
+class ApiKeyRotated(ApiKeyCreated):
+    previous: ApiKeyRead  # the rotated key, with expires_at set when a grace period applies
+
 class AuditLogRead(BaseModel):
     id: int
     tenant_id: str
@@ -19,6 +19,9 @@ class IncidentLogCreate(BaseModel):
     message: str = Field(..., min_length=1)
     stack_trace: Optional[str] = None
 
+    # Sender's own id for the alert; with source it forms the idempotency key
+    external_id: Optional[str] = Field(default=None, min_length=1, max_length=255)
+
 
 class UpdateIncident(BaseModel):
     service: Optional[str] = None
@@ -51,6 +54,11 @@ class IncidentLogRead(BaseModel):
 
     message_redacted: str
     stack_trace: Optional[str] = None
+    stack_fingerprint: Optional[str] = None
+
+    # Repeats of this alert folded in at ingest; last_seen_at is null for rows older than coalescing
+    occurrence_count: int = 1
+    last_seen_at: Optional[datetime] = None
 
     is_deleted: bool
     deleted_at: Optional[datetime] = None
@@ -66,6 +74,46 @@ class IncidentLogRead(BaseModel):
     model_config = ConfigDict(from_attributes=True)
 
 
+class BulkItemResult(BaseModel):
+    index: int  # position in the request array
+    status: str  # created | coalesced | replayed | invalid
+    incident: Optional[IncidentLogRead] = None
+    error: Optional[str] = None
+
+
+class BulkCreateResult(BaseModel):
+    created: int
+    coalesced: int
+    replayed: int
+    failed: int
+    results: List[BulkItemResult]
+
+
+
+class SearchFilters(BaseModel):
+    service: Optional[str] = None
+    severity: Optional[List[str]] = None  # any of
+    source: Optional[str] = None
+    tags: Optional[List[str]] = None  # all of (JSONB containment)
+    stack_fingerprint: Optional[str] = None
+    created_after: Optional[datetime] = None
+    created_before: Optional[datetime] = None
+
+
+# Ordered lowest to highest; used to expand min_severity into an index-friendly IN list
+SEVERITY_LEVELS = ["low", "medium", "high", "critical"]
+
+
+def severities_at_least(min_severity: str) -> List[str]:
+    return SEVERITY_LEVELS[SEVERITY_LEVELS.index(min_severity):]
+
+
+class StackFingerprintCount(BaseModel):
+    stack_fingerprint: str
+    count: int  # incidents plus repeats coalesced into them
+    sample_incident_id: int
+    last_bucket: datetime  # start of the latest hour it was seen in
+
 
 class IncidentRawRead(BaseModel):
     id: int
@@ -0,0 +1,246 @@
+# app/scripts/backfill_embeddings.py
+#
+# Re-embeds incidents stuck in failed/pending, or embedded with a model other
+# than the current one. Streams candidates with keyset pagination on id so
+# memory stays bounded, embeds each page in one batch call and writes it back
+# with a single executemany UPDATE.
+#
+# A page the provider rejects is bisected; rows rejected on their own are left as
+# they were and listed in failed_ids (and the checkpoint) so they can be retried.
+# A transient error retries the same page with backoff and never moves past it;
+# after max_retries the run stops, and re-running with the checkpoint resumes there.
+#
+#   python -m app.scripts.backfill_embeddings --checkpoint /tmp/backfill.json
+#   python -m app.scripts.backfill_embeddings --shard 0 --shards 4 --max-rows-per-sec 200
+
+import argparse
+import json
+import os
+import time
+from dataclasses import dataclass, asdict, field
+from datetime import datetime, timezone
+from typing import Any, Callable, List, Optional, Tuple
+
+from sqlalchemy import and_, bindparam, func, or_, select, update
+from sqlalchemy.orm import Session
+
+from app.crud import crud
+from app.llm.breaker import CircuitOpenError
+from app.llm.embeddings import EmbeddingError, resolve_embedding_model
+from app.models.incident import IncidentLog
+
+
+@dataclass
+class BackfillStats:
+    last_id: int = 0
+    scanned: int = 0
+    updated: int = 0
+    skipped_changed: int = 0
+    failed: int = 0
+    failed_ids: List[int] = field(default_factory=list)
+
+
+def _load_checkpoint(path: Optional[str]) -> BackfillStats:
+    if not path or not os.path.exists(path):
+        return BackfillStats()
+    with open(path, "r", encoding="utf-8") as f:
+        return BackfillStats(**json.load(f))
+
+
+def _save_checkpoint(path: Optional[str], stats: BackfillStats) -> None:
+    if not path:
+        return
+    tmp = f"{path}.tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(asdict(stats), f)
+    os.replace(tmp, path)  # atomic: a crash leaves the previous checkpoint intact
+
+
+def shard_range(db: Session, shard: int, shards: int) -> Tuple[int, int]:
+    """Splits [min(id), max(id)] into `shards` contiguous ranges; returns (start_exclusive, end_inclusive)."""
+    lo, hi = db.execute(select(func.min(IncidentLog.id), func.max(IncidentLog.id))).one()
+    if lo is None:
+        return 0, 0
+    span = hi - lo + 1
+    size = -(-span // shards)
+    start = lo - 1 + shard * size
+    return start, min(start + size, hi)
+
+
+def _candidate_filter(model: str, include_stale: bool):
+    needs_work = IncidentLog.embedding_status.in_(("pending", "failed"))
+    if include_stale:
+        needs_work = or_(
+            needs_work,
+            and_(IncidentLog.embedding_status == "ready", IncidentLog.embedding_model.is_distinct_from(model)),
+        )
+    return and_(IncidentLog.is_deleted == False, needs_work)  # noqa: E712
+
+
+_t = IncidentLog.__table__
+
+# Core (not ORM) UPDATE so a list of params runs as one executemany; the
+# updated_at guard skips rows edited since the page was read.
+_WRITE_BACK = (
+    update(_t)
+    .where(_t.c.id == bindparam("b_id"), _t.c.updated_at == bindparam("b_seen"))
+    .values(
+        embedding=bindparam("b_embedding"),
+        embedding_model=bindparam("b_model"),
+        embedding_dim=bindparam("b_dim"),
+        embedding_content_hash=bindparam("b_hash"),
+        embedding_version=func.coalesce(_t.c.embedding_version, 0) + 1,
+        embedding_status="ready",
+        embedding_error=None,
+        embedding_attempts=0,
+        embedding_next_attempt_at=None,
+        embedding_updated_at=bindparam("b_now"),
+    )
+)
+
+
+def _embed_page(db: Session, rows: List[Any]) -> Tuple[List[Tuple[Any, List[float], str, str]], List[Tuple[Any, str]]]:
+    """
+    Returns ([(row, vector, content_hash, model)], [(row, error)]). A batch the provider
+    rejects is split in half until the rejected rows are alone. Transient errors
+    (including an open circuit) are raised.
+    """
+    try:
+        vecs, model_name, hashes = crud._embed_redacted_batch(db, [r.message_redacted for r in rows])
+    except EmbeddingError as e:
+        if e.transient:
+            raise
+        if len(rows) == 1:
+            return [], [(rows[0], str(e))]
+        mid = len(rows) // 2
+        done_a, failed_a = _embed_page(db, rows[:mid])
+        done_b, failed_b = _embed_page(db, rows[mid:])
+        return done_a + done_b, failed_a + failed_b
+    return [(r, vec, h, model_name) for r, vec, h in zip(rows, vecs, hashes)], []
+
+
+def backfill(
+    session_factory: Callable[[], Session],
+    batch_size: int = 256,
+    id_start: int = 0,
+    id_end: Optional[int] = None,
+    max_rows_per_sec: float = 0.0,
+    checkpoint_path: Optional[str] = None,
+    include_stale: bool = True,
+    log: Callable[[str], None] = print,
+    max_retries: int = 5,
+    retry_base_seconds: float = 1.0,
+) -> BackfillStats:
+    stats = _load_checkpoint(checkpoint_path)
+    stats.last_id = max(stats.last_id, id_start)
+    model = resolve_embedding_model(crud.EMBED_MODEL)
+    where = _candidate_filter(model, include_stale)
+    started = time.monotonic()
+    retries = 0
+
+    while True:
+        with session_factory() as db:
+            q = (
+                select(IncidentLog.id, IncidentLog.message_redacted, IncidentLog.updated_at)
+                .where(where, IncidentLog.id > stats.last_id)
+                .order_by(IncidentLog.id)
+                .limit(batch_size)
+            )
+            if id_end is not None:
+                q = q.where(IncidentLog.id <= id_end)
+            page = db.execute(q).all()
+            if not page:
+                break
+
+            todo = [r for r in page if r.message_redacted and r.message_redacted.strip()]
+            try:
+                done, rejected = _embed_page(db, todo) if todo else ([], [])
+            except CircuitOpenError as e:
+                log(f"circuit open, sleeping {e.retry_after:.1f}s before retrying id>{stats.last_id}")
+                db.rollback()
+                time.sleep(max(e.retry_after, 1.0))
+                continue
+            except EmbeddingError as e:
+                db.rollback()
+                retries += 1
+                if retries > max_retries:
+                    log(f"page after id {stats.last_id} still failing after {max_retries} retries, stopping: {e}")
+                    break
+                delay = min(retry_base_seconds * 2 ** (retries - 1), 60.0)
+                log(f"page after id {stats.last_id} failed ({e}), retrying in {delay:.1f}s")
+                time.sleep(delay)
+                continue
+            retries = 0
+
+            for r, error in rejected:
+                log(f"incident {r.id} rejected by the provider: {error}")
+            stats.failed += len(rejected)
+            stats.failed_ids.extend(r.id for r, _ in rejected)
+
+            now = datetime.now(timezone.utc)
+            params = [
+                {
+                    "b_id": r.id,
+                    "b_seen": r.updated_at,
+                    "b_embedding": vec,
+                    "b_model": model_name,
+                    "b_dim": len(vec),
+                    "b_hash": h,
+                    "b_now": now,
+                }
+                for r, vec, h, model_name in done
+            ]
+            written = db.execute(_WRITE_BACK, params).rowcount if params else 0
+            db.commit()
+
+        stats.scanned += len(page)
+        stats.updated += max(written, 0)
+        stats.skipped_changed += len(params) - max(written, 0)
+        stats.last_id = page[-1].id
+        _save_checkpoint(checkpoint_path, stats)
+
+        elapsed = time.monotonic() - started
+        log(f"id<={stats.last_id} scanned={stats.scanned} updated={stats.updated} rate={stats.scanned / max(elapsed, 1e-9):.0f}/s")
+
+        if max_rows_per_sec > 0:
+            # Simple pacing: never run ahead of the configured average rate
+            ahead = stats.scanned / max_rows_per_sec - elapsed
+            if ahead > 0:
+                time.sleep(ahead)
+
+    return stats
+
+
+def main() -> None:
+    from app.core.database import SessionLocal
+
+    parser = argparse.ArgumentParser(description="Re-embed failed, pending and stale-model incidents.")
+    parser.add_argument("--batch-size", type=int, default=256)
+    parser.add_argument("--id-start", type=int, default=0, help="Exclusive lower id bound")
+    parser.add_argument("--id-end", type=int, default=None, help="Inclusive upper id bound")
+    parser.add_argument("--shard", type=int, default=None, help="Shard index (with --shards)")
+    parser.add_argument("--shards", type=int, default=None, help="Split the id space into N ranges")
+    parser.add_argument("--max-rows-per-sec", type=float, default=0.0, help="0 = unlimited")
+    parser.add_argument("--checkpoint", default=None, help="JSON file to resume from / write progress to")
+    parser.add_argument("--no-stale", action="store_true", help="Only failed/pending, skip stale-model rows")
+    args = parser.parse_args()
+
+    id_start, id_end = args.id_start, args.id_end
+    if args.shards:
+        with SessionLocal() as db:
+            id_start, id_end = shard_range(db, args.shard or 0, args.shards)
+
+    stats = backfill(
+        SessionLocal,
+        batch_size=args.batch_size,
+        id_start=id_start,
+        id_end=id_end,
+        max_rows_per_sec=args.max_rows_per_sec,
+        checkpoint_path=args.checkpoint,
+        include_stale=not args.no_stale,
+    )
+    print(f"Done: {asdict(stats)}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,471 @@
+# app/scripts/generate_dataset.py
+#
+# Synthetic incident dataset for load testing search and indexes. Rows are drawn
+# from skewed distributions (Zipf tenant sizes and services, weighted severities and
+# sources, recency-biased timestamps, PII-bearing message templates, clustered stack
+# traces), redacted and embedded like real ingest, and loaded with binary COPY from
+# parallel worker processes.
+#
+# Every chunk of rows is generated from its own RNG seeded with (seed, chunk), so the
+# same --seed and --end give the same rows whatever --workers is.
+#
+#   python -m app.scripts.generate_dataset --rows 10000000 --tenants 1000 --workers 8
+#   python -m app.scripts.generate_dataset --rows 200000 --embeddings none --dry-run
+
+import argparse
+import json
+import multiprocessing as mp
+import struct
+import time
+from dataclasses import dataclass
+from datetime import datetime, timedelta, timezone
+from typing import List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from app.core.fingerprint import message_fingerprint, stack_fingerprint
+from app.llm.cache import content_hash
+from app.llm.embeddings import LOCAL_MODEL_NAME, _local_deterministic_matrix
+from app.security.redaction import redact_text
+
+VECTOR_DIM = 1536
+
+SERVICES = [
+    "payments", "auth", "search", "api-gateway", "orders", "notifications", "billing", "inventory",
+    "shipping", "web", "ml-inference", "checkout", "ledger", "identity", "reporting", "etl",
+    "kafka-connect", "cdn-edge", "scheduler", "email",
+]
+SEVERITIES = ["low", "medium", "high", "critical"]
+SEVERITY_P = [0.55, 0.28, 0.13, 0.04]
+SOURCES = ["alertmanager", "datadog", "pagerduty", "sentry", "cloudwatch", "manual"]
+SOURCE_P = [0.34, 0.24, 0.16, 0.14, 0.08, 0.04]
+REPORTERS = ["oncall-bot", "sre-primary", "sre-secondary", "support", "customer-success", None]
+AFFECTED = [None, "postgres", "redis", "kafka", "nginx", "k8s-node", "s3", "elasticsearch"]
+
+# (title, message template, tags). Fields: {email} {phone} {ip} {card} {jwt} {aws} {token}
+# {trace} {pod} {ms} {pct} {n} {ver}
+TEMPLATES = [
+    ("DB timeout spike", "Timeout to postgres at {ip}:5432 after {ms}ms. Trace id: {trace}. Reported by {email}.", ["db", "timeout"]),
+    ("Elevated 5xx", "Spike in 500 responses on {pod}. Trace id: {trace}. Contact: {phone}", ["5xx", "latency"]),
+    ("Queue lag", "Kafka consumer lag at {n} messages on payments.events. AWS key in env: {aws}", ["kafka"]),
+    ("Cache miss storm", "Redis hit rate dropped to {pct}%. Session token: {jwt}", ["redis", "capacity"]),
+    ("CPU saturation", "Node CPU > {pct}% on {pod}. Card on failing request: {card}", ["capacity"]),
+    ("OOM killed", "Container OOMKilled. Pod={pod}. Heap {n}MB at kill. Possible leak in serializer.", ["oom"]),
+    ("Auth failures", "401 rate increased to {pct}%. Suspected credential stuffing from {ip}. Sample user {email}", ["auth", "security"]),
+    ("Latency regression", "p95 latency up {ms}ms after deploy v{ver}. Rollback initiated by {email}.", ["latency", "deploy"]),
+    ("Webhook retries", "Webhook delivery failing, {n} retries queued. Authorization: Bearer {token}", ["5xx"]),
+    ("Disk pressure", "Disk usage {pct}% on {pod}, WAL growing {n}MB/min.", ["db", "capacity"]),
+    ("Payment declined burst", "Declines up {pct}% for card {card} and others. Customer {email}, phone {phone}", ["security"]),
+    ("TLS handshake errors", "Handshake failures from {ip} to edge; cert serial {trace}. api_key={token}", ["security", "5xx"]),
+]
+TEMPLATE_P = np.array([14, 13, 9, 8, 7, 7, 6, 9, 6, 8, 6, 7], dtype=np.float64)
+TEMPLATE_P /= TEMPLATE_P.sum()
+
+TAG_POOL = ["db", "timeout", "latency", "deploy", "kafka", "redis", "auth", "5xx", "capacity", "oom", "security"]
+
+STACK_TRACES = [
+    'Traceback (most recent call last):\n  File "/srv/app-{ver}/app/api/routes.py", line {a}, in create_incident_route\n'
+    '    row = create_incident(db, ...)\n  File "/srv/app-{ver}/app/crud/crud.py", line {b}, in insert_incidents\n'
+    '    return db.execute(stmt, rows).all()\nsqlalchemy.exc.OperationalError: server closed the connection unexpectedly',
+    'Traceback (most recent call last):\n  File "/srv/app-{ver}/app/workers/embedding_worker.py", line {a}, in run_once\n'
+    '    vecs = embed(batch)\nTimeoutError: provider call exceeded {ms}ms',
+    'java.lang.NullPointerException: Cannot invoke "String.length()" because "s" is null\n'
+    '\tat com.acme.pay.Charge.apply(Charge.java:{a})\n\tat com.acme.pay.Service.run(Service.java:{b})',
+    'java.util.concurrent.TimeoutException: Waited {ms} milliseconds\n'
+    '\tat com.acme.ledger.Client.post(Client.java:{a})\n\tat com.acme.ledger.Batch.flush(Batch.java:{b})',
+    'panic: runtime error: index out of range [{a}] with length {b}\n\ngoroutine {n} [running]:\n'
+    'main.(*Router).dispatch(0xc0000{n}, 0x1)\n\t/build/{ver}/router.go:{a} +0x1d',
+]
+STACK_P = [0.3, 0.25, 0.2, 0.15, 0.1]
+STACK_RATE = 0.25
+
+# Insertion order of the COPY columns; id, search_tsv and the remaining defaults are left to Postgres
+COLUMNS = [
+    "tenant_id", "created_at", "updated_at", "last_seen_at", "service", "severity", "title", "affected_sys",
+    "reporter", "source", "tags", "message_raw", "message_redacted", "stack_trace", "stack_fingerprint",
+    "fingerprint", "occurrence_count", "is_deleted", "embedding", "embedding_model", "embedding_dim",
+    "embedding_version", "embedding_content_hash", "embedding_status", "embedding_updated_at",
+]
+
+_PG_EPOCH = datetime(2000, 1, 1, tzinfo=timezone.utc)
+_COPY_HEADER = b"PGCOPY\n\xff\r\n\x00" + struct.pack(">ii", 0, 0)
+_COPY_TRAILER = struct.pack(">h", -1)
+_NULL = struct.pack(">i", -1)
+_HEX = "0123456789abcdef"
+
+
+@dataclass(frozen=True)
+class Spec:
+    rows: int
+    tenants: int
+    seed: int
+    end: datetime
+    days_back: float
+    chunk_rows: int
+    embeddings: str  # local | none
+    zipf_s: float = 1.1
+
+
+def tenant_weights(tenants: int, s: float) -> np.ndarray:
+    """Zipf weights: tenant k gets a share proportional to 1 / (k + 1) ** s."""
+    w = 1.0 / np.arange(1, tenants + 1, dtype=np.float64) ** s
+    return w / w.sum()
+
+
+def _luhn_cards(rng: np.random.Generator, n: int) -> List[str]:
+    """n Luhn-valid 16-digit Visa-style numbers, grouped in fours."""
+    digits = np.concatenate([np.full((n, 1), 4), rng.integers(0, 10, size=(n, 14))], axis=1)
+    doubled = digits[:, ::-1].copy()  # rightmost payload digit is doubled once the check digit is appended
+    doubled[:, ::2] *= 2
+    doubled[doubled > 9] -= 9
+    check = (10 - doubled.sum(axis=1) % 10) % 10
+    digits = np.concatenate([digits, check[:, None]], axis=1).astype("U1")
+    return [" ".join(s[i:i + 4] for i in range(0, 16, 4)) for s in digits.view("U16").ravel()]
+
+
+def _strings(alphabet: str, idx: np.ndarray) -> List[str]:
+    """Rows of alphabet indices as strings, without a per-character Python loop."""
+    return np.array(list(alphabet))[idx].view(f"U{idx.shape[1]}").ravel().tolist()
+
+
+def _fields(rng: np.random.Generator, n: int) -> List[dict]:
+    """Template values for n rows, drawn as whole arrays. Every row gets every field."""
+    r = rng.integers(0, 1 << 30, size=(n, 8)).tolist()
+    hexes = _strings(_HEX, rng.integers(0, 16, size=(n, 89)))
+    aws = _strings("ABCDEFGHIJKLMNOPQRSTUVWXYZ234567", rng.integers(0, 32, size=(n, 16)))
+    cards = _luhn_cards(rng, n)
+    out = []
+    for i in range(n):
+        ri, h = r[i], hexes[i]
+        out.append({
+            "email": f"user{ri[0] % 50000}@example.com",
+            "phone": f"+1 (555) {ri[1] % 900 + 100}-{ri[2] % 9000 + 1000}",
+            "ip": f"10.{ri[3] % 256}.{ri[4] % 256}.{ri[5] % 254 + 1}",
+            "card": cards[i],
+            "jwt": f"eyJhbGciOiJIUzI1NiJ9.eyJzdWIiOiJ{h[57:69]}.{h[69:89]}",
+            "aws": "AKIA" + aws[i],
+            "token": h[25:57],
+            "trace": h[:16],
+            "pod": f"api-{h[16:21]}-{h[21:25]}",
+            "ms": ri[6] % 5000 + 50,
+            "pct": ri[7] % 60 + 40,
+            "n": ri[0] % 100000,
+            "ver": f"2026.{ri[1] % 12 + 1:02d}.{ri[2] % 28 + 1:02d}",
+        })
+    return out
+
+
+def _stacks(rng: np.random.Generator, n: int) -> List[Optional[str]]:
+    has = (rng.random(n) < STACK_RATE).tolist()
+    which = rng.choice(len(STACK_TRACES), size=n, p=STACK_P).tolist()
+    r = rng.integers(1, 400, size=(n, 4)).tolist()
+    return [
+        STACK_TRACES[w].format(a=a, b=b, n=k, ms=ms * 10, ver=f"1.{a % 9}.{b % 20}") if h else None
+        for h, w, (a, b, k, ms) in zip(has, which, r)
+    ]
+
+
+def generate_chunk(spec: Spec, chunk: int) -> List[dict]:
+    """Rows [chunk * chunk_rows, ...) as dicts keyed by COLUMNS, depending only on (seed, chunk)."""
+    start = chunk * spec.chunk_rows
+    n = min(spec.chunk_rows, spec.rows - start)
+    if n <= 0:
+        return []
+    rng = np.random.default_rng([spec.seed, chunk])
+
+    tenant_idx = rng.choice(spec.tenants, size=n, p=tenant_weights(spec.tenants, spec.zipf_s)).tolist()
+    # Each tenant's service popularity is the global Zipf order rotated by its index
+    service_rank = rng.choice(len(SERVICES), size=n, p=tenant_weights(len(SERVICES), 1.2)).tolist()
+    severity_idx = rng.choice(len(SEVERITIES), size=n, p=SEVERITY_P).tolist()
+    source_idx = rng.choice(len(SOURCES), size=n, p=SOURCE_P).tolist()
+    template_idx = rng.choice(len(TEMPLATES), size=n, p=TEMPLATE_P).tolist()
+    affected_idx = rng.integers(0, len(AFFECTED), size=n).tolist()
+    reporter_idx = rng.integers(0, len(REPORTERS), size=n).tolist()
+    # Up to two extra tags per row: the first k of a random ordering of the pool
+    extra_count = rng.integers(0, 3, size=n).tolist()
+    extra_order = rng.random((n, len(TAG_POOL))).argsort(axis=1)[:, :2].tolist()
+    # Recency bias: age = days_back * u^2, so half the rows land in the last quarter of the window
+    age_us = (rng.random(n) ** 2 * spec.days_back * 86_400e6).astype(np.int64)
+    created_us = (int((spec.end - _PG_EPOCH) / timedelta(microseconds=1)) - age_us).tolist()
+    fields = _fields(rng, n)
+    stacks = _stacks(rng, n)
+
+    rows = []
+    for i in range(n):
+        t = tenant_idx[i]
+        title, template, base_tags = TEMPLATES[template_idx[i]]
+        raw = template.format(**fields[i])
+        redacted = redact_text(raw)
+        stack = stacks[i]
+        created = _PG_EPOCH + timedelta(microseconds=created_us[i])
+        rows.append({
+            "tenant_id": f"tenant_{t:04d}",
+            "created_at": created,
+            "updated_at": created,
+            "last_seen_at": created,
+            "service": SERVICES[(service_rank[i] + t) % len(SERVICES)],
+            "severity": SEVERITIES[severity_idx[i]],
+            "title": title,
+            "affected_sys": AFFECTED[affected_idx[i]],
+            "reporter": REPORTERS[reporter_idx[i]],
+            "source": SOURCES[source_idx[i]],
+            "tags": sorted(set(base_tags).union(TAG_POOL[j] for j in extra_order[i][: extra_count[i]])),
+            "message_raw": raw,
+            "message_redacted": redacted,
+            "stack_trace": stack,
+            "stack_fingerprint": stack_fingerprint(stack),
+            "fingerprint": message_fingerprint(title, redacted),
+            "occurrence_count": 1,
+            "is_deleted": False,
+        })
+
+    if spec.embeddings == "local":
+        # One float4 conversion for the whole chunk; COPY sends float4 either way
+        vecs = _local_deterministic_matrix([r["message_redacted"] for r in rows], VECTOR_DIM).astype(">f4")
+        for row, vec in zip(rows, vecs):
+            row.update(
+                embedding=vec,
+                embedding_model=LOCAL_MODEL_NAME,
+                embedding_dim=VECTOR_DIM,
+                embedding_version=1,
+                embedding_content_hash=content_hash(row["message_redacted"]),
+                embedding_status="ready",
+                embedding_updated_at=row["created_at"],
+            )
+    else:
+        for row in rows:
+            row.update(
+                embedding=None,
+                embedding_model=None,
+                embedding_dim=None,
+                embedding_version=None,
+                embedding_content_hash=None,
+                embedding_status="pending",
+                embedding_updated_at=None,
+            )
+    return rows
+
+
+def _text(value: str) -> bytes:
+    data = value.encode()
+    return struct.pack(">i", len(data)) + data
+
+
+def _int4(value: int) -> bytes:
+    return struct.pack(">ii", 4, value)
+
+
+def _bool(value: bool) -> bytes:
+    return b"\x00\x00\x00\x01\x01" if value else b"\x00\x00\x00\x01\x00"
+
+
+def _timestamptz(value: datetime) -> bytes:
+    return struct.pack(">iq", 8, (value - _PG_EPOCH) // timedelta(microseconds=1))
+
+
+def _jsonb(value) -> bytes:
+    data = b"\x01" + json.dumps(value).encode()  # jsonb binary format version 1
+    return struct.pack(">i", len(data)) + data
+
+
+def _vector(value: np.ndarray) -> bytes:
+    # pgvector binary format: int16 dim, int16 unused, float4 big-endian values
+    return struct.pack(">ihh", 4 + 4 * value.shape[0], value.shape[0], 0) + value.astype(">f4", copy=False).tobytes()
+
+
+_ENCODERS = {
+    "tags": _jsonb,
+    "occurrence_count": _int4,
+    "embedding_dim": _int4,
+    "embedding_version": _int4,
+    "is_deleted": _bool,
+    "embedding": _vector,
+    "created_at": _timestamptz,
+    "updated_at": _timestamptz,
+    "last_seen_at": _timestamptz,
+    "embedding_updated_at": _timestamptz,
+}
+_COLUMN_ENCODERS = [(c, _ENCODERS.get(c, _text)) for c in COLUMNS]
+
+
+def copy_payload(rows: Sequence[dict]) -> bytes:
+    """The rows as a COPY ... (FORMAT binary) stream."""
+    field_count = struct.pack(">h", len(COLUMNS))
+    parts = [_COPY_HEADER]
+    for row in rows:
+        parts.append(field_count)
+        for column, encode in _COLUMN_ENCODERS:
+            value = row[column]
+            parts.append(_NULL if value is None else encode(value))
+    parts.append(_COPY_TRAILER)
+    return b"".join(parts)
+
+
+def _dsn(database_url: str) -> str:
+    from sqlalchemy.engine import make_url
+
+    return make_url(database_url).set(drivername="postgresql").render_as_string(hide_password=False)
+
+
+_conn = None
+
+
+def _worker_init(database_url: Optional[str]) -> None:
+    global _conn
+    if database_url:
+        import psycopg2
+
+        _conn = psycopg2.connect(_dsn(database_url))
+
+
+def _load_chunk(args: Tuple[Spec, int]) -> Tuple[int, int, float, float]:
+    """Generates one chunk and COPYs it in its own transaction. Returns (rows, bytes, gen_s, copy_s)."""
+    import io
+
+    spec, chunk = args
+    t0 = time.perf_counter()
+    payload = copy_payload(generate_chunk(spec, chunk))
+    rows = min(spec.chunk_rows, spec.rows - chunk * spec.chunk_rows)
+    t1 = time.perf_counter()
+    if _conn is not None:
+        with _conn.cursor() as cur:
+            cur.copy_expert(f"COPY incident_logs ({', '.join(COLUMNS)}) FROM STDIN WITH (FORMAT binary)", io.BytesIO(payload))
+        _conn.commit()
+    return rows, len(payload), t1 - t0, time.perf_counter() - t1
+
+
+def load(spec: Spec, workers: int, database_url: Optional[str], progress=None) -> dict:
+    """Generates and loads every chunk across `workers` processes. database_url=None only generates."""
+    chunks = -(-spec.rows // spec.chunk_rows)
+    totals = {"rows": 0, "bytes": 0, "generate_s": 0.0, "copy_s": 0.0}
+    t0 = time.perf_counter()
+    ctx = mp.get_context("spawn")
+    with ctx.Pool(workers, initializer=_worker_init, initargs=(database_url,)) as pool:
+        for rows, size, gen_s, copy_s in pool.imap_unordered(_load_chunk, ((spec, c) for c in range(chunks))):
+            totals["rows"] += rows
+            totals["bytes"] += size
+            totals["generate_s"] += gen_s
+            totals["copy_s"] += copy_s
+            if progress:
+                progress(totals, time.perf_counter() - t0)
+    totals["elapsed_s"] = time.perf_counter() - t0
+    totals["rows_per_s"] = totals["rows"] / totals["elapsed_s"]
+    totals["mb_per_s"] = totals["bytes"] / totals["elapsed_s"] / 1e6
+    return totals
+
+
+def drop_ann_index(db) -> None:
+    """Drops the embedding ANN index so COPY does not pay a graph insert per row."""
+    from sqlalchemy import text
+
+    for name in ("ix_incident_logs_embedding_hnsw", "ix_incident_logs_embedding_ivfflat"):
+        db.execute(text(f"DROP INDEX IF EXISTS {name}"))
+
+
+def build_ann_index(db, maintenance_work_mem: str = "1GB") -> None:
+    """Recreates the configured ANN index in one pass over the loaded table."""
+    from sqlalchemy import text
+
+    from app.core.config import ANN_INDEX_TYPE
+    from app.models.incident import IncidentLog
+
+    db.execute(text("SELECT set_config('maintenance_work_mem', :v, true)"), {"v": maintenance_work_mem})
+    name = f"ix_incident_logs_embedding_{ANN_INDEX_TYPE}"
+    idx = next(i for i in IncidentLog.__table__.indexes if i.name == name)
+    idx.create(bind=db.connection(), checkfirst=True)
+
+
+def _report_tenants(spec: Spec) -> str:
+    w = tenant_weights(spec.tenants, spec.zipf_s)
+    sizes = np.sort(w * spec.rows)[::-1]
+    return (
+        f"tenant sizes (expected): largest {sizes[0]:,.0f}, median {np.median(sizes):,.0f}, "
+        f"smallest {sizes[-1]:,.0f}; top 1% of tenants hold {sizes[: max(1, spec.tenants // 100)].sum() / spec.rows:.0%}"
+    )
+
+
+def _chunks_progress(totals: dict, elapsed: float) -> None:
+    print(f"  {totals['rows']:>12,} rows  {totals['rows'] / elapsed:>10,.0f} rows/s", flush=True)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Generate and COPY a synthetic incident dataset.")
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    parser.add_argument("--tenants", type=int, default=1000)
+    parser.add_argument("--workers", type=int, default=max(1, mp.cpu_count() - 1))
+    parser.add_argument("--seed", type=int, default=7)
+    parser.add_argument("--end", default=None, help="ISO timestamp the data ends at (default: today 00:00 UTC)")
+    parser.add_argument("--days-back", type=float, default=90)
+    parser.add_argument("--chunk-rows", type=int, default=20_000, help="Rows per COPY transaction")
+    parser.add_argument("--embeddings", choices=["local", "none"], default="local", help="none leaves rows pending")
+    parser.add_argument("--dry-run", action="store_true", help="Generate and encode without loading")
+    parser.add_argument(
+        "--keep-ann-index",
+        action="store_true",
+        help="Load with the ANN index in place instead of dropping it and rebuilding after the load",
+    )
+    args = parser.parse_args()
+
+    if args.end:
+        end = datetime.fromisoformat(args.end.replace("Z", "+00:00"))
+    else:
+        end = datetime.now(timezone.utc).replace(hour=0, minute=0, second=0, microsecond=0)
+    spec = Spec(
+        rows=args.rows,
+        tenants=args.tenants,
+        seed=args.seed,
+        end=end,
+        days_back=args.days_back,
+        chunk_rows=args.chunk_rows,
+        embeddings=args.embeddings,
+    )
+
+    database_url = None
+    if not args.dry_run:
+        from app.core.config import DATABASE_URL
+
+        database_url = DATABASE_URL
+
+    print(f"generating {spec.rows:,} rows for {spec.tenants:,} tenants, seed={spec.seed}, end={end.isoformat()}")
+    print(_report_tenants(spec))
+    defer_index = database_url is not None and not args.keep_ann_index
+    if defer_index:
+        from app.core.database import SessionLocal
+
+        with SessionLocal() as db:
+            drop_ann_index(db)
+            db.commit()
+
+    try:
+        totals = load(spec, args.workers, database_url, progress=_chunks_progress)
+    finally:
+        # Rebuilt even if the load fails, so the table is never left without its index
+        if defer_index:
+            with SessionLocal() as db:
+                t0 = time.perf_counter()
+                build_ann_index(db)
+                db.commit()
+                print(f"ANN index rebuilt in {time.perf_counter() - t0:.1f}s")
+
+    if database_url:
+        from sqlalchemy import text
+
+        from app.core.database import SessionLocal
+        from app.crud.crud import rebuild_stack_rollups
+
+        with SessionLocal() as db:
+            # The stack rollup is normally maintained at ingest; rebuild it for the copied rows
+            rebuild_stack_rollups(db)
+            db.commit()
+            db.execute(text("ANALYZE incident_logs"))
+            db.commit()
+
+    print(
+        f"{totals['rows']:,} rows, {totals['bytes'] / 1e6:,.1f} MB in {totals['elapsed_s']:.1f}s "
+        f"({totals['rows_per_s']:,.0f} rows/s, {totals['mb_per_s']:.1f} MB/s) with {args.workers} workers; "
+        f"worker time: generate {totals['generate_s']:.1f}s, copy {totals['copy_s']:.1f}s"
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,74 @@
+# app/scripts/import_incidents.py
+#
+# Streams an NDJSON file of incidents to POST /api/incidents:import. The file is
+# sent in chunks as it is read (never loaded whole). The server answers once it
+# has read the whole file; its per-line results are then written to stdout as
+# they are read, and the summary goes to stderr.
+#
+#   python -m app.scripts.import_incidents incidents.ndjson --api-key "$API_KEY"
+#   zcat history.ndjson.gz | python -m app.scripts.import_incidents - --summary-only
+
+import argparse
+import json
+import os
+import sys
+from typing import BinaryIO, Iterator
+
+import httpx
+
+
+def _chunks(f: BinaryIO, size: int) -> Iterator[bytes]:
+    while True:
+        chunk = f.read(size)
+        if not chunk:
+            return
+        yield chunk
+
+
+def run(client: httpx.Client, f: BinaryIO, api_key: str, chunk_bytes: int, summary_only: bool, out=sys.stdout) -> dict:
+    params = {"results": "summary" if summary_only else "lines"}
+    headers = {"X-API-Key": api_key, "Content-Type": "application/x-ndjson"}
+    summary: dict = {}
+    with client.stream("POST", "/api/incidents:import", params=params, headers=headers, content=_chunks(f, chunk_bytes)) as r:
+        if r.status_code != 200:
+            r.read()
+            raise SystemExit(f"import failed: HTTP {r.status_code} {r.text}")
+        for line in r.iter_lines():
+            if not line:
+                continue
+            row = json.loads(line)
+            if "summary" in row:
+                summary = row["summary"]
+            else:
+                out.write(line + "\n")
+    return summary
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Import incidents from an NDJSON file through the API.")
+    parser.add_argument("path", help="NDJSON file, or - for stdin")
+    parser.add_argument("--url", default=os.getenv("API_URL", "http://localhost:8000"))
+    parser.add_argument("--api-key", default=os.getenv("API_KEY"), help="Defaults to $API_KEY")
+    parser.add_argument("--chunk-bytes", type=int, default=256 * 1024, help="Upload chunk size")
+    parser.add_argument("--summary-only", action="store_true", help="Skip per-line results")
+    parser.add_argument("--timeout", type=float, default=600.0)
+    args = parser.parse_args()
+
+    if not args.api_key:
+        raise SystemExit("--api-key or $API_KEY is required")
+
+    f = sys.stdin.buffer if args.path == "-" else open(args.path, "rb")
+    try:
+        with httpx.Client(base_url=args.url, timeout=args.timeout) as client:
+            summary = run(client, f, args.api_key, args.chunk_bytes, args.summary_only)
+    finally:
+        if f is not sys.stdin.buffer:
+            f.close()
+
+    print(json.dumps(summary), file=sys.stderr)
+    if summary.get("invalid") or summary.get("errors"):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,32 @@
+# app/scripts/purge_embedding_cache.py
+#
+# Deletes embedding_cache rows older than EMBED_CACHE_DB_TTL_DAYS in bounded batches.
+# A purged entry is simply re-embedded (and re-cached) the next time its text is seen.
+#
+#   python -m app.scripts.purge_embedding_cache --batch-size 10000 [--max-age-days 30]
+
+import argparse
+
+from app.core.config import EMBED_CACHE_DB_TTL_DAYS
+from app.core.database import SessionLocal
+from app.llm.cache import purge_expired_entries
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Delete old embedding cache rows.")
+    parser.add_argument("--batch-size", type=int, default=10_000)
+    parser.add_argument("--max-age-days", type=int, default=EMBED_CACHE_DB_TTL_DAYS)
+    args = parser.parse_args()
+
+    total = 0
+    with SessionLocal() as db:
+        while True:
+            n = purge_expired_entries(db, max_age_days=args.max_age_days, batch_size=args.batch_size)
+            total += n
+            if n < args.batch_size:
+                break
+    print(f"Purged {total} embedding cache rows.")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,30 @@
+# app/scripts/purge_idempotency_keys.py
+#
+# Deletes expired idempotency keys in bounded batches. Expired keys are already
+# ignored on lookup and reclaimed on reuse; this only keeps the table small.
+#
+#   python -m app.scripts.purge_idempotency_keys --batch-size 10000
+
+import argparse
+
+from app.core.database import SessionLocal
+from app.crud.crud_idempotency import purge_expired_keys
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Delete expired idempotency keys.")
+    parser.add_argument("--batch-size", type=int, default=10_000)
+    args = parser.parse_args()
+
+    total = 0
+    with SessionLocal() as db:
+        while True:
+            n = purge_expired_keys(db, batch_size=args.batch_size)
+            total += n
+            if n < args.batch_size:
+                break
+    print(f"Purged {total} expired idempotency keys.")
+
+
+if __name__ == "__main__":
+    main()
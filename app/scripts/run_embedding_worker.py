@@ -0,0 +1,50 @@
+# app/scripts/run_embedding_worker.py
+#
+# Standalone embedding worker. Start as many of these as you like; rows are
+# claimed with FOR UPDATE SKIP LOCKED so processes never embed the same row.
+#
+#   python -m app.scripts.run_embedding_worker --concurrency 4 --batch-size 128
+
+import argparse
+import logging
+import signal
+import threading
+
+from app.core.config import EMBED_WORKER_BATCH_SIZE, EMBED_WORKER_CONCURRENCY, EMBED_WORKER_POLL_SECONDS
+from app.core.database import SessionLocal
+from app.workers.embedding_worker import EmbeddingWorker, run_once
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Embed pending/failed incidents in the background.")
+    parser.add_argument("--batch-size", type=int, default=EMBED_WORKER_BATCH_SIZE)
+    parser.add_argument("--concurrency", type=int, default=EMBED_WORKER_CONCURRENCY)
+    parser.add_argument("--poll-seconds", type=float, default=EMBED_WORKER_POLL_SECONDS)
+    parser.add_argument("--once", action="store_true", help="Drain the queue once and exit")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+
+    if args.once:
+        total = 0
+        while True:
+            n = run_once(SessionLocal, args.batch_size)
+            total += n
+            if n == 0:
+                break
+        print(f"Processed {total} incidents.")
+        return
+
+    worker = EmbeddingWorker(SessionLocal, args.batch_size, args.concurrency, args.poll_seconds)
+    done = threading.Event()
+    signal.signal(signal.SIGINT, lambda *_: done.set())
+    signal.signal(signal.SIGTERM, lambda *_: done.set())
+
+    worker.start()
+    print(f"Embedding worker running (concurrency={args.concurrency}, batch_size={args.batch_size}).")
+    done.wait()
+    worker.stop()
+
+
+if __name__ == "__main__":
+    main()
@@ -2,10 +2,11 @@ import os
 import random
 from datetime import datetime, timezone, timedelta
 
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, update
 from sqlalchemy.orm import sessionmaker
 
-from app.crud.crud import create_incident
+from app.crud.crud import create_incident, rebuild_stack_rollups
+from app.models.incident import IncidentLog
 from app.schemas.incident import IncidentLogCreate
 
 DATABASE_URL = os.environ["DATABASE_URL"]
@@ -75,17 +76,24 @@ def main():
                     stack_trace=None if random.random() < 0.75 else "Traceback (most recent call last): ...",
                 )
 
-                obj = create_incident(db, tenant_id=tenant, incident=payload)
-
                 try:
-                    obj.created_at = created_at
-                    obj.updated_at = created_at
+                    row = create_incident(db, tenant_id=tenant, incident=payload)
+                    db.execute(
+                        update(IncidentLog)
+                        .where(IncidentLog.id == row.id)
+                        .values(created_at=created_at, updated_at=created_at, last_seen_at=created_at)
+                    )
                     db.commit()
                 except Exception:
                     db.rollback()
+                    raise
 
                 created += 1
 
+        # Rows were backdated after insert, so the hourly stack rollup is recomputed from them
+        rebuild_stack_rollups(db)
+        db.commit()
+
         print(f"Seeded {created} incidents total ({n_per_tenant} per tenant).")
     finally:
         db.close()
@@ -0,0 +1,192 @@
+# app/workers/embedding_worker.py
+#
+# Background embedding pipeline. Workers claim rows that still need a vector
+# with SELECT ... FOR UPDATE SKIP LOCKED, so any number of threads/processes
+# can drain the queue concurrently without double-embedding a row.
+
+import logging
+import random
+import threading
+from datetime import datetime, timedelta, timezone
+from typing import Callable, List, Optional
+
+from sqlalchemy import func, or_
+from sqlalchemy.orm import Session
+
+from app.core import metrics
+from app.core.config import (
+    EMBED_WORKER_BATCH_SIZE,
+    EMBED_WORKER_CONCURRENCY,
+    EMBED_WORKER_POLL_SECONDS,
+    EMBED_MAX_ATTEMPTS,
+    EMBED_RETRY_BASE_SECONDS,
+    EMBED_RETRY_MAX_SECONDS,
+)
+from app.crud import crud
+from app.llm.breaker import CircuitOpenError
+from app.llm.embeddings import EmbeddingError
+from app.models.incident import IncidentLog
+
+logger = logging.getLogger(__name__)
+
+
+def retry_delay_seconds(attempts: int) -> float:
+    # Exponential backoff with jitter: base * 2^(n-1), capped, scaled by [0.5, 1.0)
+    delay = min(EMBED_RETRY_BASE_SECONDS * (2 ** max(attempts - 1, 0)), EMBED_RETRY_MAX_SECONDS)
+    return delay * (0.5 + random.random() / 2)
+
+
+def claim_batch(db: Session, batch_size: int = EMBED_WORKER_BATCH_SIZE) -> List[IncidentLog]:
+    """
+    Locks up to batch_size rows that need embedding. Rows locked by another
+    worker are skipped, not waited on. Locks are held until db.commit().
+    """
+    return (
+        db.query(IncidentLog)
+        .filter(
+            IncidentLog.embedding_status.in_(("pending", "failed")),
+            IncidentLog.is_deleted == False,  # noqa: E712
+            IncidentLog.embedding_attempts < EMBED_MAX_ATTEMPTS,
+            or_(
+                IncidentLog.embedding_next_attempt_at.is_(None),
+                IncidentLog.embedding_next_attempt_at <= func.now(),
+            ),
+        )
+        .order_by(IncidentLog.id)
+        .limit(batch_size)
+        .with_for_update(skip_locked=True)
+        .all()
+    )
+
+
+def _mark_failed(row: IncidentLog, error: str, now: datetime, permanent: bool = False) -> None:
+    row.embedding = None
+    row.embedding_dim = None
+    row.embedding_content_hash = None
+    row.embedding_status = "failed"
+    row.embedding_error = error
+    row.embedding_updated_at = now
+    row.embedding_attempts = EMBED_MAX_ATTEMPTS if permanent else (row.embedding_attempts or 0) + 1
+    if permanent or row.embedding_attempts >= EMBED_MAX_ATTEMPTS:
+        row.embedding_next_attempt_at = None
+    else:
+        row.embedding_next_attempt_at = now + timedelta(seconds=retry_delay_seconds(row.embedding_attempts))
+
+
+def _embed_rows(db: Session, rows: List[IncidentLog], now: datetime) -> int:
+    """
+    Embeds rows with one batch call. If the provider rejects the input (a non-transient
+    error), the batch is split in half and each half retried, so a poison row fails on
+    its own instead of taking the whole batch with it; it is failed for good, since the
+    same input would be rejected again. A transient error fails the batch and every row
+    backs off. Returns rows made ready.
+    """
+    try:
+        vecs, model_name, hashes = crud._embed_redacted_batch(db, [r.message_redacted for r in rows])
+    except CircuitOpenError as e:
+        # Not the rows' fault: push them past the open window without spending an attempt
+        for row in rows:
+            row.embedding_next_attempt_at = now + timedelta(seconds=max(e.retry_after, 1.0))
+        metrics.inc("embedding_worker_rows_total", len(rows), outcome="deferred")
+        return 0
+    except EmbeddingError as e:
+        if e.transient:
+            for row in rows:
+                _mark_failed(row, str(e), now)
+            metrics.inc("embedding_worker_rows_total", len(rows), outcome="failed")
+            return 0
+        if len(rows) > 1:
+            mid = len(rows) // 2
+            return _embed_rows(db, rows[:mid], now) + _embed_rows(db, rows[mid:], now)
+        _mark_failed(rows[0], str(e), now, permanent=True)
+        metrics.inc("embedding_worker_rows_total", outcome="failed")
+        return 0
+
+    for row, vec, key_hash in zip(rows, vecs, hashes):
+        row.embedding = vec
+        row.embedding_model = model_name
+        row.embedding_dim = len(vec)
+        row.embedding_version = (row.embedding_version or 0) + 1
+        row.embedding_content_hash = key_hash
+        row.embedding_status = "ready"
+        row.embedding_updated_at = now
+        row.embedding_error = None
+        row.embedding_attempts = 0
+        row.embedding_next_attempt_at = None
+    metrics.inc("embedding_worker_rows_total", len(rows), outcome="ready")
+    return len(rows)
+
+
+def process_batch(db: Session, rows: List[IncidentLog]) -> int:
+    """Embeds claimed rows in one batch call and commits. Returns rows made ready."""
+    now = datetime.now(timezone.utc)
+
+    todo = []
+    for row in rows:
+        if not row.message_redacted or not row.message_redacted.strip():
+            _mark_failed(row, "Text is empty or whitespace only.", now, permanent=True)
+        else:
+            todo.append(row)
+
+    ready = _embed_rows(db, todo, now) if todo else 0
+    db.commit()
+    return ready
+
+
+def run_once(session_factory: Callable[[], Session], batch_size: int = EMBED_WORKER_BATCH_SIZE) -> int:
+    """Claims and processes one batch. Returns the number of rows claimed."""
+    with session_factory() as db:
+        try:
+            rows = claim_batch(db, batch_size)
+            if not rows:
+                db.rollback()
+                return 0
+            process_batch(db, rows)
+            return len(rows)
+        except Exception:
+            db.rollback()
+            raise
+
+
+class EmbeddingWorker:
+    """
+    Runs `concurrency` polling threads over run_once. A thread that drains a
+    full batch polls again immediately; otherwise it sleeps poll_seconds.
+    """
+
+    def __init__(
+        self,
+        session_factory: Callable[[], Session],
+        batch_size: int = EMBED_WORKER_BATCH_SIZE,
+        concurrency: int = EMBED_WORKER_CONCURRENCY,
+        poll_seconds: float = EMBED_WORKER_POLL_SECONDS,
+    ):
+        self.session_factory = session_factory
+        self.batch_size = batch_size
+        self.concurrency = max(1, concurrency)
+        self.poll_seconds = poll_seconds
+        self._stop = threading.Event()
+        self._threads: List[threading.Thread] = []
+
+    def start(self) -> None:
+        self._stop.clear()
+        for i in range(self.concurrency):
+            t = threading.Thread(target=self._loop, name=f"embedding-worker-{i}", daemon=True)
+            t.start()
+            self._threads.append(t)
+
+    def stop(self, timeout: Optional[float] = 10.0) -> None:
+        self._stop.set()
+        for t in self._threads:
+            t.join(timeout)
+        self._threads = []
+
+    def _loop(self) -> None:
+        while not self._stop.is_set():
+            try:
+                claimed = run_once(self.session_factory, self.batch_size)
+            except Exception:
+                logger.exception("embedding worker batch failed")
+                claimed = 0
+            if claimed < self.batch_size:
+                self._stop.wait(self.poll_seconds)
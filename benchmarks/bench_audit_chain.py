@@ -0,0 +1,131 @@
+# benchmarks/bench_audit_chain.py
+#
+# Audit chain append cost. Runs committed single-entry appends from 1/4/8 threads
+# into one tenant with the chain-head row lock and with the previous head read
+# (ORDER BY id DESC LIMIT 1, no lock), reporting appends/s and how many entries
+# forked the chain. Then times one append by a tenant with N entries of its own
+# after a neighbour tenant wrote another N, both ways. Needs DATABASE_URL; creates and
+# removes its own two tenants.
+# Run: python -m benchmarks.bench_audit_chain
+
+import statistics
+import threading
+import time
+
+from sqlalchemy import text
+
+import app.crud.crud_auth as crud_auth
+from app.core.database import SessionLocal
+from app.crud.crud_auth import ActorContext, append_audit_log
+from app.models.auth import AuditChainHead, AuditLog
+
+TENANT = "bench_audit_chain"
+NEIGHBOUR = "bench_audit_chain_neighbour"
+APPENDS = 400
+THREAD_COUNTS = (1, 4, 8)
+GAPS = (0, 1_000, 10_000, 100_000)
+GAP_SAMPLES = 5
+
+_locked_head = crud_auth._lock_chain_head
+_advance_head = crud_auth._advance_chain_head
+
+
+def _legacy_head(db, tenant_id):
+    prev = db.query(AuditLog).filter(AuditLog.tenant_id == tenant_id).order_by(AuditLog.id.desc()).first()
+    return prev.hash if prev else None
+
+
+def _use(legacy: bool) -> None:
+    crud_auth._lock_chain_head = _legacy_head if legacy else _locked_head
+    crud_auth._advance_chain_head = (lambda *args: None) if legacy else _advance_head
+
+
+def _cleanup() -> None:
+    with SessionLocal() as db:
+        db.query(AuditLog).filter(AuditLog.tenant_id.in_((TENANT, NEIGHBOUR))).delete()
+        db.query(AuditChainHead).filter(AuditChainHead.tenant_id.in_((TENANT, NEIGHBOUR))).delete()
+        db.commit()
+
+
+def _forks() -> int:
+    with SessionLocal() as db:
+        chain = db.query(AuditLog.prev_hash, AuditLog.hash).filter(AuditLog.tenant_id == TENANT).order_by(AuditLog.id).all()
+    return sum(1 for prev, row in zip(chain, chain[1:]) if row.prev_hash != prev.hash)
+
+
+def _append_rate(threads: int) -> float:
+    per_thread = APPENDS // threads
+    actor = ActorContext(tenant_id=TENANT, actor_id="bench", role="admin", api_key_id=0)
+    start = threading.Barrier(threads + 1)
+
+    def run():
+        start.wait()
+        with SessionLocal() as db:
+            for i in range(per_thread):
+                append_audit_log(db, actor, "INCIDENT_READ", "incident", str(i))
+
+    workers = [threading.Thread(target=run) for _ in range(threads)]
+    for w in workers:
+        w.start()
+    start.wait()
+    t0 = time.perf_counter()
+    for w in workers:
+        w.join()
+    return per_thread * threads / (time.perf_counter() - t0)
+
+
+def _pad(tenant_id: str, n: int) -> None:
+    """Appends n filler entries for tenant_id with INSERT ... SELECT; the hashes are not a chain."""
+    with SessionLocal() as db:
+        db.execute(
+            text(
+                "INSERT INTO audit_logs (tenant_id, actor_id, action, resource_type, created_at, hash) "
+                "SELECT :t, 'bench', 'INCIDENT_READ', 'incident', now(), md5(g::text) || md5(g::text) "
+                "FROM generate_series(1, :n) g"
+            ),
+            {"t": tenant_id, "n": n},
+        )
+        db.commit()
+
+
+def _quiet_append_ms(legacy: bool, gap: int) -> float:
+    """Median milliseconds for one committed append by a tenant with gap entries after the neighbour wrote gap more."""
+    _use(legacy)
+    actor = ActorContext(tenant_id=TENANT, actor_id="bench", role="admin", api_key_id=0)
+    samples = []
+    with SessionLocal() as db:
+        _pad(TENANT, gap)
+        append_audit_log(db, actor, "INCIDENT_READ", "incident", "first")
+        for i in range(GAP_SAMPLES):
+            _pad(NEIGHBOUR, gap)
+            t0 = time.perf_counter()
+            append_audit_log(db, actor, "INCIDENT_READ", "incident", str(i))
+            samples.append((time.perf_counter() - t0) * 1e3)
+    return statistics.median(samples)
+
+
+def main() -> None:
+    print(f"committed appends into one tenant, {APPENDS} per run")
+    for legacy in (True, False):
+        _use(legacy)
+        for threads in THREAD_COUNTS:
+            _cleanup()
+            rate = _append_rate(threads)
+            label = "ORDER BY head" if legacy else "locked head row"
+            print(f"  {label:<16} {threads} threads  {rate:>7,.0f} appends/s  {_forks():>4} forks")
+    _use(False)
+
+    print(f"\nappend by a tenant with N entries after a neighbour wrote N more, median of {GAP_SAMPLES}")
+    for gap in GAPS:
+        row = []
+        for legacy in (True, False):
+            _cleanup()
+            row.append(_quiet_append_ms(legacy, gap))
+        print(f"  N={gap:>7,}  ORDER BY head {row[0]:>7.2f} ms  locked head row {row[1]:>5.2f} ms")
+    _use(False)
+
+    _cleanup()
+
+
+if __name__ == "__main__":
+    main()
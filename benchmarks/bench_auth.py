@@ -0,0 +1,100 @@
+# benchmarks/bench_auth.py
+#
+# Per-request API-key authentication overhead. Times authenticate_api_key directly
+# (twice uncached, as the router and route dependencies used to run it, once uncached,
+# cached hit, cached miss for an unknown key) and GET /api/me end to end with the auth
+# caches on and off. Needs DATABASE_URL; creates and removes its own tenant.
+# Run: python -m benchmarks.bench_auth
+
+import statistics
+import time
+
+from fastapi.testclient import TestClient
+
+import app.crud.crud_auth as crud_auth
+from app.core.database import SessionLocal
+from app.core.ratelimit import limiter
+from app.crud.crud_auth import authenticate_api_key, create_api_key
+from app.main import app
+from app.models.auth import ApiKey
+
+TENANT = "bench_auth"
+CALLS = 2000
+REQUESTS = 1000
+
+
+def _cleanup() -> None:
+    with SessionLocal() as db:
+        db.query(ApiKey).filter(ApiKey.tenant_id == TENANT).delete()
+        db.commit()
+
+
+def _clear() -> None:
+    crud_auth.auth_cache.clear()
+    crud_auth.auth_negative_cache.clear()
+
+
+def _time_calls(fn, n: int) -> float:
+    """Median microseconds per call."""
+    samples = []
+    for _ in range(n):
+        t0 = time.perf_counter()
+        fn()
+        samples.append((time.perf_counter() - t0) * 1e6)
+    return statistics.median(samples)
+
+
+def main() -> None:
+    _cleanup()
+    with SessionLocal() as db:
+        _, key = create_api_key(db, tenant_id=TENANT, actor_id="bench", role="viewer")
+
+    print(f"authenticate_api_key, median of {CALLS} calls")
+    with SessionLocal() as db:
+        def uncached():
+            _clear()
+            authenticate_api_key(db, key)
+
+        def twice_uncached():
+            uncached()
+            uncached()
+
+        def unknown_uncached():
+            _clear()
+            authenticate_api_key(db, "not-a-key")
+
+        authenticate_api_key(db, key)
+        rows = [
+            ("2x uncached (old routes)", _time_calls(twice_uncached, CALLS)),
+            ("1x uncached", _time_calls(uncached, CALLS)),
+            ("unknown key, uncached", _time_calls(unknown_uncached, CALLS)),
+        ]
+        authenticate_api_key(db, key)
+        rows.append(("cached hit", _time_calls(lambda: authenticate_api_key(db, key), CALLS)))
+        authenticate_api_key(db, "not-a-key")
+        rows.append(("unknown key, cached", _time_calls(lambda: authenticate_api_key(db, "not-a-key"), CALLS)))
+        db.rollback()
+    for label, us in rows:
+        print(f"  {label:<26} {us:>8.1f} us")
+
+    # 1000 requests would exhaust the read budget; this measures auth alone
+    limiter.backend = None
+    client = TestClient(app)
+    headers = {"X-API-Key": key}
+    print(f"\nGET /api/me, {REQUESTS} requests")
+    for label, size in (("cache off", 0), ("cache on", crud_auth.auth_cache.maxsize)):
+        crud_auth.auth_cache.maxsize = size
+        _clear()
+        samples = []
+        for _ in range(REQUESTS):
+            t0 = time.perf_counter()
+            assert client.get("/api/me", headers=headers).status_code == 200
+            samples.append((time.perf_counter() - t0) * 1e3)
+        q = statistics.quantiles(samples, n=100)
+        print(f"  {label:<10} p50 {q[49]:.2f} ms  p99 {q[98]:.2f} ms  {REQUESTS / (sum(samples) / 1e3):,.0f} req/s")
+
+    _cleanup()
+
+
+if __name__ == "__main__":
+    main()
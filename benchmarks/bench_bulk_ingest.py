@@ -0,0 +1,78 @@
+# benchmarks/bench_bulk_ingest.py
+#
+# Rows/sec through the API: looping POST /api/incidents vs POST /api/incidents:bulk
+# at a few batch sizes. Needs DATABASE_URL; uses local embeddings and creates and
+# removes its own tenant. Run: EMBEDDINGS_MODE=local python -m benchmarks.bench_bulk_ingest
+
+import time
+
+from fastapi.testclient import TestClient
+
+from app.core.database import SessionLocal
+from app.crud.crud_auth import create_api_key
+from app.main import app
+from app.models.auth import ApiKey, AuditLog
+from app.models.incident import IncidentLog
+
+TENANT = "bench_bulk_ingest"
+ROWS = 1000
+
+
+def _items(n: int, offset: int = 0):
+    return [
+        {
+            "service": "payments",
+            "severity": "high",
+            "source": "alertmanager",
+            "tags": ["bench"],
+            "message": f"alert {offset + i}: p99 latency over SLO on pod payments-{i % 40}, paged oncall@example.com",
+        }
+        for i in range(n)
+    ]
+
+
+def _cleanup() -> None:
+    with SessionLocal() as db:
+        for model in (IncidentLog, AuditLog, ApiKey):
+            db.query(model).filter(model.tenant_id == TENANT).delete()
+        db.commit()
+
+
+def _rows_per_s(fn) -> float:
+    t0 = time.perf_counter()
+    fn()
+    return ROWS / (time.perf_counter() - t0)
+
+
+def main() -> None:
+    _cleanup()
+    with SessionLocal() as db:
+        _, key = create_api_key(db, tenant_id=TENANT, actor_id="bench", role="admin")
+    client = TestClient(app)
+    headers = {"X-API-Key": key}
+
+    def single():
+        for item in _items(ROWS):
+            assert client.post("/api/incidents", headers=headers, json=item).status_code == 200
+
+    def bulk(batch: int):
+        def run():
+            for start in range(0, ROWS, batch):
+                r = client.post("/api/incidents:bulk", headers=headers, json=_items(batch, start))
+                assert r.status_code == 200 and r.json()["created"] == batch
+        return run
+
+    try:
+        client.post("/api/incidents", headers=headers, json=_items(1)[0])  # warm up
+        baseline = _rows_per_s(single)
+        print(f"{'mode':<20} | {'rows/s':>8} | {'speedup':>7}")
+        print(f"{'single POST loop':<20} | {baseline:>8.0f} | {1:>6.1f}x")
+        for batch in (10, 100, 500):
+            rate = _rows_per_s(bulk(batch))
+            print(f"{f'bulk, batch={batch}':<20} | {rate:>8.0f} | {rate / baseline:>6.1f}x")
+    finally:
+        _cleanup()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,94 @@
+# benchmarks/bench_lean_rows.py
+#
+# Time and Python heap for loading top_k incident rows with every column (the old
+# behaviour) vs the lean read projection. Needs DATABASE_URL; seeds and removes its
+# own tenant. Run: python -m benchmarks.bench_lean_rows
+
+import statistics
+import time
+import tracemalloc
+
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker, undefer
+
+from app.core.config import DATABASE_URL, VECTOR_DIM
+from app.crud.crud import _load_read
+from app.llm.embeddings import generate_vector_embeddings_batch
+from app.models.incident import IncidentLog
+from app.schemas.incident import IncidentLogRead
+
+TENANT = "bench_lean_rows"
+ROWS = 500
+
+
+def _seed(SessionLocal) -> None:
+    messages = [f"bench incident {i}: kafka consumer lag " + "x" * 400 for i in range(ROWS)]
+    vecs, model = generate_vector_embeddings_batch(messages)
+    with SessionLocal() as db:
+        db.query(IncidentLog).filter(IncidentLog.tenant_id == TENANT).delete()
+        db.add_all(
+            IncidentLog(
+                tenant_id=TENANT,
+                service="payments",
+                severity="high",
+                message_raw=m,
+                message_redacted=m,
+                embedding=v,
+                embedding_model=model,
+                embedding_dim=VECTOR_DIM,
+                embedding_status="ready",
+            )
+            for m, v in zip(messages, vecs)
+        )
+        db.commit()
+
+
+def _load(SessionLocal, options, top_k: int):
+    with SessionLocal() as db:
+        rows = (
+            db.query(IncidentLog)
+            .options(*options)
+            .filter(IncidentLog.tenant_id == TENANT)
+            .order_by(IncidentLog.id)
+            .limit(top_k)
+            .all()
+        )
+        return [IncidentLogRead.model_validate(r) for r in rows]
+
+
+def _measure(SessionLocal, options, top_k: int, repeat: int = 30):
+    _load(SessionLocal, options, top_k)  # warm connection + statement cache
+    times = []
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        _load(SessionLocal, options, top_k)
+        times.append(time.perf_counter() - t0)
+
+    tracemalloc.start()
+    _load(SessionLocal, options, top_k)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return statistics.median(times) * 1e3, peak / 1024
+
+
+def main() -> None:
+    engine = create_engine(DATABASE_URL)
+    SessionLocal = sessionmaker(bind=engine, autocommit=False, autoflush=False)
+    _seed(SessionLocal)
+
+    full = (undefer(IncidentLog.embedding), undefer(IncidentLog.message_raw))
+    lean = (_load_read(),)
+    try:
+        print(f"{'top_k':>5} | {'full ms':>8} | {'lean ms':>8} | {'full peak KiB':>13} | {'lean peak KiB':>13}")
+        for top_k in (5, 50, 500):
+            full_ms, full_kib = _measure(SessionLocal, full, top_k)
+            lean_ms, lean_kib = _measure(SessionLocal, lean, top_k)
+            print(f"{top_k:>5} | {full_ms:>8.2f} | {lean_ms:>8.2f} | {full_kib:>13.0f} | {lean_kib:>13.0f}")
+    finally:
+        with SessionLocal() as db:
+            db.query(IncidentLog).filter(IncidentLog.tenant_id == TENANT).delete()
+            db.commit()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,42 @@
+# benchmarks/bench_local_embeddings.py
+#
+# Per-item cost of the local deterministic embedder, batch vs the old
+# random.Random loop. Run: EMBEDDINGS_MODE=local python -m benchmarks.bench_local_embeddings
+
+import random
+import time
+
+from app.core.config import VECTOR_DIM
+from app.llm.embeddings import _local_deterministic_matrix, _text_seed, generate_vector_embeddings_batch
+
+
+def _legacy_embedding(text: str, dim: int):
+    rng = random.Random(_text_seed(text))
+    vec = [(rng.random() * 2.0 - 1.0) for _ in range(dim)]
+    norm = sum(x * x for x in vec) ** 0.5
+    return [x / norm for x in vec]
+
+
+def _per_item_us(fn, n: int, repeat: int = 3) -> float:
+    best = float("inf")
+    for r in range(repeat):
+        texts = [f"bench {r} incident {i} db timeout at 10.0.0.{i % 255}" for i in range(n)]
+        t0 = time.perf_counter()
+        fn(texts)
+        best = min(best, time.perf_counter() - t0)
+    return best / n * 1e6
+
+
+def main() -> None:
+    print(f"dim={VECTOR_DIM}")
+    # "matrix" is the NumPy kernel alone; "batch" adds the .tolist() the public API returns
+    print(f"{'n':>7} | {'legacy us/item':>14} | {'batch us/item':>13} | {'matrix us/item':>14} | {'speedup':>7}")
+    for n in (1, 100, 10_000):
+        legacy = _per_item_us(lambda ts: [_legacy_embedding(t, VECTOR_DIM) for t in ts], n, repeat=1 if n > 1000 else 3)
+        batch = _per_item_us(generate_vector_embeddings_batch, n)
+        matrix = _per_item_us(lambda ts: _local_deterministic_matrix(ts, VECTOR_DIM), n)
+        print(f"{n:>7} | {legacy:>14.1f} | {batch:>13.1f} | {matrix:>14.1f} | {legacy / batch:>6.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,52 @@
+# benchmarks/bench_pan_adversarial.py
+#
+# Worst-case inputs for card-number detection at 1, 2 and 4 MB: the old
+# CREDIT_CARD regex vs the linear PAN scanner. Time per MB should stay flat as
+# the input grows. Run: python -m benchmarks.bench_pan_adversarial
+
+import re
+import time
+
+from app.security.redaction import _pan_spans
+
+_LEGACY_CREDIT_CARD = re.compile(r"\b(?:\d[ -]*?){13,19}\b")
+
+# Each case repeats a unit designed to keep the matcher busy without producing a match
+_CASES = {
+    "spaced digits": "1 ",
+    "dashed digits": "1-",
+    "12 digits then word char": "1 " * 12 + "1x ",
+    "wide separators": ("1" + "- " * 20) * 12 + "1_ ",
+    "3-digit groups": "412 ",
+    "visa-prefixed groups": "4000 ",
+    "hex dump": "00 1f 3a 4b 5c 6d 7e 8f 90 a1 b2 c3 d4 e5 f6 07\n",
+    "long digit runs": "1" * 40 + " ",
+    "card-like, bad Luhn": "4111 1111 1111 1112 ",
+}
+
+
+def _seconds(fn, text: str) -> float:
+    t0 = time.perf_counter()
+    fn(text)
+    return time.perf_counter() - t0
+
+
+def main() -> None:
+    sizes = (1_000_000, 2_000_000, 4_000_000)
+    legacy = lambda text: sum(1 for _ in _LEGACY_CREDIT_CARD.finditer(text))
+    scanner = lambda text: sum(1 for _ in _pan_spans(text))
+
+    print(f"{'case':<26} | {'regex s/MB @1/2/4 MB':>22} | {'scanner s/MB @1/2/4 MB':>24}")
+    for name, unit in _CASES.items():
+        rows = []
+        for fn in (legacy, scanner):
+            per_mb = []
+            for size in sizes:
+                text = (unit * (size // len(unit) + 1))[:size]
+                per_mb.append(_seconds(fn, text) / (size / 1e6))
+            rows.append(" / ".join(f"{v:.2f}" for v in per_mb))
+        print(f"{name:<26} | {rows[0]:>22} | {rows[1]:>24}")
+
+
+if __name__ == "__main__":
+    main()
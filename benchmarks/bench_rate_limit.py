@@ -0,0 +1,84 @@
+# benchmarks/bench_rate_limit.py
+#
+# Rate limiter overhead. Times RateLimiter.check per backend (memory; postgres and,
+# with REDIS_URL set, redis) against a budget large enough never to refuse, and
+# GET /api/me end to end with the limiter off and on. Needs DATABASE_URL and the
+# rate_limit_buckets table; creates and removes its own tenant.
+# Run: python -m benchmarks.bench_rate_limit
+
+import os
+import statistics
+import time
+
+from fastapi.testclient import TestClient
+
+from app.core.database import SessionLocal, engine
+from app.core.ratelimit import Budget, MemoryBuckets, PostgresBuckets, RateLimiter, RedisBuckets, limiter
+from app.crud.crud_auth import create_api_key
+from app.main import app
+from app.models.auth import ApiKey
+
+TENANT = "bench_rate_limit"
+CALLS = 2000
+REQUESTS = 1000
+ROUNDS = 10
+UNLIMITED = {"key": Budget(1e6, 1e6), "tenant": Budget(1e6, 1e6)}
+
+
+def _cleanup() -> None:
+    with SessionLocal() as db:
+        db.query(ApiKey).filter(ApiKey.tenant_id == TENANT).delete()
+        db.commit()
+
+
+def _time_calls(fn, n: int) -> float:
+    """Median microseconds per call."""
+    samples = []
+    for _ in range(n):
+        t0 = time.perf_counter()
+        fn()
+        samples.append((time.perf_counter() - t0) * 1e6)
+    return statistics.median(samples)
+
+
+def main() -> None:
+    budgets = {c: UNLIMITED for c in ("search", "write", "read")}
+    backends = [("memory", MemoryBuckets()), ("postgres", PostgresBuckets(engine))]
+    if os.getenv("REDIS_URL"):
+        backends.append(("redis", RedisBuckets(os.environ["REDIS_URL"])))
+
+    print(f"RateLimiter.check (key + tenant bucket), median of {CALLS} calls")
+    for label, backend in backends:
+        rl = RateLimiter(backend, budgets)
+        rl.check("read", TENANT, 1)
+        print(f"  {label:<10} {_time_calls(lambda: rl.check('read', TENANT, 1), CALLS):>8.1f} us")
+        rl.reset()
+
+    _cleanup()
+    with SessionLocal() as db:
+        _, key = create_api_key(db, tenant_id=TENANT, actor_id="bench", role="viewer")
+    client = TestClient(app)
+    headers = {"X-API-Key": key}
+    limiter.budgets = budgets
+    runs = [("off", None)] + backends
+    samples = {label: [] for label, _ in runs}
+    # Interleaved in rounds: TestClient latency drifts over a long run
+    for _ in range(ROUNDS):
+        for label, backend in runs:
+            limiter.backend = backend
+            for _ in range(REQUESTS // ROUNDS):
+                t0 = time.perf_counter()
+                assert client.get("/api/me", headers=headers).status_code == 200
+                samples[label].append((time.perf_counter() - t0) * 1e3)
+    print(f"\nGET /api/me, {REQUESTS} requests each")
+    for label, backend in runs:
+        q = statistics.quantiles(samples[label], n=100)
+        print(f"  {label:<10} p50 {q[49]:.2f} ms  p99 {q[98]:.2f} ms  {REQUESTS / (sum(samples[label]) / 1e3):,.0f} req/s")
+        if backend is not None:
+            backend.reset()
+
+    _cleanup()
+
+
+if __name__ == "__main__":
+    main()
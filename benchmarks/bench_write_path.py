@@ -0,0 +1,95 @@
+# benchmarks/bench_write_path.py
+#
+# Commits, statements and p50/p99 latency per request for the single-incident write
+# routes (create, field update, message update, soft delete). Needs DATABASE_URL;
+# uses local embeddings and creates and removes its own tenant.
+# Run: EMBEDDINGS_MODE=local python -m benchmarks.bench_write_path
+
+import statistics
+import time
+
+from fastapi.testclient import TestClient
+from sqlalchemy import event
+
+from app.core.database import SessionLocal, engine
+from app.crud.crud_auth import create_api_key
+from app.main import app
+from app.models.auth import ApiKey, AuditLog
+from app.models.incident import IncidentLog
+
+TENANT = "bench_write_path"
+REQUESTS = 500
+
+
+def _cleanup() -> None:
+    with SessionLocal() as db:
+        for model in (IncidentLog, AuditLog, ApiKey):
+            db.query(model).filter(model.tenant_id == TENANT).delete()
+        db.commit()
+
+
+class _Counter:
+    def __init__(self) -> None:
+        self.commits = 0
+        self.statements = 0
+
+    def on_commit(self, conn) -> None:
+        self.commits += 1
+
+    def on_execute(self, conn, cursor, statement, parameters, context, executemany) -> None:
+        self.statements += 1
+
+
+def _percentile(samples, q: float) -> float:
+    return statistics.quantiles(samples, n=100)[int(q) - 1]
+
+
+def main() -> None:
+    _cleanup()
+    with SessionLocal() as db:
+        _, key = create_api_key(db, tenant_id=TENANT, actor_id="bench", role="admin")
+    client = TestClient(app)
+    headers = {"X-API-Key": key}
+
+    counter = _Counter()
+    event.listen(engine, "commit", counter.on_commit)
+    event.listen(engine, "before_cursor_execute", counter.on_execute)
+
+    ids = []
+
+    def create(i):
+        r = client.post("/api/incidents", headers=headers, json={"service": "db", "severity": "high", "message": f"disk full on db-{i}"})
+        assert r.status_code == 200
+        ids.append(r.json()["id"])
+
+    def update_fields(i):
+        assert client.patch(f"/api/incidents/{ids[i]}", headers=headers, json={"severity": "critical"}).status_code == 200
+
+    def update_message(i):
+        assert client.patch(f"/api/incidents/{ids[i]}", headers=headers, json={"message": f"disk freed on db-{i}"}).status_code == 200
+
+    def delete(i):
+        assert client.delete(f"/api/incidents/{ids[i]}", headers=headers).status_code == 200
+
+    try:
+        client.get("/api/me", headers=headers)  # warm up the pool and the key lookup
+        print(f"{'route':<16} | {'commits/req':>11} | {'stmts/req':>9} | {'p50 ms':>7} | {'p99 ms':>7}")
+        for name, fn in (("create", create), ("update fields", update_fields), ("update message", update_message), ("delete", delete)):
+            counter.commits = counter.statements = 0
+            samples = []
+            for i in range(REQUESTS):
+                t0 = time.perf_counter()
+                fn(i)
+                samples.append((time.perf_counter() - t0) * 1000)
+            print(
+                f"{name:<16} | {counter.commits / REQUESTS:>11.1f} | {counter.statements / REQUESTS:>9.1f} | "
+                f"{statistics.median(samples):>7.2f} | {_percentile(samples, 99):>7.2f}"
+            )
+    finally:
+        event.remove(engine, "commit", counter.on_commit)
+        event.remove(engine, "before_cursor_execute", counter.on_execute)
+        _cleanup()
+
+
+if __name__ == "__main__":
+    main()
@@ -13,9 +13,16 @@ from app.core.config import DATABASE_URL
 from app.models.incident import Base
 import app.models.incident as _incident_models  # noqa: F401
 import app.models.auth as _auth_models          # noqa: F401
+import app.models.embedding_cache as _cache_models  # noqa: F401
+import app.models.idempotency as _idempotency_models  # noqa: F401
+import app.models.stack_rollup as _rollup_models  # noqa: F401
+import app.models.rate_limit as _rate_limit_models  # noqa: F401
 
 
-from app.crud.crud_auth import create_api_key
+from app.crud.crud_auth import create_api_key, auth_cache, auth_negative_cache
+from app.crud.crud_key_usage import key_usage
+from app.core.ratelimit import limiter
+from app.security.hashing import canonical_json, sha256_hex
 
 
 @pytest.fixture(scope="session")
@@ -37,9 +44,17 @@ def db_session(engine):
 
     # Clean between tests because app code commits
     db.execute(text("TRUNCATE TABLE audit_logs RESTART IDENTITY CASCADE;"))
+    db.execute(text("TRUNCATE TABLE audit_chain_heads;"))
     db.execute(text("TRUNCATE TABLE api_keys RESTART IDENTITY CASCADE;"))
     db.execute(text("TRUNCATE TABLE incident_logs RESTART IDENTITY CASCADE;"))
+    db.execute(text("TRUNCATE TABLE embedding_cache;"))
+    db.execute(text("TRUNCATE TABLE stack_fingerprint_rollups;"))
+    db.execute(text("TRUNCATE TABLE rate_limit_buckets;"))
     db.commit()
+    auth_cache.clear()
+    auth_negative_cache.clear()
+    key_usage.drain()
+    limiter.reset()
 
     try:
         yield db
@@ -58,10 +73,17 @@ def client(db_session, monkeypatch):
     # deterministic 1536-d embedding stub
     def fake_embeddings(text_in: str, model: str = "text-embedding-3-small"):
         h = hashlib.sha256(text_in.encode("utf-8")).digest()
-        return [(h[i % len(h)] / 255.0) for i in range(1536)]
+        return [(h[i % len(h)] / 255.0) for i in range(1536)], model
+
+    def fake_embeddings_batch(texts, model: str = "text-embedding-3-small"):
+        return [fake_embeddings(t, model)[0] for t in texts], model
 
     import app.crud.crud as crud_module
     monkeypatch.setattr(crud_module, "generate_vector_embeddings", fake_embeddings)
+    monkeypatch.setattr(crud_module, "generate_vector_embeddings_batch", fake_embeddings_batch)
+
+    from app.llm.cache import embedding_cache
+    embedding_cache.clear()
 
     try:
         yield TestClient(fastapi_app)
@@ -80,3 +102,30 @@ def bootstrap_keys(db_session):
 
     _, keys["b_admin"] = create_api_key(db_session, tenant_id="tenant_b", actor_id="b_admin", role="admin", name="B admin")
     return keys
+
+
+def create_incident(client, key, message):
+    """POSTs one payments incident through the API and returns the created row."""
+    r = client.post(
+        "/api/incidents",
+        headers={"X-API-Key": key},
+        json={"service": "payments", "severity": "sev2", "message": message},
+    )
+    assert r.status_code == 200, r.text
+    return r.json()
+
+
+def recompute_audit_hash(row):
+    """The hash an audit_logs row should carry, recomputed from its stored fields."""
+    payload = {
+        "tenant_id": row.tenant_id,
+        "actor_id": row.actor_id,
+        "action": row.action,
+        "resource_type": row.resource_type,
+        "resource_id": row.resource_id,
+        "created_at": row.created_at.isoformat(),
+        "request_meta": row.request_meta,
+        "result_ids": row.result_ids,
+        "prev_hash": row.prev_hash,
+    }
+    return sha256_hex((row.prev_hash or "") + "|" + canonical_json(payload))
@@ -0,0 +1,105 @@
+# tests/embedding_stub.py
+#
+# Local stand-in for the OpenAI /embeddings endpoint so provider batching,
+# concurrency limits and deadlines can be tested and benchmarked offline.
+
+import base64
+import hashlib
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import numpy as np
+
+
+class _Server(ThreadingHTTPServer):
+    request_queue_size = 256  # naive clients open a connection per call
+
+
+def stub_vector(text: str, dim: int = 1536) -> np.ndarray:
+    h = hashlib.sha256(text.encode("utf-8")).digest()
+    return np.array([h[i % len(h)] / 255.0 for i in range(dim)], dtype=np.float32)
+
+
+class EmbeddingStubServer:
+    def __init__(self, delay: float = 0.0, dim: int = 1536, fail: bool = False, reject=()):
+        self.delay = delay
+        self.dim = dim
+        self.fail = fail
+        self.reject = set(reject)  # inputs answered with a 400, like an oversized text
+        self.batch_sizes = []
+        self.client_ports = set()
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self._lock = threading.Lock()
+
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"  # keep-alive, so connection reuse is observable
+
+            def log_message(self, *args):
+                pass
+
+            def do_POST(self):
+                body = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))))
+                with stub._lock:
+                    stub.in_flight += 1
+                    stub.max_in_flight = max(stub.max_in_flight, stub.in_flight)
+                    stub.client_ports.add(self.client_address[1])
+                try:
+                    if stub.delay:
+                        time.sleep(stub.delay)
+                    if stub.fail:
+                        self._send(500, {"error": {"message": "stub failure", "type": "server_error"}})
+                        return
+
+                    inputs = body["input"] if isinstance(body["input"], list) else [body["input"]]
+                    with stub._lock:
+                        stub.batch_sizes.append(len(inputs))
+                    if stub.reject.intersection(inputs):
+                        self._send(400, {"error": {"message": "invalid input", "type": "invalid_request_error"}})
+                        return
+
+                    data = []
+                    for i, text in enumerate(inputs):
+                        vec = stub_vector(text, stub.dim)
+                        if body.get("encoding_format") == "base64":
+                            emb = base64.b64encode(vec.tobytes()).decode("ascii")
+                        else:
+                            emb = vec.tolist()
+                        data.append({"object": "embedding", "index": i, "embedding": emb})
+                    self._send(200, {
+                        "object": "list",
+                        "data": data,
+                        "model": body.get("model"),
+                        "usage": {"prompt_tokens": 0, "total_tokens": 0},
+                    })
+                finally:
+                    with stub._lock:
+                        stub.in_flight -= 1
+
+            def _send(self, status, payload):
+                raw = json.dumps(payload).encode("utf-8")
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(raw)))
+                self.end_headers()
+                self.wfile.write(raw)
+
+        self.httpd = _Server(("127.0.0.1", 0), Handler)
+        self.httpd.daemon_threads = True
+        self._thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+
+    @property
+    def base_url(self) -> str:
+        return f"http://127.0.0.1:{self.httpd.server_address[1]}/v1"
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self.httpd.shutdown()
+        self.httpd.server_close()
@@ -0,0 +1,119 @@
+# tests/test_ann_index.py
+
+import pytest
+from sqlalchemy import event, text
+
+import app.crud.crud as crud_module
+from app.llm.embeddings import generate_vector_embeddings_batch
+from app.models.incident import IncidentLog
+
+
+@pytest.fixture(autouse=True)
+def _local_mode(monkeypatch):
+    # These tests embed and search outside the client fixture's stub
+    monkeypatch.setenv("EMBEDDINGS_MODE", "local")
+
+
+def _seed(db, n=600, tenants=("tenant_a", "tenant_b")):
+    messages = [f"payment latency spike on shard {i}" for i in range(n)]
+    vecs, model = generate_vector_embeddings_batch(messages)
+    for i, (m, v) in enumerate(zip(messages, vecs)):
+        db.add(IncidentLog(
+            tenant_id=tenants[i % len(tenants)],
+            service="payments",
+            message_raw=m,
+            message_redacted=m,
+            embedding=v,
+            embedding_model=model,
+            embedding_status="ready",
+        ))
+    db.commit()
+    db.execute(text("ANALYZE incident_logs"))
+    db.commit()
+
+
+def _capture_search_sql(db, **kwargs):
+    captured = []
+    engine = db.get_bind()
+
+    def _listener(conn, cursor, statement, parameters, context, executemany):
+        if "<=>" in statement:
+            captured.append((statement, parameters))
+
+    event.listen(engine, "before_cursor_execute", _listener)
+    try:
+        results = crud_module.search_incidents(db, **kwargs)
+    finally:
+        event.remove(engine, "before_cursor_execute", _listener)
+    assert len(captured) == 1
+    return results, captured[0]
+
+
+def test_search_plan_uses_ann_index_with_tenant_filter(db_session, monkeypatch):
+    # Past the exact-ranking cutoff, so the index is used even without iterative scans
+    monkeypatch.setattr(crud_module, "SEARCH_EXACT_MAX_ROWS", 100)
+    _seed(db_session)
+    results, (statement, params) = _capture_search_sql(db_session, tenant_id="tenant_a", query="payment", top_k=5)
+    assert len(results) == 5
+    assert {r.tenant_id for r in results} == {"tenant_a"}
+
+    # A fixture this small is cheaper to sort than to walk the graph; disabling explicit
+    # sorts leaves ordered paths only, so ORDER BY distance must come from the ANN index.
+    cursor = db_session.connection().connection.cursor()
+    cursor.execute("SET LOCAL enable_sort = off")
+    cursor.execute("EXPLAIN " + statement, params)
+    plan = "\n".join(row[0] for row in cursor.fetchall())
+    db_session.rollback()
+
+    lines = [line.strip() for line in plan.splitlines()]
+    scan = next(i for i, line in enumerate(lines) if line.startswith("->  Index Scan using ix_incident_logs_embedding_"))
+    assert f"ix_incident_logs_embedding_{crud_module.ANN_INDEX_TYPE} " in lines[scan]
+    vector_filter = next(line for line in lines[scan + 1:] if line.startswith("Filter:"))
+    assert "tenant_id)::text = 'tenant_a'" in vector_filter
+
+
+def test_search_sets_transaction_local_recall_knobs(db_session, monkeypatch):
+    _seed(db_session, n=20)
+
+    monkeypatch.setattr(crud_module, "ANN_INDEX_TYPE", "hnsw")
+    crud_module.search_incidents(db_session, tenant_id="tenant_a", query="payment", top_k=5)
+    assert db_session.execute(text("SHOW hnsw.ef_search")).scalar() == str(crud_module.SEARCH_HNSW_EF_SEARCH)
+    db_session.rollback()
+
+    # ef_search never drops below the number of neighbours the query asks the index for
+    crud_module.search_incidents(db_session, tenant_id="tenant_a", query="payment", top_k=8, ef_search=3, mode="ilike")
+    assert db_session.execute(text("SHOW hnsw.ef_search")).scalar() == "8"
+    db_session.rollback()
+    crud_module.search_incidents(db_session, tenant_id="tenant_a", query="payment", top_k=8, ef_search=3)
+    assert db_session.execute(text("SHOW hnsw.ef_search")).scalar() == str(crud_module.SEARCH_CANDIDATES)
+    db_session.rollback()
+    assert db_session.execute(text("SHOW hnsw.ef_search")).scalar() == "40"
+
+    monkeypatch.setattr(crud_module, "ANN_INDEX_TYPE", "ivfflat")
+    crud_module.search_incidents(db_session, tenant_id="tenant_a", query="payment", top_k=5, probes=7)
+    assert db_session.execute(text("SHOW ivfflat.probes")).scalar() == "7"
+    db_session.rollback()
+
+
+def test_search_route_validates_recall_knobs(client, bootstrap_keys):
+    headers = {"X-API-Key": bootstrap_keys["a_viewer"]}
+    assert client.get("/api/search", headers=headers, params={"q": "db", "ef_search": 0}).status_code == 422
+    assert client.get("/api/search", headers=headers, params={"q": "db", "probes": 5000}).status_code == 422
+    r = client.get("/api/search", headers=headers, params={"q": "db", "ef_search": 100, "probes": 4})
+    assert r.status_code == 200, r.text
+
+
+def test_small_tenant_gets_every_row_from_a_filtered_vector_search(db_session):
+    _seed(db_session, n=600, tenants=("tenant_b",))
+    for i in range(5):
+        vecs, model = generate_vector_embeddings_batch([f"disk {i}"])
+        db_session.add(IncidentLog(
+            tenant_id="tenant_a", message_raw=f"a{i}", message_redacted=f"a{i}",
+            embedding=vecs[0], embedding_model=model, embedding_status="ready",
+        ))
+    db_session.commit()
+
+    # Fewer matching rows than ef_search; no sorting, so the plan would walk the index
+    db_session.execute(text("SET LOCAL enable_sort = off"))
+    results = crud_module.search_incidents(db_session, tenant_id="tenant_a", query="zebra", top_k=10, ef_search=40)
+    assert len(results) == 5
@@ -0,0 +1,137 @@
+# tests/test_api_key_lifecycle.py
+
+import time
+from datetime import datetime, timedelta, timezone
+
+import pytest
+from sqlalchemy import event
+
+from app.core.database import SessionLocal, engine as app_engine
+from app.crud.crud_key_usage import KeyUsageBuffer, key_usage
+from app.models.auth import ApiKey, AuditLog
+
+
+def _h(key):
+    return {"X-API-Key": key}
+
+
+def _key_id(db_session, actor_id):
+    return db_session.query(ApiKey.id).filter(ApiKey.actor_id == actor_id).scalar()
+
+
+def test_revoke_takes_effect_on_the_next_request(client, db_session, bootstrap_keys):
+    admin, viewer = _h(bootstrap_keys["a_admin"]), _h(bootstrap_keys["a_viewer"])
+    assert client.get("/api/me", headers=viewer).status_code == 200  # now cached
+    key_id = _key_id(db_session, "a_viewer")
+
+    r = client.post(f"/api/admin/api-keys/{key_id}/revoke", headers=admin)
+    assert r.status_code == 200, r.text
+    assert r.json()["is_active"] is False and r.json()["revoked_at"] is not None
+    assert client.get("/api/me", headers=viewer).status_code == 401
+
+    # Idempotent; still audited
+    again = client.post(f"/api/admin/api-keys/{key_id}/revoke", headers=admin)
+    assert again.status_code == 200 and again.json()["revoked_at"] == r.json()["revoked_at"]
+    assert db_session.query(AuditLog).filter(AuditLog.action == "API_KEY_REVOKE").count() == 2
+
+
+def test_revoke_and_rotate_are_admin_only_and_tenant_scoped(client, db_session, bootstrap_keys):
+    key_id = _key_id(db_session, "a_viewer")
+    for path in (f"/api/admin/api-keys/{key_id}/revoke", f"/api/admin/api-keys/{key_id}/rotate"):
+        assert client.post(path, headers=_h(bootstrap_keys["a_responder"])).status_code == 403
+        assert client.post(path, headers=_h(bootstrap_keys["b_admin"])).status_code == 404
+    assert client.post("/api/admin/api-keys/999999/revoke", headers=_h(bootstrap_keys["a_admin"])).status_code == 404
+    assert client.get("/api/me", headers=_h(bootstrap_keys["a_viewer"])).status_code == 200
+
+    listed = client.get("/api/admin/api-keys", headers=_h(bootstrap_keys["b_admin"])).json()
+    assert [k["actor_id"] for k in listed] == ["b_admin"]
+    assert "key_hash" not in listed[0] and "api_key" not in listed[0]
+
+
+def test_rotate_replaces_the_key_immediately(client, db_session, bootstrap_keys):
+    admin, old = _h(bootstrap_keys["a_admin"]), _h(bootstrap_keys["a_responder"])
+    assert client.get("/api/me", headers=old).status_code == 200
+    key_id = _key_id(db_session, "a_resp")
+
+    r = client.post(f"/api/admin/api-keys/{key_id}/rotate", headers=admin)
+    assert r.status_code == 200, r.text
+    body = r.json()
+    assert body["id"] != key_id and body["previous"]["id"] == key_id and body["previous"]["is_active"] is False
+    assert client.get("/api/me", headers=old).status_code == 401
+    me = client.get("/api/me", headers=_h(body["api_key"])).json()
+    assert (me["actor_id"], me["role"]) == ("a_resp", "responder")
+
+    assert client.post(f"/api/admin/api-keys/{key_id}/rotate", headers=admin).status_code == 409
+    audit = db_session.query(AuditLog).filter(AuditLog.action == "API_KEY_ROTATE").one()
+    assert audit.request_meta == {"new_key_id": body["id"], "grace_seconds": 0}
+
+
+def test_rotate_with_grace_keeps_the_old_key_until_expiry(client, db_session, bootstrap_keys):
+    admin, old = _h(bootstrap_keys["a_admin"]), _h(bootstrap_keys["a_viewer"])
+    key_id = _key_id(db_session, "a_viewer")
+
+    r = client.post(f"/api/admin/api-keys/{key_id}/rotate?grace_seconds=1", headers=admin)
+    assert r.status_code == 200, r.text
+    previous = r.json()["previous"]
+    assert previous["is_active"] is True and previous["expires_at"] is not None
+
+    assert client.get("/api/me", headers=old).status_code == 200
+    assert client.post(f"/api/admin/api-keys/{key_id}/rotate", headers=admin).status_code == 409
+    time.sleep(1.2)
+    # The cached entry expired with the key, not AUTH_CACHE_TTL_SECONDS later
+    assert client.get("/api/me", headers=old).status_code == 401
+    assert client.get("/api/me", headers=_h(r.json()["api_key"])).status_code == 200
+
+    # Listed as inactive once the grace period is over
+    listed = {k["id"]: k for k in client.get("/api/admin/api-keys", headers=admin).json()}
+    assert listed[key_id]["is_active"] is False and listed[key_id]["revoked_at"] is None
+
+
+def test_last_used_at_is_written_behind_in_one_batch(client, db_session, bootstrap_keys):
+    updates = []
+
+    def on_execute(conn, cursor, statement, parameters, context, executemany):
+        if statement.lstrip().upper().startswith("UPDATE API_KEYS"):
+            updates.append(statement)
+
+    event.listen(app_engine, "before_cursor_execute", on_execute)
+    try:
+        for name in ("a_admin", "a_viewer", "a_auditor", "a_admin"):
+            assert client.get("/api/me", headers=_h(bootstrap_keys[name])).status_code == 200
+        db_session.expire_all()
+        assert updates == [] and db_session.query(ApiKey).filter(ApiKey.last_used_at.isnot(None)).count() == 0
+
+        assert key_usage.flush(SessionLocal) == 3
+        assert len(updates) == 1
+    finally:
+        event.remove(app_engine, "before_cursor_execute", on_execute)
+
+    db_session.expire_all()
+    used = {k.actor_id: k.last_used_at for k in db_session.query(ApiKey).filter(ApiKey.tenant_id == "tenant_a")}
+    assert used["a_resp"] is None
+    assert all(abs(used[a] - datetime.now(timezone.utc)) < timedelta(seconds=30) for a in ("a_admin", "a_viewer", "a_auditor"))
+    listed = {k["actor_id"]: k["last_used_at"] for k in client.get("/api/admin/api-keys", headers=_h(bootstrap_keys["a_admin"])).json()}
+    assert listed["a_viewer"] is not None and listed["a_resp"] is None
+
+
+def test_flush_never_moves_last_used_at_backwards_and_retries_on_error(db_session, bootstrap_keys):
+    key_id = _key_id(db_session, "a_viewer")
+    buf = KeyUsageBuffer()
+    buf.touch(key_id)
+    buf.flush(SessionLocal)
+    db_session.expire_all()
+    first = db_session.get(ApiKey, key_id).last_used_at
+
+    # An older timestamp from a slower process
+    buf._pending[key_id] = time.time() - 3600
+    buf.flush(SessionLocal)
+    db_session.expire_all()
+    assert db_session.get(ApiKey, key_id).last_used_at == first
+
+    def broken():
+        raise RuntimeError("db down")
+
+    buf.touch(key_id)
+    with pytest.raises(RuntimeError):
+        buf.flush(broken)
+    assert list(buf.drain()) == [key_id]
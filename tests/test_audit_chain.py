@@ -0,0 +1,83 @@
+# tests/test_audit_chain.py
+
+import threading
+
+import pytest
+from sqlalchemy import text
+from sqlalchemy.exc import OperationalError
+
+from app.core.database import SessionLocal
+from app.crud.crud_auth import ActorContext, append_audit_log, append_audit_logs
+from app.models.auth import AuditChainHead, AuditLog
+from conftest import recompute_audit_hash
+
+TENANTS = ("tenant_a", "tenant_b")
+THREADS_PER_TENANT = 8
+APPENDS_PER_THREAD = 15
+
+
+def _actor(tenant_id, actor_id="worker"):
+    return ActorContext(tenant_id=tenant_id, actor_id=actor_id, role="admin", api_key_id=1)
+
+
+def _assert_linear(db, tenant_id, expected):
+    chain = db.query(AuditLog).filter(AuditLog.tenant_id == tenant_id).order_by(AuditLog.id).all()
+    assert len(chain) == expected
+    assert chain[0].prev_hash is None
+    for prev, row in zip(chain, chain[1:]):
+        assert row.prev_hash == prev.hash, f"fork at audit_logs.id={row.id}"
+    assert all(recompute_audit_hash(row) == row.hash for row in chain)
+    head = db.get(AuditChainHead, tenant_id)
+    assert (head.hash, head.entries) == (chain[-1].hash, expected)
+
+
+def test_concurrent_appends_keep_each_tenant_chain_linear(db_session):
+    errors = []
+    start = threading.Barrier(len(TENANTS) * THREADS_PER_TENANT)
+
+    def worker(tenant_id, n):
+        actor = _actor(tenant_id, f"worker{n}")
+        try:
+            start.wait()
+            for i in range(APPENDS_PER_THREAD):
+                with SessionLocal() as db:
+                    if i % 5 == 4:
+                        # A segment, as bulk create and import write it
+                        append_audit_logs(db, actor, "INCIDENT_CREATE", "incident", [{"resource_id": f"{n}-{i}-{j}"} for j in range(3)])
+                    else:
+                        append_audit_log(db, actor, "INCIDENT_READ", "incident", f"{n}-{i}")
+        except Exception as e:  # pragma: no cover - reported below
+            errors.append(e)
+
+    threads = [threading.Thread(target=worker, args=(t, n)) for t in TENANTS for n in range(THREADS_PER_TENANT)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert errors == []
+
+    per_thread = (APPENDS_PER_THREAD - APPENDS_PER_THREAD // 5) + 3 * (APPENDS_PER_THREAD // 5)
+    for tenant_id in TENANTS:
+        _assert_linear(db_session, tenant_id, THREADS_PER_TENANT * per_thread)
+
+
+def test_head_is_locked_until_the_appending_transaction_ends(db_session):
+    append_audit_log(db_session, _actor("tenant_a"), "INCIDENT_READ", "incident", "1")
+
+    with SessionLocal() as first, SessionLocal() as second:
+        append_audit_log(first, _actor("tenant_a"), "INCIDENT_READ", "incident", "2", commit=False)
+
+        # Other tenants are not blocked
+        append_audit_log(second, _actor("tenant_b"), "INCIDENT_READ", "incident", "1")
+
+        second.execute(text("SET LOCAL lock_timeout = '200ms'"))
+        with pytest.raises(OperationalError):
+            append_audit_log(second, _actor("tenant_a"), "INCIDENT_READ", "incident", "3", commit=False)
+        second.rollback()
+
+        # Rolled back: neither the entry nor the head moved
+        first.rollback()
+    _assert_linear(db_session, "tenant_a", 1)
+
+    append_audit_log(db_session, _actor("tenant_a"), "INCIDENT_READ", "incident", "4")
+    _assert_linear(db_session, "tenant_a", 2)
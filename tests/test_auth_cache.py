@@ -0,0 +1,99 @@
+# tests/test_auth_cache.py
+
+import time
+
+import pytest
+from sqlalchemy import event
+
+import app.crud.crud_auth as crud_auth
+from app.core.cache import LRUCache
+from app.core.database import engine as app_engine
+from app.crud.crud_auth import authenticate_api_key, create_api_key, invalidate_api_key
+from app.models.auth import ApiKey
+from app.security.hashing import sha256_hex
+
+
+@pytest.fixture()
+def key_lookups(engine):
+    """Counts SELECTs against api_keys on both the test and the app engine."""
+    seen = []
+
+    def on_execute(conn, cursor, statement, parameters, context, executemany):
+        if statement.lstrip().upper().startswith("SELECT") and "FROM api_keys" in statement:
+            seen.append(statement)
+
+    engines = {engine, app_engine}
+    for eng in engines:
+        event.listen(eng, "before_cursor_execute", on_execute)
+    try:
+        yield seen
+    finally:
+        for eng in engines:
+            event.remove(eng, "before_cursor_execute", on_execute)
+
+
+def test_one_key_lookup_per_request_then_cached(client, bootstrap_keys, key_lookups):
+    headers = {"X-API-Key": bootstrap_keys["a_viewer"]}
+
+    assert client.get("/api/me", headers=headers).status_code == 200
+    assert len(key_lookups) == 1  # router and route share one get_actor
+
+    for _ in range(3):
+        assert client.get("/api/me", headers=headers).json()["actor_id"] == "a_viewer"
+    assert len(key_lookups) == 1
+
+
+def test_unknown_keys_are_cached_briefly(client, bootstrap_keys, key_lookups, monkeypatch):
+    monkeypatch.setattr(crud_auth.auth_negative_cache, "ttl", 0.2)
+    headers = {"X-API-Key": "guessed-key"}
+
+    for _ in range(3):
+        assert client.get("/api/me", headers=headers).status_code == 401
+    assert len(key_lookups) == 1
+
+    time.sleep(0.3)
+    assert client.get("/api/me", headers=headers).status_code == 401
+    assert len(key_lookups) == 2
+
+    # A missing header never reaches the database
+    assert client.get("/api/me").status_code == 401
+    assert len(key_lookups) == 2
+
+
+def test_guessing_flood_does_not_evict_valid_keys(client, bootstrap_keys, key_lookups, monkeypatch):
+    monkeypatch.setattr(crud_auth, "auth_negative_cache", LRUCache(4, ttl=5))
+    good = {"X-API-Key": bootstrap_keys["a_admin"]}
+    assert client.get("/api/me", headers=good).status_code == 200
+
+    for i in range(50):
+        assert client.get("/api/me", headers={"X-API-Key": f"guess-{i}"}).status_code == 401
+    assert len(crud_auth.auth_negative_cache) == 4
+
+    before = len(key_lookups)
+    assert client.get("/api/me", headers=good).status_code == 200
+    assert len(key_lookups) == before
+
+
+def test_deactivated_key_stops_working_after_ttl_or_invalidation(db_session, monkeypatch):
+    _, plain = create_api_key(db_session, tenant_id="tenant_a", actor_id="ops", role="responder")
+    assert authenticate_api_key(db_session, plain).actor_id == "ops"
+
+    db_session.query(ApiKey).filter(ApiKey.key_hash == sha256_hex(plain)).update({"is_active": False})
+    db_session.commit()
+
+    # Still served from cache until the entry expires or is invalidated
+    assert authenticate_api_key(db_session, plain) is not None
+    invalidate_api_key(db_session, sha256_hex(plain))
+    db_session.rollback()  # nothing is dropped unless the transaction commits
+    assert authenticate_api_key(db_session, plain) is not None
+    invalidate_api_key(db_session, sha256_hex(plain))
+    db_session.commit()
+    assert authenticate_api_key(db_session, plain) is None
+
+    monkeypatch.setattr(crud_auth.auth_cache, "ttl", 0.1)
+    _, other = create_api_key(db_session, tenant_id="tenant_a", actor_id="ops2", role="viewer")
+    assert authenticate_api_key(db_session, other) is not None
+    db_session.query(ApiKey).filter(ApiKey.key_hash == sha256_hex(other)).update({"is_active": False})
+    db_session.commit()
+    time.sleep(0.2)
+    assert authenticate_api_key(db_session, other) is None
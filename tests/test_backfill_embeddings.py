@@ -0,0 +1,118 @@
+# tests/test_backfill_embeddings.py
+
+import json
+
+import pytest
+from sqlalchemy.orm import sessionmaker
+
+import app.crud.crud as crud_module
+from app.llm.cache import embedding_cache
+from app.llm.embeddings import EmbeddingError
+from app.models.incident import IncidentLog
+from app.scripts.backfill_embeddings import backfill, shard_range
+
+
+@pytest.fixture()
+def session_factory(engine):
+    return sessionmaker(bind=engine, autocommit=False, autoflush=False)
+
+
+def _seed(db, n):
+    rows = []
+    for i in range(n):
+        status = ("pending", "failed", "ready")[i % 3]
+        rows.append(IncidentLog(
+            tenant_id="tenant_a",
+            service="payments",
+            severity="sev2",
+            message_raw=f"msg {i}",
+            message_redacted=f"msg {i}",
+            embedding_status=status,
+            # "ready" rows carry an old model name, so they are stale
+            embedding_model="local-deterministic-v1" if status == "ready" else None,
+            embedding=[0.0] * 1536 if status == "ready" else None,
+        ))
+    db.add_all(rows)
+    db.commit()
+    return [r.id for r in rows]
+
+
+def test_backfill_repairs_failed_pending_and_stale_rows(client, db_session, session_factory, tmp_path):
+    ids = _seed(db_session, 10)
+    ckpt = tmp_path / "ckpt.json"
+
+    stats = backfill(session_factory, batch_size=4, checkpoint_path=str(ckpt), log=lambda _: None)
+
+    assert stats.scanned == 10 and stats.updated == 10
+    assert json.loads(ckpt.read_text())["last_id"] == ids[-1]
+
+    db_session.expire_all()
+    rows = db_session.query(IncidentLog).all()
+    assert {r.embedding_status for r in rows} == {"ready"}
+    assert {r.embedding_model for r in rows} == {crud_module.EMBED_MODEL}
+
+    # Resuming from the checkpoint finds nothing left to do
+    again = backfill(session_factory, batch_size=4, checkpoint_path=str(ckpt), log=lambda _: None)
+    assert again.scanned == 10 and again.updated == 10
+
+
+def test_backfill_respects_shard_ranges(client, db_session, session_factory):
+    ids = _seed(db_session, 9)
+
+    start, end = shard_range(db_session, 1, 3)
+    assert (start, end) == (ids[2], ids[5])
+
+    stats = backfill(session_factory, id_start=start, id_end=end, log=lambda _: None)
+    assert stats.scanned == 3
+
+    db_session.expire_all()
+    done = {r.id for r in db_session.query(IncidentLog).filter(IncidentLog.embedding_model == crud_module.EMBED_MODEL)}
+    assert done == set(ids[3:6])
+
+
+def _failing(monkeypatch, should_fail):
+    real = crud_module.generate_vector_embeddings_batch
+    calls = []
+
+    def embed(texts, model="text-embedding-3-small"):
+        calls.append(list(texts))
+        error = should_fail(texts)
+        if error is not None:
+            raise error
+        return real(texts, model)
+
+    monkeypatch.setattr(crud_module, "generate_vector_embeddings_batch", embed)
+    return calls
+
+
+def test_transient_errors_retry_the_page_without_skipping_it(client, db_session, session_factory, monkeypatch, tmp_path):
+    _seed(db_session, 6)
+    ckpt = tmp_path / "ckpt.json"
+    outage = iter([EmbeddingError("503"), EmbeddingError("timeout")])
+    calls = _failing(monkeypatch, lambda texts: next(outage, None))
+
+    stats = backfill(session_factory, batch_size=4, checkpoint_path=str(ckpt), retry_base_seconds=0, log=lambda _: None)
+    assert stats.updated == 6 and stats.failed == 0
+    assert calls[0] == calls[1] == calls[2]  # the same page, retried
+
+    # A provider that stays down stops the run where it is, for the checkpoint to resume
+    db_session.query(IncidentLog).update({"embedding_status": "pending"})
+    db_session.commit()
+    embedding_cache.clear()
+    _failing(monkeypatch, lambda texts: EmbeddingError("503"))
+    down = backfill(session_factory, batch_size=4, max_retries=2, retry_base_seconds=0, log=lambda _: None)
+    assert down.scanned == 0 and down.last_id == 0
+
+
+def test_rejected_rows_are_isolated_and_recorded(client, db_session, session_factory, monkeypatch, tmp_path):
+    ids = _seed(db_session, 8)
+    ckpt = tmp_path / "ckpt.json"
+    _failing(monkeypatch, lambda texts: EmbeddingError("too long", transient=False) if "msg 5" in texts else None)
+
+    stats = backfill(session_factory, batch_size=8, checkpoint_path=str(ckpt), log=lambda _: None)
+    assert (stats.updated, stats.failed, stats.failed_ids) == (7, 1, [ids[5]])
+    assert json.loads(ckpt.read_text())["failed_ids"] == [ids[5]]
+
+    db_session.expire_all()
+    # Left as it was (a stale-model row here), so a re-run picks it up again
+    assert db_session.get(IncidentLog, ids[5]).embedding_model == "local-deterministic-v1"
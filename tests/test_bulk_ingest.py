@@ -0,0 +1,128 @@
+# tests/test_bulk_ingest.py
+
+import pytest
+from sqlalchemy import event, text
+
+import app.api.routes as routes_module
+import app.crud.crud as crud_module
+from app.llm.cache import embedding_cache
+from app.models.auth import AuditLog
+from app.models.incident import IncidentLog
+from conftest import recompute_audit_hash
+
+
+def _bulk(client, key, items):
+    return client.post("/api/incidents:bulk", headers={"X-API-Key": key}, json=items)
+
+
+def test_bulk_create_returns_per_item_results(client, db_session, bootstrap_keys):
+    items = [
+        {"service": "payments", "severity": "high", "message": "card 4111 1111 1111 1111 declined for bob@example.com"},
+        {"service": "payments", "severity": "low"},
+        {"service": "search", "severity": "medium", "message": "indexer lag", "tags": ["es"]},
+        {"service": "search", "severity": "medium", "message": ""},
+    ]
+    r = _bulk(client, bootstrap_keys["a_admin"], items)
+    assert r.status_code == 200, r.text
+    body = r.json()
+    assert (body["created"], body["failed"]) == (2, 2)
+    assert [x["index"] for x in body["results"]] == [0, 1, 2, 3]
+    assert [x["status"] for x in body["results"]] == ["created", "invalid", "created", "invalid"]
+    assert "message" in body["results"][1]["error"]
+
+    first = body["results"][0]["incident"]
+    assert first["tenant_id"] == "tenant_a"
+    assert first["message_redacted"] == "card [REDACTED_PAN] declined for [REDACTED_EMAIL]"
+    assert first["embedding_status"] == "ready"
+    assert body["results"][2]["incident"]["tags"] == ["es"]
+
+    row = db_session.get(IncidentLog, first["id"])
+    assert row.message_raw == items[0]["message"]
+    assert row.embedding is not None and row.embedding_content_hash
+
+
+def test_bulk_create_is_one_insert_one_embed_call_and_one_commit(client, db_session, bootstrap_keys, monkeypatch):
+    embed_calls = []
+    real_batch = crud_module.generate_vector_embeddings_batch
+    monkeypatch.setattr(crud_module, "generate_vector_embeddings_batch", lambda texts, model: embed_calls.append(len(texts)) or real_batch(texts, model))
+
+    engine = db_session.get_bind()
+    inserts, commits = [], []
+
+    def on_execute(conn, cursor, statement, parameters, context, executemany):
+        if statement.startswith("INSERT INTO incident_logs"):
+            inserts.append(statement)
+
+    def on_commit(conn):
+        commits.append(1)
+
+    event.listen(engine, "before_cursor_execute", on_execute)
+    event.listen(engine, "commit", on_commit)
+    try:
+        items = [{"service": "api", "severity": "low", "message": f"timeout calling upstream {i}"} for i in range(250)]
+        r = _bulk(client, bootstrap_keys["a_admin"], items)
+    finally:
+        event.remove(engine, "before_cursor_execute", on_execute)
+        event.remove(engine, "commit", on_commit)
+
+    assert r.status_code == 200 and r.json()["created"] == 250
+    assert len(inserts) == 1 and "RETURNING" in inserts[0]
+    assert embed_calls == [250]
+    assert len(commits) == 1
+    ids = [x["incident"]["id"] for x in r.json()["results"]]
+    assert ids == sorted(ids)
+
+
+def test_bulk_uses_one_select_and_one_insert_for_the_db_cache_tier(client, db_session, bootstrap_keys, monkeypatch):
+    monkeypatch.setattr(embedding_cache, "use_db", True)
+    key = bootstrap_keys["a_admin"]
+    items = [{"service": "api", "severity": "low", "message": f"disk pressure on node {i}"} for i in range(40)]
+    assert _bulk(client, key, items[:10]).status_code == 200
+    embedding_cache.clear()
+
+    engine = db_session.get_bind()
+    statements = []
+
+    def on_execute(conn, cursor, statement, parameters, context, executemany):
+        if "embedding_cache" in statement:
+            statements.append(statement.split()[0])
+
+    event.listen(engine, "before_cursor_execute", on_execute)
+    try:
+        r = _bulk(client, key, items)
+    finally:
+        event.remove(engine, "before_cursor_execute", on_execute)
+
+    assert r.status_code == 200 and r.json()["created"] == 40
+    assert statements == ["SELECT", "INSERT"]
+    assert db_session.execute(text("SELECT count(*) FROM embedding_cache")).scalar() == 40
+
+
+def test_bulk_audit_is_one_contiguous_chain_segment(client, db_session, bootstrap_keys):
+    key = bootstrap_keys["a_admin"]
+    single = client.post("/api/incidents", headers={"X-API-Key": key}, json={"service": "api", "severity": "low", "message": "before"})
+    assert single.status_code == 200
+    r = _bulk(client, key, [{"service": "api", "severity": "low", "message": f"m{i}"} for i in range(5)])
+    created_ids = [str(x["incident"]["id"]) for x in r.json()["results"]]
+
+    chain = db_session.query(AuditLog).filter(AuditLog.tenant_id == "tenant_a").order_by(AuditLog.id).all()
+    assert [row.resource_id for row in chain[-5:]] == created_ids
+    assert all(row.action == "INCIDENT_CREATE" and row.request_meta["bulk"] is True for row in chain[-5:])
+    for prev, row in zip(chain, chain[1:]):
+        assert row.prev_hash == prev.hash
+    assert all(recompute_audit_hash(row) == row.hash for row in chain)
+
+
+def test_bulk_create_leaves_rows_pending_on_async_pipeline(client, bootstrap_keys, monkeypatch):
+    monkeypatch.setattr(crud_module, "EMBED_PIPELINE", "async")
+    r = _bulk(client, bootstrap_keys["a_admin"], [{"service": "api", "severity": "low", "message": "queued"}])
+    assert r.json()["results"][0]["incident"]["embedding_status"] == "pending"
+
+
+@pytest.mark.parametrize("items, status", [([], 200), ([{"service": "api", "severity": "low", "message": "x"}] * 3, 413)])
+def test_bulk_request_size(client, bootstrap_keys, monkeypatch, items, status):
+    monkeypatch.setattr(routes_module, "BULK_MAX_ITEMS", 2)
+    r = _bulk(client, bootstrap_keys["a_admin"], items)
+    assert r.status_code == status
+    if status == 200:
+        assert r.json() == {"created": 0, "coalesced": 0, "replayed": 0, "failed": 0, "results": []}
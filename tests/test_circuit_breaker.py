@@ -0,0 +1,122 @@
+# tests/test_circuit_breaker.py
+
+import pytest
+
+import app.crud.crud as crud_module
+from app.core import metrics
+from app.llm.breaker import CircuitBreaker, CircuitOpenError, CLOSED, HALF_OPEN, OPEN
+from app.llm.embeddings import EmbeddingError
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def _breaker(clock, **kw):
+    kw.setdefault("failure_rate_threshold", 0.5)
+    kw.setdefault("min_calls", 4)
+    kw.setdefault("window_size", 4)
+    kw.setdefault("latency_budget", 1.0)
+    kw.setdefault("open_seconds", 10.0)
+    kw.setdefault("half_open_max_calls", 2)
+    return CircuitBreaker("test", clock=clock, **kw)
+
+
+def _fail():
+    raise RuntimeError("provider down")
+
+
+def test_breaker_opens_on_failure_rate_and_recovers_through_half_open():
+    clock = FakeClock()
+    b = _breaker(clock)
+
+    b.call(lambda: "ok")
+    b.call(lambda: "ok")
+    for _ in range(2):
+        with pytest.raises(RuntimeError):
+            b.call(_fail)
+    assert b.state == OPEN
+
+    with pytest.raises(CircuitOpenError) as e:
+        b.call(lambda: "ok")
+    assert e.value.retry_after == pytest.approx(10.0)
+
+    clock.now = 10.0
+    assert b.state == HALF_OPEN
+    b.call(lambda: "ok")
+    b.call(lambda: "ok")
+    assert b.state == CLOSED
+
+    assert metrics.get_value("embedding_breaker_transitions_total", breaker="test", from_state="closed", to_state="open") >= 1
+    assert metrics.get_value("embedding_breaker_state", breaker="test") == 0
+
+
+def test_failed_half_open_probe_reopens():
+    clock = FakeClock()
+    b = _breaker(clock, min_calls=1, window_size=1)
+    with pytest.raises(RuntimeError):
+        b.call(_fail)
+
+    clock.now = 10.0
+    with pytest.raises(RuntimeError):
+        b.call(_fail)
+    assert b.state == OPEN
+    assert b.retry_after() == pytest.approx(10.0)
+
+
+def test_slow_calls_count_against_latency_budget():
+    clock = FakeClock()
+    b = _breaker(clock, min_calls=2, window_size=2)
+
+    def slow():
+        clock.now += 5.0
+        return "late but fine"
+
+    assert b.call(slow) == "late but fine"
+    b.call(slow)
+    assert b.state == OPEN
+
+
+def test_rejected_inputs_do_not_open_the_circuit():
+    clock = FakeClock()
+    b = _breaker(clock)
+
+    def rejected():
+        raise EmbeddingError("input too long", transient=False)
+
+    for _ in range(10):
+        with pytest.raises(EmbeddingError):
+            b.call(rejected)
+    assert b.state == CLOSED
+    b.call(lambda: "ok")
+
+    # Transient errors still count
+    for _ in range(2):
+        with pytest.raises(RuntimeError):
+            b.call(_fail)
+    assert b.state == OPEN
+
+
+def test_open_circuit_leaves_writes_pending_and_fails_search_fast(client, monkeypatch, bootstrap_keys):
+    def circuit_open(text_in, model="text-embedding-3-small"):
+        raise CircuitOpenError(retry_after=7.2)
+
+    monkeypatch.setattr(crud_module, "generate_vector_embeddings", circuit_open)
+
+    r = client.post(
+        "/api/incidents",
+        headers={"X-API-Key": bootstrap_keys["a_admin"]},
+        json={"service": "payments", "severity": "sev2", "message": "Provider outage write"},
+    )
+    assert r.status_code == 200, r.text
+    assert r.json()["embedding_status"] == "pending"
+    assert r.json()["embedding_error"] is None
+
+    s = client.get("/api/search", headers={"X-API-Key": bootstrap_keys["a_admin"]}, params={"q": "outage"})
+    assert s.status_code == 503
+    assert s.headers["Retry-After"] == "8"
+    assert "circuit open" in s.json()["detail"]
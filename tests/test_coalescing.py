@@ -0,0 +1,158 @@
+# tests/test_coalescing.py
+
+import threading
+
+import pytest
+from sqlalchemy import text, update
+from sqlalchemy.orm import sessionmaker
+
+import app.api.routes as routes_module
+import app.crud.crud as crud_module
+import app.crud.crud_coalesce as coalesce_module
+from app.core.fingerprint import message_fingerprint, normalize_alert_text
+from app.crud.crud_coalesce import create_or_coalesce
+from app.models.auth import AuditLog
+from app.models.incident import IncidentLog
+from app.schemas.incident import IncidentLogCreate
+
+
+@pytest.fixture()
+def coalescing(monkeypatch):
+    monkeypatch.setattr(routes_module, "INGEST_COALESCE", True)
+
+
+def _alert(i, service="payments", title="Elevated 5xx"):
+    return {
+        "service": service,
+        "severity": "high",
+        "title": title,
+        "message": f"Spike in 500 responses. Trace id: {i:08x}{i:04d}. Pod=api-{i:04x}9 at 10.0.{i % 250}.12 took {i}ms",
+    }
+
+
+def _post(client, key, body):
+    r = client.post("/api/incidents", headers={"X-API-Key": key}, json=body)
+    assert r.status_code == 200, r.text
+    return r
+
+
+def test_normalization_drops_volatile_tokens():
+    a = "Timeout to 10.0.0.12:5432 at 2026-01-02T10:11:12Z, trace 3f9c2a7e, request 1b4e28ba-2fa1-11d2-883f-0016d3cca427"
+    b = "Timeout to 10.9.8.7:6432 at 2026-03-04T00:00:00Z, trace 77aa01ff, request 00000000-0000-0000-0000-000000000000"
+    assert normalize_alert_text(a) == normalize_alert_text(b) == "timeout to <ip> at <ts>, trace <hex>, request <uuid>"
+    assert message_fingerprint("DB timeout", a) == message_fingerprint("DB timeout", b)
+    assert message_fingerprint("DB timeout", a) != message_fingerprint("Cache timeout", a)
+
+
+def test_repeats_fold_into_one_incident(client, db_session, bootstrap_keys, coalescing, monkeypatch):
+    embed_calls = []
+    real = crud_module.generate_vector_embeddings
+    monkeypatch.setattr(crud_module, "generate_vector_embeddings", lambda t, model: embed_calls.append(t) or real(t, model))
+    key = bootstrap_keys["a_admin"]
+
+    first = _post(client, key, _alert(1)).json()
+    assert first["occurrence_count"] == 1 and first["last_seen_at"] is not None
+    repeats = [_post(client, key, _alert(i)) for i in range(2, 5)]
+
+    assert all(r.headers["Incident-Coalesced"] == "true" for r in repeats)
+    assert [r.json()["id"] for r in repeats] == [first["id"]] * 3
+    assert [r.json()["occurrence_count"] for r in repeats] == [2, 3, 4]
+    assert repeats[-1].json()["last_seen_at"] >= first["last_seen_at"]
+
+    assert db_session.query(IncidentLog).count() == 1
+    assert db_session.query(AuditLog).filter(AuditLog.action == "INCIDENT_CREATE").count() == 1
+    assert len(embed_calls) == 1
+
+
+def test_only_live_recent_incidents_in_the_same_service_are_targets(client, db_session, bootstrap_keys, coalescing):
+    a_key, b_key = bootstrap_keys["a_admin"], bootstrap_keys["b_admin"]
+    base = _post(client, a_key, _alert(1)).json()["id"]
+
+    other_service = _post(client, a_key, _alert(2, service="search")).json()["id"]
+    other_title = _post(client, a_key, _alert(3, title="Queue lag")).json()["id"]
+    other_tenant = _post(client, b_key, _alert(4)).json()["id"]
+    assert len({base, other_service, other_title, other_tenant}) == 4
+
+    db_session.execute(update(IncidentLog).where(IncidentLog.id == base).values(last_seen_at=text("now() - interval '1 day'")))
+    db_session.commit()
+    stale = _post(client, a_key, _alert(5)).json()["id"]
+    assert stale != base
+
+    assert client.delete(f"/api/incidents/{stale}", headers={"X-API-Key": a_key}).status_code == 200
+    assert _post(client, a_key, _alert(6)).json()["id"] not in (base, stale)
+
+
+def test_bulk_storm_becomes_one_row_per_template(client, db_session, bootstrap_keys, coalescing):
+    items = [_alert(i, title=("Elevated 5xx", "Queue lag")[i % 2]) for i in range(40)]
+    body = client.post("/api/incidents:bulk", headers={"X-API-Key": bootstrap_keys["a_admin"]}, json=items).json()
+
+    assert (body["created"], body["coalesced"]) == (2, 38)
+    assert [r["status"] for r in body["results"][:3]] == ["created", "created", "coalesced"]
+    rows = db_session.query(IncidentLog).order_by(IncidentLog.id).all()
+    assert [(r.title, r.occurrence_count) for r in rows] == [("Elevated 5xx", 20), ("Queue lag", 20)]
+
+    again = client.post("/api/incidents:bulk", headers={"X-API-Key": bootstrap_keys["a_admin"]}, json=items[:4]).json()
+    assert (again["created"], again["coalesced"]) == (0, 4)
+    db_session.expire_all()
+    assert [r.occurrence_count for r in db_session.query(IncidentLog).order_by(IncidentLog.id)] == [22, 22]
+
+
+def test_close_embedding_neighbour_folds_a_different_template(client, db_session, bootstrap_keys, coalescing, monkeypatch):
+    monkeypatch.setattr(coalesce_module, "COALESCE_MAX_DISTANCE", 0.05)
+    monkeypatch.setattr(crud_module, "generate_vector_embeddings", lambda t, model: ([1.0] * 1536, model))
+    key = bootstrap_keys["a_admin"]
+
+    first = _post(client, key, _alert(1)).json()
+    reworded = _post(client, key, {**_alert(2), "message": "HTTP 500 rate spiking on the api pods"})
+    assert reworded.headers.get("Incident-Coalesced") == "true"
+    assert reworded.json()["id"] == first["id"] and reworded.json()["occurrence_count"] == 2
+
+
+def test_off_by_default(client, db_session, bootstrap_keys):
+    key = bootstrap_keys["a_admin"]
+    ids = {_post(client, key, _alert(i)).json()["id"] for i in range(3)}
+    assert len(ids) == 3
+    assert db_session.query(IncidentLog.fingerprint).distinct().count() == 1
+
+
+def test_fingerprint_lookup_uses_the_coalesce_index(db_session):
+    db_session.execute(text(
+        "INSERT INTO incident_logs (tenant_id, service, severity, message_raw, message_redacted, fingerprint) "
+        "SELECT 't' || (g % 20), 's' || (g % 7), 'low', 'm', 'm', md5(g::text) FROM generate_series(1, 5000) g"
+    ))
+    db_session.commit()
+    db_session.execute(text("ANALYZE incident_logs"))
+
+    plan = "\n".join(
+        r[0] for r in db_session.execute(text(
+            "EXPLAIN SELECT id FROM incident_logs WHERE tenant_id = 't1' AND service = 's1' "
+            "AND fingerprint = md5('1') AND is_deleted = false AND last_seen_at >= now() - interval '15 minutes'"
+        ))
+    )
+    assert "ix_incident_logs_coalesce" in plan
+
+
+def test_concurrent_repeats_queue_on_the_fingerprint_lock(db_session):
+    Session = sessionmaker(bind=db_session.get_bind(), autocommit=False, autoflush=False)
+    incident = IncidentLogCreate(**_alert(1))
+    outcome = {}
+
+    with Session() as first:
+        [(row, coalesced)] = create_or_coalesce(first, "tenant_a", [incident])
+        assert coalesced is False
+
+        def second():
+            with Session() as db:
+                [(other, folded)] = create_or_coalesce(db, "tenant_a", [IncidentLogCreate(**_alert(2))])
+                db.commit()
+                outcome.update(id=other.id, folded=folded)
+
+        t = threading.Thread(target=second)
+        t.start()
+        t.join(timeout=0.5)
+        assert t.is_alive()
+        first.commit()
+        t.join(timeout=10)
+
+    assert outcome == {"id": row.id, "folded": True}
+    assert db_session.query(IncidentLog).one().occurrence_count == 2
@@ -0,0 +1,118 @@
+# tests/test_dataset_generator.py
+
+import sys
+from collections import Counter
+from datetime import datetime, timezone
+
+import numpy as np
+import pytest
+from sqlalchemy import text
+
+from app.core.config import ANN_INDEX_TYPE, DATABASE_URL
+from app.core.fingerprint import message_fingerprint, stack_fingerprint
+from app.crud.crud import rebuild_stack_rollups
+from app.llm.embeddings import _local_deterministic_matrix
+from app.scripts import generate_dataset
+from app.scripts.generate_dataset import Spec, generate_chunk, load
+from app.security.redaction import redact_text
+
+END = datetime(2026, 10, 1, tzinfo=timezone.utc)
+
+
+def _spec(**kw):
+    base = dict(rows=600, tenants=20, seed=11, end=END, days_back=30, chunk_rows=200, embeddings="local")
+    base.update(kw)
+    return Spec(**base)
+
+
+def _comparable(rows):
+    return [{k: (v.tobytes() if isinstance(v, np.ndarray) else v) for k, v in r.items()} for r in rows]
+
+
+def test_chunks_are_reproducible_from_seed_and_index():
+    spec = _spec()
+    assert _comparable(generate_chunk(spec, 1)) == _comparable(generate_chunk(spec, 1))
+    assert generate_chunk(spec, 1)[0]["message_raw"] != generate_chunk(spec, 0)[0]["message_raw"]
+    assert generate_chunk(_spec(seed=12), 1)[0]["message_raw"] != generate_chunk(spec, 1)[0]["message_raw"]
+    # Last chunk is short, past the end is empty
+    assert len(generate_chunk(_spec(rows=450), 2)) == 50
+    assert generate_chunk(spec, 3) == []
+
+
+def test_rows_are_redacted_fingerprinted_and_embedded_like_ingest():
+    rows = generate_chunk(_spec(rows=300, chunk_rows=300), 0)
+    expected = _local_deterministic_matrix([r["message_redacted"] for r in rows], 1536)
+
+    for row, vec in zip(rows, expected):
+        assert row["message_redacted"] == redact_text(row["message_raw"])
+        assert row["fingerprint"] == message_fingerprint(row["title"], row["message_redacted"])
+        assert row["stack_fingerprint"] == stack_fingerprint(row["stack_trace"])
+        assert np.allclose(row["embedding"].astype(np.float64), vec, atol=1e-6)
+        assert row["embedding_status"] == "ready" and row["created_at"] <= END
+
+    redacted = " ".join(r["message_redacted"] for r in rows)
+    assert "@example.com" not in redacted and "AKIA" not in redacted and "eyJ" not in redacted
+    assert any("[REDACTED_PAN]" in r["message_redacted"] for r in rows)
+    assert 0 < sum(r["stack_trace"] is not None for r in rows) < len(rows)
+
+
+def test_distributions_are_skewed():
+    rows = generate_chunk(_spec(rows=4000, chunk_rows=4000, embeddings="none"), 0)
+    tenants = Counter(r["tenant_id"] for r in rows)
+    severities = Counter(r["severity"] for r in rows)
+
+    assert tenants["tenant_0000"] > 3 * tenants["tenant_0010"]
+    assert severities["low"] > severities["medium"] > severities["high"] > severities["critical"]
+    # Service popularity is rotated per tenant, so top services differ between tenants
+    top = {t: Counter(r["service"] for r in rows if r["tenant_id"] == t).most_common(1)[0][0] for t in ("tenant_0000", "tenant_0001")}
+    assert top["tenant_0000"] != top["tenant_0001"]
+    # Recency bias: more rows in the newest half of the window than the oldest
+    ages = np.array([(END - r["created_at"]).total_seconds() for r in rows]) / 86400
+    assert (ages < 15).sum() > 2 * (ages >= 15).sum()
+    assert all(r["embedding"] is None and r["embedding_status"] == "pending" for r in rows)
+
+
+def test_parallel_copy_loads_every_row(db_session):
+    spec = _spec()
+    totals = load(spec, workers=2, database_url=DATABASE_URL)
+    assert totals["rows"] == 600 and totals["rows_per_s"] > 0
+
+    expected = {}
+    for chunk in range(3):
+        for row in generate_chunk(spec, chunk):
+            expected[(row["tenant_id"], row["message_raw"])] = row
+
+    loaded = db_session.execute(text(
+        "SELECT tenant_id, message_raw, message_redacted, created_at, tags, fingerprint, stack_fingerprint, "
+        "embedding::text AS embedding, embedding_version, search_tsv IS NOT NULL AS has_tsv FROM incident_logs"
+    )).mappings().all()
+    assert len(loaded) == 600
+
+    for row in loaded:
+        want = expected[(row["tenant_id"], row["message_raw"])]
+        assert row["message_redacted"] == want["message_redacted"]
+        assert row["created_at"] == want["created_at"]
+        assert row["tags"] == want["tags"]
+        assert row["fingerprint"] == want["fingerprint"]
+        assert row["stack_fingerprint"] == want["stack_fingerprint"]
+        assert row["embedding_version"] == 1 and row["has_tsv"]
+        vec = np.array(row["embedding"].strip("[]").split(","), dtype=np.float32)
+        assert np.allclose(vec, want["embedding"].astype(np.float32))
+
+    rebuild_stack_rollups(db_session)
+    db_session.commit()
+    rolled = db_session.execute(text("SELECT coalesce(sum(incident_count), 0) FROM stack_fingerprint_rollups")).scalar()
+    assert rolled == sum(1 for r in expected.values() if r["stack_fingerprint"])
+
+
+def test_failed_load_still_rebuilds_the_ann_index(db_session, monkeypatch):
+    def broken_load(*args, **kwargs):
+        raise RuntimeError("COPY failed")
+
+    monkeypatch.setattr(generate_dataset, "load", broken_load)
+    monkeypatch.setattr(sys, "argv", ["generate_dataset", "--rows", "10", "--tenants", "1", "--workers", "1"])
+    with pytest.raises(RuntimeError, match="COPY failed"):
+        generate_dataset.main()
+
+    indexes = db_session.execute(text("SELECT indexname FROM pg_indexes WHERE tablename = 'incident_logs'")).scalars().all()
+    assert f"ix_incident_logs_embedding_{ANN_INDEX_TYPE}" in indexes
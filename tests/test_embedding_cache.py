@@ -0,0 +1,98 @@
+# tests/test_embedding_cache.py
+
+from sqlalchemy import text
+
+from app.core import metrics
+from app.core.cache import LRUCache
+from app.llm.cache import embedding_cache, purge_expired_entries
+from app.models.incident import IncidentLog
+from conftest import create_incident
+
+
+def _count_embed_calls(monkeypatch):
+    import app.crud.crud as crud_module
+
+    calls = []
+    inner = crud_module.generate_vector_embeddings
+
+    def counting(text_in, model="text-embedding-3-small"):
+        calls.append(text_in)
+        return inner(text_in, model=model)
+
+    monkeypatch.setattr(crud_module, "generate_vector_embeddings", counting)
+    return calls
+
+
+def test_lru_cache_evicts_least_recently_used():
+    c = LRUCache(2)
+    c.set("a", 1)
+    c.set("b", 2)
+    assert c.get("a") == 1  # a is now most recent
+    c.set("c", 3)
+
+    assert c.get("b") is None
+    assert c.get("a") == 1 and c.get("c") == 3
+    assert (c.hits, c.misses, c.evictions) == (3, 1, 1)
+
+
+def test_duplicate_messages_embed_once(client, monkeypatch, bootstrap_keys):
+    calls = _count_embed_calls(monkeypatch)
+
+    first = create_incident(client, bootstrap_keys["a_admin"], "Kafka lag on payments.events for bob@example.com")
+    second = create_incident(client, bootstrap_keys["a_admin"], "Kafka lag on payments.events for bob@example.com")
+
+    assert len(calls) == 1
+    assert first["embedding_status"] == second["embedding_status"] == "ready"
+    assert embedding_cache.stats()["hits"] >= 1
+
+
+def test_update_with_unchanged_message_skips_reembed(client, db_session, monkeypatch, bootstrap_keys):
+    created = create_incident(client, bootstrap_keys["a_admin"], "Redis hit rate dropped")
+    calls = _count_embed_calls(monkeypatch)
+
+    u = client.patch(
+        f"/api/incidents/{created['id']}",
+        headers={"X-API-Key": bootstrap_keys["a_responder"]},
+        json={"message": "Redis hit rate dropped", "severity": "sev1"},
+    )
+    assert u.status_code == 200, u.text
+    assert u.json()["embedding_version"] == 1
+    assert u.json()["severity"] == "sev1"
+    assert calls == []
+
+    row = db_session.query(IncidentLog).filter(IncidentLog.id == created["id"]).first()
+    assert row.embedding_content_hash is not None
+
+
+def test_db_tier_survives_memory_eviction(client, db_session, monkeypatch, bootstrap_keys):
+    monkeypatch.setattr(embedding_cache, "use_db", True)
+    calls = _count_embed_calls(monkeypatch)
+
+    create_incident(client, bootstrap_keys["a_admin"], "Node CPU > 95% on k8s-node")
+    stored = db_session.execute(text("SELECT count(*) FROM embedding_cache")).scalar()
+    assert stored == 1
+
+    embedding_cache.clear()
+    before = metrics.get_value("embedding_cache_hits_total", tier="db")
+    create_incident(client, bootstrap_keys["a_admin"], "Node CPU > 95% on k8s-node")
+
+    assert len(calls) == 1
+    assert metrics.get_value("embedding_cache_hits_total", tier="db") == before + 1
+
+    m = client.get("/metrics")
+    assert 'embedding_cache_hits_total{tier="db"}' in m.text
+
+
+def test_purge_removes_only_old_db_entries(client, db_session, monkeypatch, bootstrap_keys):
+    monkeypatch.setattr(embedding_cache, "use_db", True)
+    create_incident(client, bootstrap_keys["a_admin"], "Disk full on db-1")
+    create_incident(client, bootstrap_keys["a_admin"], "Disk full on db-2")
+
+    assert purge_expired_entries(db_session, max_age_days=30) == 0
+    db_session.execute(
+        text("UPDATE embedding_cache SET created_at = now() - interval '31 days' WHERE content_hash = "
+             "(SELECT min(content_hash) FROM embedding_cache)")
+    )
+    db_session.commit()
+    assert purge_expired_entries(db_session, max_age_days=30, batch_size=1) == 1
+    assert db_session.execute(text("SELECT count(*) FROM embedding_cache")).scalar() == 1
@@ -0,0 +1,109 @@
+# tests/test_embedding_provider.py
+
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from app.llm.embeddings import EmbeddingError
+from app.llm.provider import EmbeddingProvider
+from embedding_stub import EmbeddingStubServer, stub_vector
+
+
+def _provider(stub, **kw):
+    kw.setdefault("batch_window_ms", 20)
+    kw.setdefault("max_in_flight", 4)
+    kw.setdefault("timeout", 5)
+    return EmbeddingProvider(api_key="test", base_url=stub.base_url, **kw)
+
+
+def test_concurrent_single_embeds_are_coalesced_over_pooled_connections():
+    with EmbeddingStubServer(delay=0.01) as stub:
+        provider = _provider(stub)
+        try:
+            texts = [f"incident {i}" for i in range(64)]
+            with ThreadPoolExecutor(max_workers=64) as pool:
+                vecs = list(pool.map(lambda t: provider.embed(t, "text-embedding-3-small"), texts))
+        finally:
+            provider.close()
+
+    assert vecs[7] == pytest.approx(stub_vector("incident 7").tolist())
+    assert sum(stub.batch_sizes) == 64
+    assert len(stub.batch_sizes) < 64 / 4  # real multi-input batches
+    assert len(stub.client_ports) <= 4  # keep-alive pool, not a connection per call
+
+
+def test_max_in_flight_is_enforced():
+    with EmbeddingStubServer(delay=0.05) as stub:
+        provider = _provider(stub, max_in_flight=2, batch_window_ms=0)
+        try:
+            with ThreadPoolExecutor(max_workers=8) as pool:
+                list(pool.map(lambda i: provider.embed_many([f"t{i}"], "m"), range(8)))
+        finally:
+            provider.close()
+
+    assert stub.max_in_flight <= 2
+
+
+def test_deadline_raises_embedding_error():
+    with EmbeddingStubServer(delay=1.0) as stub:
+        provider = _provider(stub)
+        try:
+            t0 = time.monotonic()
+            with pytest.raises(EmbeddingError):
+                provider.embed("slow", "m", deadline=0.1)
+            assert time.monotonic() - t0 < 0.5
+        finally:
+            provider.close()
+
+
+def test_provider_errors_surface_as_embedding_error():
+    with EmbeddingStubServer(fail=True) as stub:
+        provider = _provider(stub)
+        try:
+            with pytest.raises(EmbeddingError):
+                provider.embed_many(["x"], "m")
+        finally:
+            provider.close()
+
+
+def test_rejected_input_is_not_transient():
+    with EmbeddingStubServer(reject={"bad"}) as stub:
+        provider = _provider(stub)
+        try:
+            with pytest.raises(EmbeddingError) as e:
+                provider.embed_many(["bad"], "m")
+            assert e.value.transient is False
+        finally:
+            provider.close()
+    with EmbeddingStubServer(fail=True) as stub:
+        provider = _provider(stub)
+        try:
+            with pytest.raises(EmbeddingError) as e:
+                provider.embed_many(["x"], "m")
+            assert e.value.transient is True
+        finally:
+            provider.close()
+
+
+def test_rejected_input_fails_only_its_own_caller():
+    with EmbeddingStubServer(delay=0.01, reject={"bad"}) as stub:
+        provider = _provider(stub, batch_window_ms=100)
+
+        def embed(text):
+            try:
+                return provider.embed(text, "m")
+            except EmbeddingError as e:
+                return e
+
+        try:
+            texts = ["a", "b", "bad", "c"]
+            with ThreadPoolExecutor(max_workers=4) as pool:
+                results = dict(zip(texts, pool.map(embed, texts)))
+        finally:
+            provider.close()
+
+    assert stub.batch_sizes[0] == 4  # coalesced into one call first
+    assert isinstance(results["bad"], EmbeddingError) and results["bad"].transient is False
+    for text in ("a", "b", "c"):
+        assert results[text] == pytest.approx(stub_vector(text).tolist())
@@ -0,0 +1,130 @@
+# tests/test_embedding_worker.py
+
+from datetime import datetime, timezone
+
+import pytest
+from sqlalchemy.orm import sessionmaker
+
+import app.crud.crud as crud_module
+from app.llm.breaker import CLOSED, CircuitBreaker
+from app.llm.embeddings import EmbeddingError
+from app.models.incident import IncidentLog
+from app.workers import embedding_worker
+from app.workers.embedding_worker import claim_batch, run_once
+from conftest import create_incident
+
+
+@pytest.fixture()
+def async_pipeline(monkeypatch):
+    monkeypatch.setattr(crud_module, "EMBED_PIPELINE", "async")
+
+
+@pytest.fixture()
+def session_factory(engine):
+    return sessionmaker(bind=engine, autocommit=False, autoflush=False)
+
+
+def test_async_create_returns_pending_and_worker_embeds(client, db_session, session_factory, async_pipeline, bootstrap_keys):
+    created = create_incident(client, bootstrap_keys["a_admin"], "DB timeout spike on payments")
+    assert created["embedding_status"] == "pending"
+
+    assert run_once(session_factory, batch_size=10) == 1
+    assert run_once(session_factory, batch_size=10) == 0
+
+    db_session.expire_all()
+    row = db_session.query(IncidentLog).filter(IncidentLog.id == created["id"]).first()
+    assert row.embedding_status == "ready"
+    assert row.embedding_version == 1
+    assert row.embedding is not None
+
+
+def test_concurrent_claims_skip_locked_rows(client, session_factory, async_pipeline, bootstrap_keys):
+    for i in range(5):
+        create_incident(client, bootstrap_keys["a_admin"], f"Queue lag {i}")
+
+    first, second = session_factory(), session_factory()
+    try:
+        a = [r.id for r in claim_batch(first, batch_size=3)]
+        b = [r.id for r in claim_batch(second, batch_size=10)]
+        assert len(a) == 3 and len(b) == 2
+        assert not set(a) & set(b)
+    finally:
+        first.rollback()
+        second.rollback()
+        first.close()
+        second.close()
+
+
+def test_failed_rows_back_off_then_give_up(client, db_session, session_factory, async_pipeline, monkeypatch, bootstrap_keys):
+    created = create_incident(client, bootstrap_keys["a_admin"], "Elevated 5xx on gateway")
+
+    def broken(texts, model="text-embedding-3-small"):
+        raise EmbeddingError("provider down")
+
+    monkeypatch.setattr(crud_module, "generate_vector_embeddings_batch", broken)
+    monkeypatch.setattr(embedding_worker, "EMBED_MAX_ATTEMPTS", 2)
+
+    assert run_once(session_factory) == 1
+    db_session.expire_all()
+    row = db_session.query(IncidentLog).filter(IncidentLog.id == created["id"]).first()
+    assert row.embedding_status == "failed"
+    assert row.embedding_attempts == 1
+    assert row.embedding_next_attempt_at > datetime.now(timezone.utc)
+    assert run_once(session_factory) == 0  # not due yet
+
+    # Make it due again; the second failure exhausts the budget
+    row.embedding_next_attempt_at = None
+    db_session.commit()
+    assert run_once(session_factory) == 1
+    db_session.expire_all()
+    assert row.embedding_attempts == 2
+    assert row.embedding_next_attempt_at is None
+
+    row.embedding_next_attempt_at = None
+    db_session.commit()
+    assert run_once(session_factory) == 0
+
+
+def test_poison_row_fails_alone_and_leaves_the_breaker_closed(client, db_session, session_factory, async_pipeline, monkeypatch, bootstrap_keys):
+    ids = [create_incident(client, bootstrap_keys["a_admin"], f"Cache miss storm {i}")["id"] for i in range(5)]
+    calls = []
+    real = crud_module.generate_vector_embeddings_batch
+
+    def provider(texts, model):
+        calls.append(len(texts))
+        if "Cache miss storm 3" in texts:
+            raise EmbeddingError("input rejected", transient=False)
+        return real(texts, model)[0]
+
+    # A breaker that opens on 2 failures in 4 calls, as the bisection makes 4 failing calls
+    breaker = CircuitBreaker("test", failure_rate_threshold=0.5, min_calls=4, window_size=4)
+    monkeypatch.setattr(
+        crud_module, "generate_vector_embeddings_batch",
+        lambda texts, model="text-embedding-3-small": (breaker.call(lambda: provider(texts, model)), model),
+    )
+    assert run_once(session_factory, batch_size=10) == 5
+    assert breaker.state == CLOSED
+
+    db_session.expire_all()
+    rows = {r.id: r for r in db_session.query(IncidentLog).filter(IncidentLog.id.in_(ids))}
+    assert [rows[i].embedding_status for i in ids] == ["ready"] * 3 + ["failed", "ready"]
+    assert [rows[i].embedding_attempts for i in ids] == [0, 0, 0, embedding_worker.EMBED_MAX_ATTEMPTS, 0]
+    # The whole batch, then halves until the poison row is alone
+    assert calls == [5, 2, 3, 1, 2, 1, 1]
+    # Failed for good: the next cycle does not call the provider for it again
+    assert run_once(session_factory, batch_size=10) == 0 and len(calls) == 7
+
+
+def test_transient_batch_error_is_not_bisected(client, db_session, session_factory, async_pipeline, monkeypatch, bootstrap_keys):
+    for i in range(4):
+        create_incident(client, bootstrap_keys["a_admin"], f"Gateway flap {i}")
+    calls = []
+
+    def down(texts, model="text-embedding-3-small"):
+        calls.append(len(texts))
+        raise EmbeddingError("503 from provider")
+
+    monkeypatch.setattr(crud_module, "generate_vector_embeddings_batch", down)
+    assert run_once(session_factory, batch_size=10) == 4
+    assert calls == [4]
+    assert {r.embedding_attempts for r in db_session.query(IncidentLog)} == {1}
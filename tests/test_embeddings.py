@@ -0,0 +1,46 @@
+# tests/test_embeddings.py
+
+import pytest
+
+from app.llm.embeddings import (
+    generate_vector_embeddings,
+    generate_vector_embeddings_batch,
+    EmbeddingError,
+    LOCAL_MODEL_NAME,
+)
+
+
+@pytest.fixture(autouse=True)
+def _local_mode(monkeypatch):
+    monkeypatch.setenv("EMBEDDINGS_MODE", "local")
+
+
+def test_local_embedding_is_pinned_unit_vector():
+    vec, model = generate_vector_embeddings("hello")
+
+    assert model == LOCAL_MODEL_NAME
+    assert len(vec) == 1536
+    assert sum(x * x for x in vec) == pytest.approx(1.0)
+    # Golden values: changing these breaks every stored local embedding
+    assert vec[:3] == pytest.approx([-0.03199463161170798, -0.032634051276079615, 0.023612562845900204], abs=1e-12)
+
+
+def test_batch_rows_match_single_calls_regardless_of_position():
+    texts = [f"incident {i} payments timeout" for i in range(700)]  # spans more than one block
+    vecs, model = generate_vector_embeddings_batch(texts)
+
+    assert model == LOCAL_MODEL_NAME
+    assert len(vecs) == len(texts)
+    for i in (0, 1, 511, 512, 699):
+        single, _ = generate_vector_embeddings(texts[i])
+        assert vecs[i] == single
+
+    again, _ = generate_vector_embeddings_batch(list(reversed(texts)))
+    assert again[0] == vecs[-1]
+
+
+def test_batch_rejects_empty_text():
+    with pytest.raises(EmbeddingError):
+        generate_vector_embeddings_batch(["ok", "   "])
+
+    assert generate_vector_embeddings_batch([]) == ([], LOCAL_MODEL_NAME)
@@ -0,0 +1,115 @@
+# tests/test_hybrid_search.py
+
+from sqlalchemy import event, text
+
+import app.crud.crud as crud_module
+from app.models.incident import IncidentLog
+
+
+def _create(client, key, **fields):
+    body = {"service": "payments", "severity": "sev2"}
+    body.update(fields)
+    r = client.post("/api/incidents", headers={"X-API-Key": key}, json=body)
+    assert r.status_code == 200, r.text
+    return r.json()
+
+
+def _search(client, key, q, **params):
+    r = client.get("/api/search", headers={"X-API-Key": key}, params={"q": q, **params})
+    assert r.status_code == 200, r.text
+    return [row["id"] for row in r.json()]
+
+
+def test_search_tsv_covers_title_service_tags_message_and_stack_trace(client, db_session, bootstrap_keys):
+    created = _create(
+        client,
+        bootstrap_keys["a_admin"],
+        title="Checkout outage",
+        service="billing",
+        tags=["kafka", "consumer-lag"],
+        message="Orders stuck in queue",
+        stack_trace="Traceback: RebalanceInProgressException",
+    )
+    row = db_session.query(IncidentLog).filter(IncidentLog.id == created["id"]).first()
+    doc = db_session.execute(text("SELECT search_tsv::text FROM incident_logs WHERE id = :id"), {"id": row.id}).scalar()
+    for lexeme in ("'checkout'", "'bill'", "'kafka'", "'queue'", "'rebalanceinprogressexcept'"):
+        assert lexeme in doc
+
+
+def test_hybrid_finds_rows_without_literal_substring_match(client, bootstrap_keys):
+    key = bootstrap_keys["a_admin"]
+    stemmed = _create(client, key, message="Connection timeouts against the primary databases")
+    _create(client, key, message="Disk usage alert on log volume")
+
+    # "database timeout" is not a substring of the message, so ILIKE misses it; stemming does not
+    assert _search(client, key, "database timeout", mode="ilike") == []
+    assert _search(client, key, "database timeout")[0] == stemmed["id"]
+
+
+def test_hybrid_fuses_lexical_and_vector_ranks(client, bootstrap_keys):
+    key = bootstrap_keys["a_admin"]
+    lexical_hit = _create(client, key, message="kafka consumer lag on orders topic")
+    # Same text as the query, so it is also the nearest vector (the test embedding is a hash of the text)
+    both = _create(client, key, message="kafka")
+    vector_only = _create(client, key, message="certificate expiry")
+
+    ids = _search(client, key, "kafka", top_k=3)
+    assert ids[0] == both["id"]
+    assert set(ids) == {both["id"], lexical_hit["id"], vector_only["id"]}
+    assert _search(client, key, "kafka", top_k=3, mode="ilike") == [both["id"], lexical_hit["id"]]
+
+
+def test_vectors_from_another_model_are_not_ranked(client, db_session, bootstrap_keys):
+    key = bootstrap_keys["a_admin"]
+    current = _create(client, key, message="certificate expiry")
+    stale = _create(client, key, message="disk usage alert")
+    lexical_stale = _create(client, key, message="kafka broker down")
+    db_session.query(IncidentLog).filter(IncidentLog.id.in_([stale["id"], lexical_stale["id"]])).update(
+        {IncidentLog.embedding_model: "local-deterministic-v1"}, synchronize_session=False
+    )
+    db_session.commit()
+
+    # Stale vectors live in another space; they come back only through the lexical branch until backfilled
+    assert set(_search(client, key, "kafka", top_k=5)) == {current["id"], lexical_stale["id"]}
+    assert _search(client, key, "kafka", top_k=5, mode="ilike") == []
+
+
+def test_hybrid_search_is_tenant_scoped_and_skips_deleted(client, bootstrap_keys):
+    a_row = _create(client, bootstrap_keys["a_admin"], message="Redis eviction storm")
+    gone = _create(client, bootstrap_keys["a_admin"], message="Redis eviction storm again")
+    assert client.delete(f"/api/incidents/{gone['id']}", headers={"X-API-Key": bootstrap_keys["a_admin"]}).status_code == 200
+    _create(client, bootstrap_keys["b_admin"], message="Redis eviction storm")
+
+    assert _search(client, bootstrap_keys["a_admin"], "redis eviction", top_k=10) == [a_row["id"]]
+
+
+def test_lexical_branch_uses_gin_index(db_session, monkeypatch):
+    monkeypatch.setenv("EMBEDDINGS_MODE", "local")
+    for i in range(2000):
+        word = "kafka" if i % 500 == 0 else "redis"
+        message = f"{word} partition {i} offline"
+        db_session.add(IncidentLog(tenant_id=f"tenant_{'ab'[i % 2]}", message_raw=message, message_redacted=message))
+    db_session.commit()
+    # VACUUM refreshes the GIN metapage counts the planner costs the index with
+    with db_session.get_bind().connect().execution_options(isolation_level="AUTOCOMMIT") as conn:
+        conn.execute(text("VACUUM ANALYZE incident_logs"))
+
+    statements = []
+    engine = db_session.get_bind()
+
+    def listener(conn, cursor, statement, parameters, context, executemany):
+        if "@@" in statement:
+            statements.append((statement, parameters))
+
+    event.listen(engine, "before_cursor_execute", listener)
+    try:
+        crud_module.search_incidents(db_session, tenant_id="tenant_a", query="kafka", top_k=5)
+    finally:
+        event.remove(engine, "before_cursor_execute", listener)
+
+    statement, params = statements[-1]
+    cursor = db_session.connection().connection.cursor()
+    cursor.execute("EXPLAIN " + statement, params)
+    plan = "\n".join(row[0] for row in cursor.fetchall())
+    db_session.rollback()
+    assert "Bitmap Index Scan on ix_incident_logs_search_tsv" in plan
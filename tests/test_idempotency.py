@@ -0,0 +1,176 @@
+# tests/test_idempotency.py
+
+import threading
+
+import pytest
+from sqlalchemy import insert, update
+from sqlalchemy.orm import sessionmaker
+
+import app.crud.crud as crud_module
+from app.crud.crud_idempotency import IdempotencyConflict, _claim, create_incidents_once, purge_expired_keys
+from app.models.auth import AuditLog
+from app.models.idempotency import IdempotencyKey
+from app.models.incident import IncidentLog
+from app.schemas.incident import IncidentLogCreate
+from app.security.hashing import sha256_hex
+
+
+def _post(client, key, body, idem=None, path="/api/incidents"):
+    headers = {"X-API-Key": key}
+    if idem:
+        headers["Idempotency-Key"] = idem
+    return client.post(path, headers=headers, json=body)
+
+
+def _body(**fields):
+    body = {"service": "payments", "severity": "high", "message": "p99 over SLO"}
+    body.update(fields)
+    return body
+
+
+@pytest.fixture()
+def embed_calls(monkeypatch):
+    calls = []
+    real = crud_module.generate_vector_embeddings
+    monkeypatch.setattr(crud_module, "generate_vector_embeddings", lambda text, model: calls.append(text) or real(text, model))
+    return calls
+
+
+def test_header_replay_returns_original_without_redoing_work(client, db_session, bootstrap_keys, embed_calls):
+    key = bootstrap_keys["a_admin"]
+    first = _post(client, key, _body(), idem="retry-1")
+    assert first.status_code == 200 and "Idempotency-Replayed" not in first.headers
+    audits = db_session.query(AuditLog).count()
+
+    replay = _post(client, key, _body(message="a retry may differ"), idem="retry-1")
+    assert replay.status_code == 200
+    assert replay.headers["Idempotency-Replayed"] == "true"
+    assert replay.json() == first.json()
+
+    assert db_session.query(IncidentLog).count() == 1
+    assert db_session.query(AuditLog).count() == audits
+    assert embed_calls == ["p99 over SLO"]
+
+
+def test_natural_key_is_source_plus_external_id_per_tenant(client, db_session, bootstrap_keys):
+    a, b = bootstrap_keys["a_admin"], bootstrap_keys["b_admin"]
+    ids = [
+        _post(client, a, _body(source="alertmanager", external_id="fp-1")).json()["id"],
+        _post(client, a, _body(source="alertmanager", external_id="fp-1")).json()["id"],
+        _post(client, a, _body(source="pagerduty", external_id="fp-1")).json()["id"],
+        _post(client, b, _body(source="alertmanager", external_id="fp-1")).json()["id"],
+        _post(client, a, _body()).json()["id"],
+        _post(client, a, _body()).json()["id"],
+    ]
+    assert ids[0] == ids[1]
+    assert len(set(ids)) == 5
+    assert db_session.query(IdempotencyKey).count() == 3
+
+
+def test_expired_key_creates_a_new_incident(client, db_session, bootstrap_keys):
+    key = bootstrap_keys["a_admin"]
+    first = _post(client, key, _body(), idem="retry-2").json()
+    db_session.execute(update(IdempotencyKey).values(expires_at=IdempotencyKey.created_at))
+    db_session.commit()
+
+    second = _post(client, key, _body(), idem="retry-2")
+    assert "Idempotency-Replayed" not in second.headers
+    assert second.json()["id"] != first["id"]
+    db_session.expire_all()
+    assert [k.incident_id for k in db_session.query(IdempotencyKey)] == [second.json()["id"]]
+
+    assert purge_expired_keys(db_session) == 0
+    db_session.execute(update(IdempotencyKey).values(expires_at=IdempotencyKey.created_at))
+    db_session.commit()
+    assert purge_expired_keys(db_session) == 1
+
+
+def test_bulk_replays_by_header_and_index(client, db_session, bootstrap_keys):
+    key = bootstrap_keys["a_admin"]
+    items = [_body(message=f"alert {i}") for i in range(3)] + [{"service": "payments"}]
+    first = _post(client, key, items, idem="batch-7", path="/api/incidents:bulk").json()
+    assert (first["created"], first["replayed"], first["failed"]) == (3, 0, 1)
+
+    replay = _post(client, key, items, idem="batch-7", path="/api/incidents:bulk").json()
+    assert (replay["created"], replay["replayed"], replay["failed"]) == (0, 3, 1)
+    assert [r["status"] for r in replay["results"]] == ["replayed"] * 3 + ["invalid"]
+    assert [r["incident"]["id"] for r in replay["results"][:3]] == [r["incident"]["id"] for r in first["results"][:3]]
+    assert db_session.query(IncidentLog).count() == 3
+
+
+def test_bulk_duplicates_within_a_request_share_one_row(client, db_session, bootstrap_keys):
+    items = [_body(source="alertmanager", external_id="storm")] * 4 + [_body(message="unkeyed")]
+    body = _post(client, bootstrap_keys["a_admin"], items, path="/api/incidents:bulk").json()
+
+    assert (body["created"], body["replayed"]) == (2, 3)
+    assert [r["status"] for r in body["results"]] == ["created", "replayed", "replayed", "replayed", "created"]
+    assert len({r["incident"]["id"] for r in body["results"][:4]}) == 1
+    assert db_session.query(AuditLog).filter(AuditLog.action == "INCIDENT_CREATE").count() == 2
+
+
+def test_rerun_import_replays_committed_lines(client, bootstrap_keys):
+    body = "".join(f'{{"service": "api", "severity": "low", "message": "m{i}", "external_id": "row-{i}"}}\n' for i in range(4))
+    headers = {"X-API-Key": bootstrap_keys["a_admin"], "Content-Type": "application/x-ndjson"}
+    first = client.post("/api/incidents:import", headers=headers, params={"results": "summary"}, content=body)
+    again = client.post("/api/incidents:import", headers=headers, params={"results": "summary"}, content=body)
+    assert first.json()["summary"]["created"] == 4
+    assert (again.json()["summary"]["created"], again.json()["summary"]["replayed"]) == (0, 4)
+
+
+def test_concurrent_claim_of_the_same_key_conflicts(db_session):
+    Session = sessionmaker(bind=db_session.get_bind(), autocommit=False, autoflush=False)
+    incident = IncidentLogCreate(service="api", severity="low", message="raced", source="am", external_id="race-1")
+    key = "external:am:race-1"
+    outcome = {}
+
+    with Session() as first:
+        create_incidents_once(first, "tenant_a", [incident], [key])  # holds the key, uncommitted
+
+        def second():
+            with Session() as db:
+                try:
+                    create_incidents_once(db, "tenant_a", [incident], [key])
+                    outcome["second"] = "created"
+                except IdempotencyConflict:
+                    outcome["second"] = "conflict"
+                    db.rollback()
+
+        t = threading.Thread(target=second)
+        t.start()
+        t.join(timeout=0.5)
+        assert t.is_alive()  # blocked on the unique index
+        first.commit()
+        t.join(timeout=10)
+
+    assert outcome == {"second": "conflict"}
+    assert db_session.query(IncidentLog).count() == 1
+
+
+def test_claims_in_opposite_orders_conflict_instead_of_deadlocking(db_session):
+    Session = sessionmaker(bind=db_session.get_bind(), autocommit=False, autoflush=False)
+    incident_id = db_session.execute(insert(IncidentLog).values(tenant_id="tenant_a", message_raw="m", message_redacted="m").returning(IncidentLog.id)).scalar()
+    db_session.commit()
+    errors = []
+
+    for round_ in range(10):
+        keys = [sha256_hex(f"external:am:{round_}:{i}") for i in range(200)]
+        start = threading.Barrier(2)
+
+        def claim(ordered):
+            with Session() as db:
+                try:
+                    start.wait()
+                    _claim(db, "tenant_a", dict.fromkeys(ordered, incident_id))
+                    db.commit()
+                except IdempotencyConflict:
+                    db.rollback()
+                except Exception as e:  # pragma: no cover - reported below
+                    errors.append(e)
+
+        threads = [threading.Thread(target=claim, args=(k,)) for k in (keys, keys[::-1])]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+
+    assert errors == []
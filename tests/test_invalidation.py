@@ -0,0 +1,168 @@
+# tests/test_invalidation.py
+
+import multiprocessing as mp
+import os
+import queue
+import threading
+import time
+
+import pytest
+from sqlalchemy import text
+
+import app.core.invalidation as invalidation
+from app.core import metrics
+from app.core.config import DATABASE_URL
+from app.crud.crud_auth import create_api_key, invalidate_api_key
+from app.models.auth import ApiKey
+from app.security.hashing import sha256_hex
+
+PROCESSES = 3
+# Commit to every process having dropped its cached key, including a DB round trip in each
+PROPAGATION_BOUND_SECONDS = 1.0
+
+
+@pytest.fixture()
+def recorder(monkeypatch):
+    seen = []
+    monkeypatch.setitem(invalidation._handlers, "test_topic", [seen.append])
+    return seen
+
+
+@pytest.fixture()
+def listener():
+    lst = invalidation.PostgresListener(DATABASE_URL).start()
+    assert lst.connected.wait(10)
+    try:
+        yield lst
+    finally:
+        lst.stop()
+
+
+def _wait_for(predicate, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if predicate():
+            return True
+        time.sleep(0.01)
+    return False
+
+
+def test_published_only_when_the_transaction_commits(db_session, recorder):
+    invalidation.publish(db_session, "test_topic", "a")
+    invalidation.publish(db_session, "test_topic", "a")
+    assert recorder == []
+    db_session.rollback()
+    assert recorder == []
+
+    invalidation.publish(db_session, "test_topic", "b")
+    invalidation.publish(db_session, "test_topic", "b")
+    invalidation.publish(db_session, "test_topic", "c")
+    db_session.commit()
+    assert recorder == ["b", "c"]
+
+    db_session.commit()
+    assert recorder == ["b", "c"]
+
+
+def test_listener_receives_notifications_from_other_connections(engine, recorder, listener):
+    before = metrics.get_value("invalidation_messages_received_total", topic="test_topic")
+    with engine.begin() as conn:
+        conn.execute(
+            text("SELECT pg_notify(:c, :p)"),
+            {"c": invalidation.CHANNEL, "p": f'["test_topic", "remote", {time.time()}]'},
+        )
+    assert _wait_for(lambda: "remote" in recorder)
+    assert metrics.get_value("invalidation_messages_received_total", topic="test_topic") == before + 1
+
+    # Garbage on the channel is ignored, not fatal
+    with engine.begin() as conn:
+        conn.execute(text("SELECT pg_notify(:c, 'not json')"), {"c": invalidation.CHANNEL})
+        conn.execute(text("SELECT pg_notify(:c, :p)"), {"c": invalidation.CHANNEL, "p": '["test_topic", "after", 0]'})
+    assert _wait_for(lambda: "after" in recorder)
+
+
+def test_listener_flushes_everything_after_reconnecting(engine, recorder, listener, monkeypatch):
+    monkeypatch.setattr(invalidation._Listener, "max_backoff_seconds", 0.2)
+    pid = listener._conn.get_backend_pid()
+    with engine.begin() as conn:
+        conn.execute(text("SELECT pg_terminate_backend(:pid)"), {"pid": pid})
+
+    assert _wait_for(lambda: None in recorder)
+    assert _wait_for(lambda: listener.connected.is_set() and listener._conn.get_backend_pid() != pid)
+
+
+def _api_process(key_plain, ready_q, out_q):
+    """Caches an actor, then reports when the cached entry was dropped and what auth says afterwards."""
+    from app.core import invalidation as bus
+    from app.core.database import SessionLocal
+    from app.crud import crud_auth
+
+    key_hash = sha256_hex(key_plain)
+    dropped = threading.Event()
+    received = {}
+
+    def on_key(k):
+        if k == key_hash:
+            received["at"] = time.time()
+            dropped.set()
+
+    bus.subscribe("api_key", on_key)
+    lst = bus.PostgresListener().start()
+    lst.connected.wait(10)
+    with SessionLocal() as db:
+        assert crud_auth.authenticate_api_key(db, key_plain) is not None
+        ready_q.put(os.getpid())
+        if not dropped.wait(10):
+            out_q.put((os.getpid(), None, "timeout"))
+            return
+        # Handlers run in order, so the cache entry is gone by now: this goes to the database
+        out_q.put((os.getpid(), received["at"], crud_auth.authenticate_api_key(db, key_plain)))
+    lst.stop()
+
+
+def test_key_deactivation_reaches_every_process_within_bound(db_session):
+    row, plain = create_api_key(db_session, tenant_id="tenant_a", actor_id="svc", role="viewer")
+    ctx = mp.get_context("spawn")
+    ready_q, out_q = ctx.Queue(), ctx.Queue()
+    procs = [ctx.Process(target=_api_process, args=(plain, ready_q, out_q), daemon=True) for _ in range(PROCESSES)]
+    for p in procs:
+        p.start()
+    try:
+        for _ in procs:
+            ready_q.get(timeout=60)
+
+        db_session.query(ApiKey).filter(ApiKey.id == row.id).update({"is_active": False})
+        invalidate_api_key(db_session, row.key_hash)
+        committed_at = time.time()
+        db_session.commit()
+
+        results = []
+        for _ in procs:
+            try:
+                results.append(out_q.get(timeout=15))
+            except queue.Empty:
+                pytest.fail("a process never saw the invalidation")
+    finally:
+        for p in procs:
+            p.join(10)
+            if p.is_alive():
+                p.kill()
+
+    lags = [at - committed_at for _, at, _ in results]
+    assert [actor for _, _, actor in results] == [None] * PROCESSES
+    assert max(lags) < PROPAGATION_BOUND_SECONDS, lags
+
+
+@pytest.mark.skipif(not os.getenv("REDIS_URL"), reason="REDIS_URL not set")
+def test_redis_backend_round_trip(db_session, recorder, monkeypatch):
+    monkeypatch.setattr(invalidation, "INVALIDATION_BACKEND", "redis")
+    monkeypatch.setattr(invalidation, "_redis_client", None)
+    lst = invalidation.RedisListener(os.environ["REDIS_URL"]).start()
+    try:
+        assert lst.connected.wait(10)
+        invalidation.publish(db_session, "test_topic", "via-redis")
+        db_session.commit()
+        # Once locally after commit, once more from the subscription
+        assert _wait_for(lambda: recorder.count("via-redis") == 2)
+    finally:
+        lst.stop()
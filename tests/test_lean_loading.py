@@ -0,0 +1,77 @@
+# tests/test_lean_loading.py
+
+import re
+
+import pytest
+from sqlalchemy import event
+
+
+_HEAVY = {
+    "embedding": re.compile(r"incident_logs(_\d+)?\.embedding AS "),
+    "message_raw": re.compile(r"incident_logs(_\d+)?\.message_raw AS "),
+}
+
+
+@pytest.fixture()
+def selects(db_session):
+    statements = []
+    engine = db_session.get_bind()
+
+    def listener(conn, cursor, statement, parameters, context, executemany):
+        if statement.lstrip().upper().startswith(("SELECT", "WITH")) and "incident_logs" in statement:
+            statements.append(statement)
+
+    event.listen(engine, "before_cursor_execute", listener)
+    yield statements
+    event.remove(engine, "before_cursor_execute", listener)
+
+
+def _heavy_columns(statements):
+    return {name for name, pattern in _HEAVY.items() for s in statements if pattern.search(s)}
+
+
+def _create(client, key, message="Kafka consumer lag on orders"):
+    r = client.post(
+        "/api/incidents",
+        headers={"X-API-Key": key},
+        json={"service": "payments", "severity": "high", "message": message},
+    )
+    assert r.status_code == 200, r.text
+    return r.json()
+
+
+@pytest.mark.parametrize("mode", ["hybrid", "ilike"])
+def test_search_and_get_never_load_embedding_or_raw(client, bootstrap_keys, selects, mode):
+    key = bootstrap_keys["a_admin"]
+    created = _create(client, key)
+    selects.clear()
+
+    s = client.get("/api/search", headers={"X-API-Key": key}, params={"q": "kafka", "top_k": 50, "mode": mode})
+    assert s.status_code == 200 and [r["id"] for r in s.json()] == [created["id"]]
+    g = client.get(f"/api/incidents/{created['id']}", headers={"X-API-Key": key})
+    assert g.status_code == 200 and g.json()["message_redacted"] == created["message_redacted"]
+
+    assert selects
+    assert _heavy_columns(selects) == set()
+
+
+def test_writes_do_not_reload_embedding_or_raw(client, bootstrap_keys, selects):
+    key = bootstrap_keys["a_admin"]
+    created = _create(client, key)
+    u = client.patch(f"/api/incidents/{created['id']}", headers={"X-API-Key": key}, json={"message": "Kafka lag cleared"})
+    assert u.status_code == 200 and u.json()["embedding_version"] == 2
+    d = client.delete(f"/api/incidents/{created['id']}", headers={"X-API-Key": key})
+    assert d.status_code == 200 and d.json()["is_deleted"] is True
+
+    assert _heavy_columns(selects) == set()
+
+
+def test_raw_read_loads_only_raw_text(client, bootstrap_keys, selects):
+    key = bootstrap_keys["a_admin"]
+    created = _create(client, key, message="token for ops@example.com")
+    selects.clear()
+
+    r = client.get(f"/api/incidents/{created['id']}/raw", headers={"X-API-Key": key})
+    assert r.status_code == 200
+    assert r.json()["message_raw"] == "token for ops@example.com"
+    assert _heavy_columns(selects) == {"message_raw"}
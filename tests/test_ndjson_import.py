@@ -0,0 +1,142 @@
+# tests/test_ndjson_import.py
+
+import asyncio
+import io
+import json
+import tracemalloc
+
+import app.api.routes as routes_module
+from app.crud.crud_import import batched, ndjson_lines, pipelined
+from app.models.auth import AuditLog
+from app.models.incident import IncidentLog
+from app.scripts.import_incidents import run as run_cli
+
+
+def _line(i, **fields):
+    body = {"service": "payments", "severity": "low", "message": f"historical incident {i}"}
+    body.update(fields)
+    return json.dumps(body)
+
+
+def _import(client, key, body, **params):
+    r = client.post(
+        "/api/incidents:import",
+        headers={"X-API-Key": key, "Content-Type": "application/x-ndjson"},
+        params=params,
+        content=body.encode() if isinstance(body, str) else body,
+    )
+    assert r.status_code == 200, r.text
+    return [json.loads(line) for line in r.text.splitlines()]
+
+
+def test_import_streams_per_line_results_and_summary(client, db_session, bootstrap_keys):
+    body = "\n".join([
+        _line(1, message="paged ops@example.com"),
+        "{not json",
+        "",
+        _line(4, severity=None),
+        _line(5),
+    ]) + "\n"
+    rows = _import(client, bootstrap_keys["a_admin"], body)
+
+    *results, summary = rows
+    assert [(r["line"], r["status"]) for r in results] == [(1, "created"), (2, "invalid"), (4, "invalid"), (5, "created")]
+    assert results[1]["error"].startswith("invalid JSON")
+    assert "severity" in results[2]["error"]
+    assert summary == {"summary": {"lines": 4, "created": 2, "coalesced": 0, "replayed": 0, "invalid": 2, "errors": 0, "batches": 1}}
+
+    first = db_session.get(IncidentLog, results[0]["id"])
+    assert first.tenant_id == "tenant_a" and first.message_redacted == "paged [REDACTED_EMAIL]"
+
+
+def test_import_commits_bounded_batches_with_contiguous_audit(client, db_session, bootstrap_keys, monkeypatch):
+    monkeypatch.setattr(routes_module, "IMPORT_BATCH_SIZE", 3)
+    body = "".join(_line(i) + "\n" for i in range(10))
+    *results, summary = _import(client, bootstrap_keys["a_admin"], body)
+
+    assert summary["summary"]["batches"] == 4 and summary["summary"]["created"] == 10
+    ids = [r["id"] for r in results]
+    chain = db_session.query(AuditLog).filter(AuditLog.action == "INCIDENT_CREATE").order_by(AuditLog.id).all()
+    assert [int(a.resource_id) for a in chain] == ids
+    assert all(b.prev_hash == a.hash for a, b in zip(chain, chain[1:]))
+
+
+def test_import_summary_only_and_line_limit(client, bootstrap_keys, monkeypatch):
+    monkeypatch.setattr(routes_module, "IMPORT_MAX_LINE_BYTES", 200)
+    body = _line(1) + "\n" + _line(2, message="x" * 500) + "\n" + _line(3)
+    rows = _import(client, bootstrap_keys["a_admin"], body, results="summary")
+    assert rows == [{"summary": {"lines": 3, "created": 2, "coalesced": 0, "replayed": 0, "invalid": 1, "errors": 0, "batches": 1}}]
+
+
+def test_cli_streams_file_through_endpoint(client, bootstrap_keys):
+    f = io.BytesIO(("".join(_line(i) + "\n" for i in range(5)) + "oops\n").encode())
+    out = io.StringIO()
+    summary = run_cli(client, f, bootstrap_keys["a_admin"], chunk_bytes=17, summary_only=False, out=out)
+    assert summary["created"] == 5 and summary["invalid"] == 1
+    assert [json.loads(line)["status"] for line in out.getvalue().splitlines()] == ["created"] * 5 + ["invalid"]
+
+
+async def _aiter(items):
+    for item in items:
+        yield item
+
+
+def test_pipeline_reads_at_most_max_in_flight_batches_ahead():
+    read = []
+    ahead = []
+
+    async def source():
+        for i in range(20):
+            read.append(i)
+            yield [i]
+
+    async def process(batch):
+        ahead.append(len(read) - 1 - batch[0])
+        await asyncio.sleep(0.001)
+        return batch[0]
+
+    async def main():
+        return [r async for r in pipelined(source(), process, max_in_flight=2)]
+
+    assert asyncio.run(main()) == list(range(20))
+    # queue of 2 plus the batch the reader is blocked on
+    assert max(ahead) <= 3
+
+
+def test_pipeline_propagates_reader_errors():
+    async def source():
+        yield [1]
+        raise ValueError("bad upload")
+
+    async def process(batch):
+        return batch
+
+    async def main():
+        return [r async for r in pipelined(source(), process, max_in_flight=1)]
+
+    try:
+        asyncio.run(main())
+    except ValueError as e:
+        assert str(e) == "bad upload"
+    else:
+        raise AssertionError("expected ValueError")
+
+
+def test_parser_memory_is_flat_in_upload_size():
+    line = (_line(0) + "\n").encode()
+    chunk = line * 2000  # ~150 KB per network chunk
+
+    async def consume(n_chunks):
+        tracemalloc.start()
+        try:
+            count = 0
+            async for batch in batched(ndjson_lines(_aiter([chunk] * n_chunks), 1 << 20), 500):
+                count += len(batch)
+            return count, tracemalloc.get_traced_memory()[1]
+        finally:
+            tracemalloc.stop()
+
+    small_count, small_peak = asyncio.run(consume(10))
+    large_count, large_peak = asyncio.run(consume(200))
+    assert (small_count, large_count) == (20_000, 400_000)
+    assert large_peak < small_peak * 1.5
@@ -0,0 +1,70 @@
+# tests/test_pan_detector.py
+
+import time
+
+import pytest
+
+import app.security.redaction as redaction_module
+from app.security.redaction import _luhn_ok, _pan_spans, redact_text
+
+
+@pytest.mark.parametrize("text", [
+    "card 4111 1111 1111 1111 exp 12/29",
+    "card 4111-1111-1111-1111 exp 12/29",
+    "card 4111111111111111 exp 12/29",
+    "card 5500 0000 0000 0004 exp 12/29",
+    "card 2223000048400011 exp 12/29",
+    "card 3782 822463 10005 exp 12/29",
+    "card 6011 1111 1111 1117 exp 12/29",
+    "card 3530111333300000 exp 12/29",
+])
+def test_valid_pans_are_redacted(text):
+    assert redact_text(text) == "card [REDACTED_PAN] exp 12/29"
+
+
+@pytest.mark.parametrize("text", [
+    "card 4111 1111 1111 1112 failed Luhn",
+    "ts=1697049600123 epoch millis",
+    "order 1234567812345670 has no issuer prefix",
+    "id 41111111111111111111 is too long",
+    "ref 4111111111111111_x touches a word character",
+    "hex 00 1f 3a 4b 5c 6d 7e 8f 90 a1 b2 c3 d4 e5 f6 07",
+    "digits 1 2 3 4 5 6 7 8 9 0 1 2 3 4 5 6",
+])
+def test_non_pan_digit_runs_are_kept(text):
+    assert redact_text(text) == text
+
+
+def test_pan_window_skips_surrounding_digit_groups():
+    assert redact_text("12 4111 1111 1111 1111 1234abc") == "12 [REDACTED_PAN] 1234abc"
+    assert redact_text("4111 1111 1111 1111 5500-0000-0000-0004") == "[REDACTED_PAN] [REDACTED_PAN]"
+
+
+def test_long_runs_find_the_same_pans_across_block_boundaries(monkeypatch):
+    run = " ".join(["4111 1111 1111 1111", "1" * 80, "5500-0000-0000-0004", "412", "3782 822463 10005"] * 20)
+    text = f"x {run} 4111 y"
+    expected = list(_pan_spans(text))
+    assert len(expected) == 60
+
+    monkeypatch.setattr(redaction_module, "_PAN_BLOCK", 16)
+    assert list(_pan_spans(text)) == expected
+
+
+def test_luhn():
+    assert _luhn_ok("4111111111111111")
+    assert _luhn_ok("378282246310005")
+    assert not _luhn_ok("4111111111111112")
+
+
+@pytest.mark.parametrize("unit", ["1 ", "1 " * 12 + "1x ", ("1" + "- " * 20) * 12 + "1_ ", "4000 ", "4111 1111 1111 1112 "])
+def test_scan_time_grows_linearly_on_adversarial_input(unit):
+    def seconds(size):
+        text = (unit * (size // len(unit) + 1))[:size]
+        t0 = time.perf_counter()
+        for _ in _pan_spans(text):
+            pass
+        return time.perf_counter() - t0
+
+    small, large = seconds(250_000), seconds(2_000_000)
+    # 8x the input; quadratic behaviour would be ~64x
+    assert large < max(small, 0.01) * 20
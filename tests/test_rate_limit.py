@@ -0,0 +1,170 @@
+# tests/test_rate_limit.py
+
+import os
+import threading
+
+import pytest
+
+from app.core import metrics
+from app.core.ratelimit import Budget, MemoryBuckets, PostgresBuckets, RateLimited, RateLimiter, RedisBuckets, limiter
+
+
+def _h(key):
+    return {"X-API-Key": key}
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+def _budgets(key, tenant, cls="read"):
+    out = {c: {"key": Budget(0, 0), "tenant": Budget(0, 0)} for c in ("search", "write", "read")}
+    out[cls] = {"key": key, "tenant": tenant}
+    return out
+
+
+@pytest.fixture()
+def small_budgets(monkeypatch):
+    def use(budgets):
+        monkeypatch.setattr(limiter, "budgets", budgets)
+
+    return use
+
+
+def test_bucket_refills_at_rate_up_to_burst():
+    clock = FakeClock()
+    buckets = MemoryBuckets(clock=clock)
+    b = [("k", Budget(rate=2, burst=3))]
+    assert [buckets.acquire(b) for _ in range(3)] == [None, None, None]
+    index, wait = buckets.acquire(b)
+    assert index == 0 and wait == pytest.approx(0.5)
+
+    clock.now += 0.5
+    assert buckets.acquire(b) is None
+    assert buckets.acquire(b) is not None
+
+    # Idle for a long time: capped at burst, not rate x elapsed
+    clock.now += 60
+    assert [buckets.acquire(b) for _ in range(4)][-1] == (0, pytest.approx(0.5))
+
+
+def test_denied_request_takes_nothing_from_the_other_bucket():
+    clock = FakeClock()
+    buckets = MemoryBuckets(clock=clock)
+    key, tenant = ("key", Budget(1, 5)), ("tenant", Budget(1, 1))
+    assert buckets.acquire([key, tenant]) is None
+    assert buckets.acquire([key, tenant])[0] == 1
+    # The key bucket still has its 4 tokens
+    assert [buckets.acquire([key]) for _ in range(5)] == [None] * 4 + [(0, pytest.approx(1.0))]
+
+
+def test_least_recently_used_buckets_are_dropped():
+    buckets = MemoryBuckets(max_buckets=2, clock=FakeClock())
+    one = Budget(1, 1)
+    for name in ("a", "b", "c"):
+        assert buckets.acquire([(name, one)]) is None
+    assert buckets.acquire([("a", one)]) is None  # forgotten, so full again
+    assert buckets.acquire([("c", one)]) is not None
+
+
+def test_429_with_retry_after_once_the_key_budget_is_spent(client, bootstrap_keys, small_budgets):
+    small_budgets(_budgets(key=Budget(0.1, 2), tenant=Budget(100, 100)))
+    viewer = _h(bootstrap_keys["a_viewer"])
+    assert [client.get("/api/me", headers=viewer).status_code for _ in range(2)] == [200, 200]
+    before = metrics.get_value("rate_limited_total", route_class="read", scope="key")
+
+    r = client.get("/api/me", headers=viewer)
+    assert r.status_code == 429
+    assert r.headers["Retry-After"] == "10"
+    assert "per API key" in r.json()["detail"]
+    assert metrics.get_value("rate_limited_total", route_class="read", scope="key") == before + 1
+
+    # Other keys in the tenant have their own bucket; other route classes are unaffected
+    assert client.get("/api/me", headers=_h(bootstrap_keys["a_auditor"])).status_code == 200
+    assert client.get("/api/search?q=x", headers=viewer).status_code != 429
+    # A bad key is still 401, not 429
+    assert client.get("/api/me", headers=_h("nope")).status_code == 401
+
+
+def test_tenant_budget_is_shared_by_its_keys(client, bootstrap_keys, small_budgets):
+    small_budgets(_budgets(key=Budget(100, 100), tenant=Budget(0.5, 3)))
+    codes = [client.get("/api/me", headers=_h(bootstrap_keys[k])).status_code for k in ("a_admin", "a_viewer", "a_auditor", "a_responder")]
+    assert codes == [200, 200, 200, 429]
+
+    r = client.get("/api/me", headers=_h(bootstrap_keys["a_admin"]))
+    assert r.status_code == 429 and "per tenant" in r.json()["detail"] and r.headers["Retry-After"] == "2"
+    assert client.get("/api/me", headers=_h(bootstrap_keys["b_admin"])).status_code == 200
+
+
+def test_write_routes_use_the_write_budget(client, bootstrap_keys, small_budgets):
+    small_budgets(_budgets(key=Budget(0.01, 1), tenant=Budget(100, 100), cls="write"))
+    responder = _h(bootstrap_keys["a_responder"])
+    payload = {"service": "api", "severity": "low", "message": "m"}
+    assert client.post("/api/incidents", json=payload, headers=responder).status_code == 200
+    assert client.post("/api/incidents", json=payload, headers=responder).status_code == 429
+    assert client.get("/api/incidents/1", headers=responder).status_code == 200
+
+
+def test_backend_errors_fail_open():
+    class Broken:
+        blocking = False
+
+        def acquire(self, buckets, cost=1.0):
+            raise ConnectionError("down")
+
+    rl = RateLimiter(Broken(), _budgets(key=Budget(1, 1), tenant=Budget(1, 1)))
+    before = metrics.get_value("rate_limit_backend_errors_total")
+    rl.check("read", "tenant_a", 1)
+    assert metrics.get_value("rate_limit_backend_errors_total") == before + 1
+
+
+def _hammer(rl, threads=8, per_thread=25):
+    allowed = []
+    lock = threading.Lock()
+
+    def run():
+        for _ in range(per_thread):
+            try:
+                rl.check("read", "tenant_a", 1)
+            except RateLimited:
+                continue
+            with lock:
+                allowed.append(1)
+
+    workers = [threading.Thread(target=run) for _ in range(threads)]
+    for w in workers:
+        w.start()
+    for w in workers:
+        w.join()
+    return len(allowed)
+
+
+def test_postgres_buckets_are_exact_under_concurrency(engine, db_session):
+    # A negligible refill rate, so the burst is all there is
+    rl = RateLimiter(PostgresBuckets(engine), _budgets(key=Budget(0.001, 30), tenant=Budget(0.001, 1000)))
+    assert _hammer(rl) == 30
+
+    # The tenant bucket refused after the key bucket granted: the key token comes back
+    rl = RateLimiter(PostgresBuckets(engine), _budgets(key=Budget(0.001, 5), tenant=Budget(0.001, 1)))
+    rl.reset()
+    rl.check("read", "tenant_a", 1)
+    with pytest.raises(RateLimited) as e:
+        rl.check("read", "tenant_a", 1)
+    assert e.value.scope == "tenant" and e.value.retry_after > 100
+    rl.budgets = _budgets(key=Budget(0.001, 5), tenant=Budget(0, 0))
+    assert _hammer(rl, threads=1, per_thread=10) == 4
+
+
+@pytest.mark.skipif(not os.getenv("REDIS_URL"), reason="REDIS_URL not set")
+def test_redis_buckets_are_exact_under_concurrency():
+    backend = RedisBuckets(os.environ["REDIS_URL"])
+    backend.reset()
+    rl = RateLimiter(backend, _budgets(key=Budget(0.001, 30), tenant=Budget(0.001, 1000)))
+    try:
+        assert _hammer(rl) == 30
+    finally:
+        backend.reset()
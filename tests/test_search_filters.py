@@ -0,0 +1,110 @@
+# tests/test_search_filters.py
+
+from datetime import datetime, timedelta, timezone
+
+import pytest
+from sqlalchemy import event, text
+
+import app.crud.crud as crud_module
+from app.models.auth import AuditLog
+from app.models.incident import IncidentLog
+from app.schemas.incident import SearchFilters
+
+
+def _create(client, key, message, **fields):
+    body = {"service": "payments", "severity": "low", "message": message}
+    body.update(fields)
+    r = client.post("/api/incidents", headers={"X-API-Key": key}, json=body)
+    assert r.status_code == 200, r.text
+    return r.json()["id"]
+
+
+def _search(client, key, mode, **params):
+    r = client.get("/api/search", headers={"X-API-Key": key}, params={"q": "kafka lag", "top_k": 50, "mode": mode, **params})
+    assert r.status_code == 200, r.text
+    return {row["id"] for row in r.json()}
+
+
+@pytest.fixture()
+def incidents(client, bootstrap_keys):
+    key = bootstrap_keys["a_admin"]
+    return {
+        "pay_high": _create(client, key, "kafka lag on orders", severity="high", source="pagerduty", tags=["kafka", "orders"]),
+        "pay_crit": _create(client, key, "kafka lag on refunds", severity="critical", source="grafana", tags=["kafka"]),
+        "search_low": _create(client, key, "kafka lag on indexer", service="search", tags=["kafka", "es"]),
+        "pay_medium": _create(client, key, "kafka lag on ledger", severity="medium", source="pagerduty"),
+    }
+
+
+@pytest.mark.parametrize("mode", ["hybrid", "ilike"])
+def test_structured_filters_are_applied_before_ranking(client, bootstrap_keys, incidents, mode):
+    key = bootstrap_keys["a_viewer"]
+    assert _search(client, key, mode) == set(incidents.values())
+    assert _search(client, key, mode, service="search") == {incidents["search_low"]}
+    assert _search(client, key, mode, severity=["high", "medium"]) == {incidents["pay_high"], incidents["pay_medium"]}
+    assert _search(client, key, mode, min_severity="high") == {incidents["pay_high"], incidents["pay_crit"]}
+    assert _search(client, key, mode, source="pagerduty") == {incidents["pay_high"], incidents["pay_medium"]}
+    assert _search(client, key, mode, tags=["kafka"]) == {incidents["pay_high"], incidents["pay_crit"], incidents["search_low"]}
+    assert _search(client, key, mode, tags=["kafka", "orders"]) == {incidents["pay_high"]}
+    assert _search(client, key, mode, service="payments", min_severity="high", tags=["kafka"], source="grafana") == {incidents["pay_crit"]}
+
+
+def test_min_severity_intersects_explicit_severity(client, bootstrap_keys, incidents):
+    key = bootstrap_keys["a_viewer"]
+    assert _search(client, key, "hybrid", severity=["medium", "critical"], min_severity="high") == {incidents["pay_crit"]}
+    assert _search(client, key, "hybrid", severity=["low"], min_severity="high") == set()
+
+    r = client.get("/api/search", headers={"X-API-Key": key}, params={"q": "kafka", "min_severity": "sev9"})
+    assert r.status_code == 422
+
+
+def test_created_window_filter(client, db_session, bootstrap_keys, incidents):
+    now = datetime.now(timezone.utc)
+    db_session.query(IncidentLog).filter(IncidentLog.id == incidents["pay_high"]).update(
+        {IncidentLog.created_at: now - timedelta(days=3)}
+    )
+    db_session.commit()
+
+    key = bootstrap_keys["a_viewer"]
+    since = (now - timedelta(hours=24)).isoformat()
+    recent = _search(client, key, "hybrid", created_after=since)
+    assert incidents["pay_high"] not in recent
+    assert len(recent) == 3
+    assert _search(client, key, "hybrid", created_before=since) == {incidents["pay_high"]}
+
+
+def test_filters_are_recorded_in_search_audit_log(client, db_session, bootstrap_keys, incidents):
+    _search(client, bootstrap_keys["a_viewer"], "hybrid", service="payments", tags=["kafka"])
+    log = db_session.query(AuditLog).filter(AuditLog.action == "INCIDENT_SEARCH").one()
+    assert log.request_meta["filters"] == {"service": "payments", "tags": ["kafka"]}
+
+
+def test_tag_filter_uses_gin_index(db_session, monkeypatch):
+    monkeypatch.setenv("EMBEDDINGS_MODE", "local")
+    for i in range(2000):
+        tags = ["kafka"] if i % 500 == 0 else ["redis"]
+        message = f"broker {i} unreachable"
+        db_session.add(IncidentLog(tenant_id=f"tenant_{'ab'[i % 2]}", tags=tags, message_raw=message, message_redacted=message))
+    db_session.commit()
+    with db_session.get_bind().connect().execution_options(isolation_level="AUTOCOMMIT") as conn:
+        conn.execute(text("VACUUM ANALYZE incident_logs"))
+
+    statements = []
+    engine = db_session.get_bind()
+
+    def listener(conn, cursor, statement, parameters, context, executemany):
+        if "@>" in statement:
+            statements.append((statement, parameters))
+
+    event.listen(engine, "before_cursor_execute", listener)
+    try:
+        crud_module.search_incidents(db_session, "tenant_a", "broker", filters=SearchFilters(tags=["kafka"]))
+    finally:
+        event.remove(engine, "before_cursor_execute", listener)
+
+    statement, params = statements[-1]
+    cursor = db_session.connection().connection.cursor()
+    cursor.execute("EXPLAIN " + statement, params)
+    plan = "\n".join(row[0] for row in cursor.fetchall())
+    db_session.rollback()
+    assert "Bitmap Index Scan on ix_incident_logs_tags" in plan
@@ -0,0 +1,198 @@
+# tests/test_stack_fingerprints.py
+
+import pytest
+from sqlalchemy import event, text
+
+import app.api.routes as routes_module
+from app.core.fingerprint import stack_fingerprint
+from app.crud.crud import rebuild_stack_rollups
+from app.models.incident import IncidentLog
+from app.models.stack_rollup import StackFingerprintRollup
+
+PY_TRACE = '''Traceback (most recent call last):
+  File "/srv/app-{v}/app/api/routes.py", line {a}, in create_incident_route
+    row = create_incident(db, ...)
+  File "/srv/app-{v}/app/crud/crud.py", line {b}, in create_incident
+    raise KeyError(incident_id)
+KeyError: {id}'''
+
+JAVA_TRACE = '''java.lang.NullPointerException: Cannot invoke "String.length()" because "s" is null
+\tat com.acme.pay.Charge.apply(Charge.java:{a})
+\tat com.acme.pay.Service$$Lambda$14/0x0000000800c03000.run(Unknown Source)
+\tat java.base/java.lang.Thread.run(Thread.java:{b})'''
+
+GO_TRACE = '''panic: runtime error: invalid memory address or nil pointer dereference
+goroutine {id} [running]:
+main.handler(0xc0000{a}, 0x1)
+\t/home/ci/build-{v}/main.go:{b} +0x1d'''
+
+
+@pytest.mark.parametrize("template", [PY_TRACE, JAVA_TRACE, GO_TRACE])
+def test_fingerprint_ignores_lines_addresses_ids_and_paths(template):
+    a = template.format(v="1.4.2", a=120, b=33, id=1234)
+    b = template.format(v="1.5.0", a=131, b=40, id=98765)
+    assert stack_fingerprint(a) == stack_fingerprint(b)
+
+
+def test_fingerprint_separates_exception_types_and_frames():
+    base = PY_TRACE.format(v=1, a=1, b=2, id=3)
+    assert stack_fingerprint(base) != stack_fingerprint(base.replace("KeyError", "ValueError"))
+    assert stack_fingerprint(base) != stack_fingerprint(base.replace("in create_incident\n", "in update_incident\n"))
+    assert stack_fingerprint(None) is None and stack_fingerprint("   \n") is None
+
+
+def test_only_the_innermost_frames_count():
+    frames = "".join(f'  File "/app/m{i}.py", line {i}, in f{i}\n' for i in range(10))
+    a = "Traceback (most recent call last):\n" + frames + "ValueError: x"
+    b = a.replace("in f0\n", "in outermost\n")
+    assert stack_fingerprint(a) == stack_fingerprint(b)
+
+
+def _post(client, key, trace, service="api"):
+    r = client.post(
+        "/api/incidents",
+        headers={"X-API-Key": key},
+        json={"service": service, "severity": "high", "message": "request failed", "stack_trace": trace},
+    )
+    assert r.status_code == 200, r.text
+    return r.json()
+
+
+def _top(client, key, **params):
+    r = client.get("/api/stack-fingerprints", headers={"X-API-Key": key}, params=params)
+    assert r.status_code == 200, r.text
+    return r.json()
+
+
+def test_top_fingerprints_come_from_the_rollup(client, db_session, bootstrap_keys):
+    key = bootstrap_keys["a_admin"]
+    py = [_post(client, key, PY_TRACE.format(v=i, a=i, b=i, id=i)) for i in range(3)]
+    java = _post(client, key, JAVA_TRACE.format(a=1, b=2))
+    _post(client, key, None)
+    _post(client, bootstrap_keys["b_admin"], JAVA_TRACE.format(a=1, b=2))
+
+    assert len({r["stack_fingerprint"] for r in py}) == 1
+
+    statements = []
+    engine = db_session.get_bind()
+
+    def on_execute(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    event.listen(engine, "before_cursor_execute", on_execute)
+    try:
+        top = _top(client, bootstrap_keys["a_viewer"], hours=1)
+    finally:
+        event.remove(engine, "before_cursor_execute", on_execute)
+
+    assert [(t["stack_fingerprint"], t["count"], t["sample_incident_id"]) for t in top] == [
+        (py[0]["stack_fingerprint"], 3, py[0]["id"]),
+        (java["stack_fingerprint"], 1, java["id"]),
+    ]
+    assert not any("FROM incident_logs" in s for s in statements)
+
+
+def test_old_buckets_fall_out_of_the_window(client, db_session, bootstrap_keys):
+    key = bootstrap_keys["a_admin"]
+    _post(client, key, JAVA_TRACE.format(a=1, b=2))
+    db_session.execute(text("UPDATE stack_fingerprint_rollups SET bucket_start = bucket_start - interval '3 days'"))
+    db_session.commit()
+
+    assert _top(client, key, hours=24) == []
+    assert [t["count"] for t in _top(client, key, hours=24 * 7)] == [1]
+
+
+def test_coalesced_repeats_count_in_the_rollup(client, db_session, bootstrap_keys, monkeypatch):
+    monkeypatch.setattr(routes_module, "INGEST_COALESCE", True)
+    key = bootstrap_keys["a_admin"]
+    first = [_post(client, key, GO_TRACE.format(id=i, a=i, b=i, v=i)) for i in range(4)]
+    assert {r["id"] for r in first} == {first[0]["id"]}
+    assert [t["count"] for t in _top(client, key)] == [4]
+    assert db_session.query(StackFingerprintRollup).count() == 1
+
+
+def test_search_filters_by_stack_fingerprint(client, bootstrap_keys):
+    key = bootstrap_keys["a_admin"]
+    py = _post(client, key, PY_TRACE.format(v=1, a=1, b=1, id=1))
+    _post(client, key, JAVA_TRACE.format(a=1, b=2))
+    r = client.get(
+        "/api/search",
+        headers={"X-API-Key": key},
+        params={"q": "request failed", "stack_fingerprint": py["stack_fingerprint"], "top_k": 10},
+    )
+    assert r.status_code == 200 and [x["id"] for x in r.json()] == [py["id"]]
+
+
+def test_editing_the_trace_refingerprints(client, db_session, bootstrap_keys):
+    key = bootstrap_keys["a_admin"]
+    created = _post(client, key, PY_TRACE.format(v=1, a=1, b=1, id=1))
+    u = client.patch(f"/api/incidents/{created['id']}", headers={"X-API-Key": key}, json={"stack_trace": JAVA_TRACE.format(a=1, b=2)})
+    assert u.json()["stack_fingerprint"] == stack_fingerprint(JAVA_TRACE.format(a=1, b=2))
+    assert db_session.get(IncidentLog, created["id"]).stack_fingerprint == u.json()["stack_fingerprint"]
+
+
+def _rollup(db_session):
+    db_session.expire_all()
+    return sorted(
+        (r.stack_fingerprint, r.incident_count, r.sample_incident_id)
+        for r in db_session.query(StackFingerprintRollup).filter(StackFingerprintRollup.tenant_id == "tenant_a")
+    )
+
+
+def test_trace_edits_move_the_count_between_fingerprints(client, db_session, bootstrap_keys):
+    key = bootstrap_keys["a_admin"]
+    py = [_post(client, key, PY_TRACE.format(v=i, a=i, b=i, id=i)) for i in range(2)]
+    java_trace = JAVA_TRACE.format(a=1, b=2)
+
+    u = client.patch(f"/api/incidents/{py[0]['id']}", headers={"X-API-Key": key}, json={"stack_trace": java_trace})
+    assert u.status_code == 200, u.text
+    top = {t["stack_fingerprint"]: (t["count"], t["sample_incident_id"]) for t in _top(client, key)}
+    assert top == {py[0]["stack_fingerprint"]: (1, py[1]["id"]), stack_fingerprint(java_trace): (1, py[0]["id"])}
+
+    # Dropping the trace removes the incident; an emptied bucket goes away
+    client.patch(f"/api/incidents/{py[1]['id']}", headers={"X-API-Key": key}, json={"stack_trace": None})
+    assert [t["stack_fingerprint"] for t in _top(client, key)] == [stack_fingerprint(java_trace)]
+
+    before = _rollup(db_session)
+    rebuild_stack_rollups(db_session)
+    assert _rollup(db_session) == before
+
+
+def test_soft_deleted_incidents_leave_the_rollup(client, db_session, bootstrap_keys):
+    key = bootstrap_keys["a_admin"]
+    go = [_post(client, key, GO_TRACE.format(id=i, a=i, b=i, v=i)) for i in range(3)]
+
+    assert client.delete(f"/api/incidents/{go[0]['id']}", headers={"X-API-Key": key}).status_code == 200
+    assert [(t["count"], t["sample_incident_id"]) for t in _top(client, key)] == [(2, go[1]["id"])]
+    # Deleting again is a 404 and changes nothing
+    assert client.delete(f"/api/incidents/{go[0]['id']}", headers={"X-API-Key": key}).status_code == 404
+    assert [t["count"] for t in _top(client, key)] == [2]
+
+    for row in go[1:]:
+        client.delete(f"/api/incidents/{row['id']}", headers={"X-API-Key": key})
+    assert _top(client, key) == [] and _rollup(db_session) == []
+
+
+def test_repeats_across_an_hour_boundary_stay_in_the_incident_bucket(client, db_session, bootstrap_keys, monkeypatch):
+    monkeypatch.setattr(routes_module, "INGEST_COALESCE", True)
+    key = bootstrap_keys["a_admin"]
+    first = _post(client, key, GO_TRACE.format(id=0, a=0, b=0, v=0))
+    # Created two hours ago, still live: the repeats below land in a later hour
+    db_session.execute(text("UPDATE incident_logs SET created_at = created_at - interval '2 hours'"))
+    db_session.execute(text("UPDATE stack_fingerprint_rollups SET bucket_start = bucket_start - interval '2 hours'"))
+    db_session.commit()
+    assert {_post(client, key, GO_TRACE.format(id=i, a=i, b=i, v=i))["id"] for i in range(1, 3)} == {first["id"]}
+
+    def buckets():
+        db_session.expire_all()
+        return sorted((r.bucket_start, r.stack_fingerprint, r.incident_count, r.sample_incident_id) for r in db_session.query(StackFingerprintRollup))
+
+    incremental = buckets()
+    assert [b[2] for b in incremental] == [3]
+    rebuild_stack_rollups(db_session)
+    assert buckets() == incremental
+
+    assert client.delete(f"/api/incidents/{first['id']}", headers={"X-API-Key": key}).status_code == 200
+    assert buckets() == []
+    rebuild_stack_rollups(db_session)
+    assert buckets() == []
@@ -0,0 +1,137 @@
+# tests/test_streaming_redaction.py
+
+import io
+import random
+import re
+import tracemalloc
+from functools import lru_cache
+
+import pytest
+
+import app.crud.crud as crud_module
+from app.security.redaction import redact_file, redact_stream, redact_text, redact_text_chunked
+from benchmarks.bench_redaction import make_log
+from tests.test_redaction_engine import CORPUS
+
+
+def _pieces(text, size):
+    return (text[i:i + size] for i in range(0, len(text), size))
+
+
+def _random_pieces(rnd, text, max_size):
+    pos = 0
+    while pos < len(text):
+        size = rnd.randint(1, max_size)
+        yield text[pos:pos + size]
+        pos += size
+
+
+_LABEL = re.compile(r"(\[REDACTED_[A-Z_]+\])")
+
+
+def _explains(text, out):
+    """True if out is text with some regions replaced, each by the label redact_text gives that region on its own."""
+    tokens = [t for t in _LABEL.split(out) if t]
+
+    @lru_cache(maxsize=None)
+    def match(i, k):
+        if k == len(tokens):
+            return i == len(text)
+        token = tokens[k]
+        if _LABEL.fullmatch(token):
+            return any(redact_text(text[i:j]) == token and match(j, k + 1) for j in range(i + 1, len(text) + 1))
+        return text.startswith(token, i) and match(i + len(token), k + 1)
+
+    return match(0, 0)
+
+
+@pytest.mark.parametrize("chunk_size", [1, 7, 64, 1000])
+def test_stream_matches_redact_text_at_every_seam(chunk_size):
+    rnd = random.Random(chunk_size)
+    for _ in range(300):
+        text = rnd.choice([" ", "\n", ""]).join(rnd.choice(CORPUS) for _ in range(rnd.randint(1, 20)))
+        assert "".join(redact_stream(_pieces(text, chunk_size), chunk_size=chunk_size, overlap=256)) == redact_text(text)
+
+
+def test_stream_matches_redact_text_at_random_seams():
+    rnd = random.Random(13)
+    for _ in range(300):
+        text = "".join(rnd.choice(CORPUS) + rnd.choice([" ", "\n", "", ",", "="]) for _ in range(rnd.randint(1, 30)))
+        chunk_size = rnd.randint(1, 200)
+        out = "".join(redact_stream(_random_pieces(rnd, text, 2 * chunk_size), chunk_size=chunk_size, overlap=256))
+        assert out == redact_text(text), (text, chunk_size)
+
+
+_ATOMS = ["eyJ", "abc", ".", "-", "@", "x.io", "123", "45", "6789", "4111", " ", "AKIA", "token=", "Bearer ", "_", "ops", "def"]
+
+
+def test_matches_longer_than_the_overlap_never_swallow_emitted_text():
+    # Regression: a match starting inside already-emitted context used to have its tail replaced by a label
+    text = "ghieyJx.ioghi@@..x.io45@123token=x.iox.ioAKIAeyJ4111x.io4111_1abctoken=x.ioghi 45eyJ@"
+    out = "".join(redact_stream(_pieces(text, 1), chunk_size=1, overlap=17))
+    assert out == redact_text(text) == text
+
+    # With a short overlap the output may redact differently, but only ever whole matches
+    rnd = random.Random(7)
+    for _ in range(1500):
+        text = "".join(rnd.choice(_ATOMS) for _ in range(rnd.randint(1, 30)))
+        chunk_size, overlap = rnd.randint(1, 16), rnd.randint(1, 80)
+        out = "".join(redact_stream(_random_pieces(rnd, text, chunk_size), chunk_size=chunk_size, overlap=overlap))
+        assert _explains(text, out), (text, chunk_size, overlap, out)
+
+
+def test_redact_file_and_chunked_match_redact_text():
+    text = make_log(300_000, seed=5)
+    expected = redact_text(text)
+    assert "".join(redact_file(io.StringIO(text), chunk_size=4096, overlap=512)) == expected
+    assert redact_text_chunked(text, chunk_size=4096, overlap=512) == expected
+
+
+def test_match_running_into_buffer_end_is_held_back():
+    # Longer than the overlap: the signature keeps matching as chunks arrive and must not be cut at a seam
+    jwt = "eyJhbGciOiJIUzI1NiJ9.eyJzdWIiOiJ4In0." + "s" * 1000
+    text = "x " * 100 + jwt + " tail"
+    out = "".join(redact_stream(_pieces(text, 50), chunk_size=50, overlap=64))
+    assert out == redact_text(text) == "x " * 100 + "[REDACTED_JWT] tail"
+
+
+def test_streaming_peak_memory_is_bounded_by_chunk_size():
+    text = make_log(8_000_000, seed=9)
+    source = io.StringIO(text)
+    chunk_size = 64 * 1024
+
+    tracemalloc.start()
+    try:
+        emitted = 0
+        for piece in redact_file(source, chunk_size=chunk_size, overlap=8192):
+            emitted += len(piece)
+        _, streaming_peak = tracemalloc.get_traced_memory()
+        tracemalloc.reset_peak()
+        redact_text(text)
+        _, whole_peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+
+    assert emitted > 0
+    # Independent of the 8 MB input: a few buffers of chunk_size + overlap
+    assert streaming_peak < 16 * chunk_size
+    assert whole_peak > len(text)
+
+
+def test_create_and_update_redact_large_messages_in_chunks(client, bootstrap_keys, monkeypatch):
+    monkeypatch.setattr(crud_module, "REDACT_CHUNK_SIZE", 1024)
+    monkeypatch.setattr(crud_module, "REDACT_CHUNK_OVERLAP", 256)
+    calls = []
+    real = crud_module.redact_text_chunked
+    monkeypatch.setattr(crud_module, "redact_text_chunked", lambda *a: calls.append(a[1:]) or real(*a))
+
+    key = bootstrap_keys["a_admin"]
+    message = make_log(20_000, seed=1)
+    r = client.post("/api/incidents", headers={"X-API-Key": key}, json={"service": "api", "severity": "low", "message": message})
+    assert r.status_code == 200, r.text
+    assert r.json()["message_redacted"] == redact_text(message)
+
+    u = client.patch(f"/api/incidents/{r.json()['id']}", headers={"X-API-Key": key}, json={"message": message + " ops@example.com"})
+    assert u.status_code == 200, u.text
+    assert u.json()["message_redacted"].endswith(" [REDACTED_EMAIL]")
+    assert calls == [(1024, 256), (1024, 256)]
@@ -0,0 +1,109 @@
+# tests/test_write_path.py
+
+import pytest
+from sqlalchemy import event
+
+import app.api.routes as routes_module
+from app.models.auth import AuditLog
+from app.models.incident import IncidentLog
+
+
+@pytest.fixture()
+def trace(db_session):
+    """Statements and commits issued against the test engine."""
+    engine = db_session.get_bind()
+    log = {"statements": [], "commits": 0}
+
+    def on_execute(conn, cursor, statement, parameters, context, executemany):
+        log["statements"].append(statement.lstrip().split(None, 1)[0].upper() + " " + statement)
+
+    def on_commit(conn):
+        log["commits"] += 1
+
+    event.listen(engine, "before_cursor_execute", on_execute)
+    event.listen(engine, "commit", on_commit)
+    yield log
+    event.remove(engine, "before_cursor_execute", on_execute)
+    event.remove(engine, "commit", on_commit)
+
+
+def _incident_statements(log):
+    return [s.split(" ", 1)[0] for s in log["statements"] if "incident_logs" in s]
+
+
+def _create(client, key, message="disk full on db-1"):
+    r = client.post("/api/incidents", headers={"X-API-Key": key}, json={"service": "db", "severity": "high", "message": message})
+    assert r.status_code == 200, r.text
+    return r.json()
+
+
+def test_each_write_is_one_statement_and_one_commit(client, bootstrap_keys, trace):
+    key = bootstrap_keys["a_admin"]
+
+    trace.update(statements=[], commits=0)
+    created = _create(client, key)
+    assert created["embedding_status"] == "ready"
+    assert (_incident_statements(trace), trace["commits"]) == (["INSERT"], 1)
+
+    trace.update(statements=[], commits=0)
+    u = client.patch(f"/api/incidents/{created['id']}", headers={"X-API-Key": key}, json={"severity": "critical"})
+    assert u.status_code == 200 and u.json()["severity"] == "critical"
+    assert (_incident_statements(trace), trace["commits"]) == (["UPDATE"], 1)
+
+    # A message edit reads the current embedding state first, and nothing else
+    trace.update(statements=[], commits=0)
+    u = client.patch(f"/api/incidents/{created['id']}", headers={"X-API-Key": key}, json={"message": "disk freed"})
+    assert u.status_code == 200 and u.json()["embedding_version"] == 2
+    assert (_incident_statements(trace), trace["commits"]) == (["SELECT", "UPDATE"], 1)
+
+    trace.update(statements=[], commits=0)
+    d = client.delete(f"/api/incidents/{created['id']}", headers={"X-API-Key": key})
+    assert d.status_code == 200 and d.json()["is_deleted"] is True
+    assert (_incident_statements(trace), trace["commits"]) == (["UPDATE"], 1)
+
+
+def test_write_response_reflects_returned_row(client, db_session, bootstrap_keys):
+    key = bootstrap_keys["a_admin"]
+    created = _create(client, key)
+    u = client.patch(f"/api/incidents/{created['id']}", headers={"X-API-Key": key}, json={"title": "db-1 disk"})
+
+    row = db_session.get(IncidentLog, created["id"])
+    assert u.json()["title"] == row.title == "db-1 disk"
+    assert u.json()["message_redacted"] == row.message_redacted
+    assert row.updated_at >= row.created_at
+
+
+@pytest.mark.parametrize("method", ["create", "update", "delete"])
+def test_audit_failure_rolls_back_the_write(client, db_session, bootstrap_keys, monkeypatch, method):
+    key = bootstrap_keys["a_admin"]
+    created = _create(client, key) if method != "create" else None
+    audits_before = db_session.query(AuditLog).count()
+
+    def broken_audit(*args, **kwargs):
+        raise RuntimeError("audit store unavailable")
+
+    monkeypatch.setattr(routes_module, "append_audit_log", broken_audit)
+    with pytest.raises(RuntimeError):
+        if method == "create":
+            _create(client, key, message="never stored")
+        elif method == "update":
+            client.patch(f"/api/incidents/{created['id']}", headers={"X-API-Key": key}, json={"message": "never stored"})
+        else:
+            client.delete(f"/api/incidents/{created['id']}", headers={"X-API-Key": key})
+
+    db_session.expire_all()
+    assert db_session.query(AuditLog).count() == audits_before
+    if method == "create":
+        assert db_session.query(IncidentLog).filter(IncidentLog.message_raw == "never stored").count() == 0
+    else:
+        row = db_session.get(IncidentLog, created["id"])
+        assert row.message_raw == "disk full on db-1" and row.is_deleted is False
+
+
+def test_missing_incident_writes_nothing(client, bootstrap_keys, trace):
+    key = bootstrap_keys["a_admin"]
+    trace.update(statements=[], commits=0)
+    assert client.patch("/api/incidents/999999", headers={"X-API-Key": key}, json={"severity": "low"}).status_code == 404
+    assert client.delete("/api/incidents/999999", headers={"X-API-Key": key}).status_code == 404
+    assert trace["commits"] == 0
+    assert not any(s.startswith("INSERT") and "audit_logs" in s for s in trace["statements"])